@@ -0,0 +1,44 @@
+"""Benchmark: hot-path cost of analytics.record() and batch flush throughput.
+
+Usage:
+    python benchmarks/bench_analytics.py [events]
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.analytics import EventLog, TOPIC_OPENED
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    log = EventLog(capacity=count)
+
+    record = log.record
+    per_event = timeit.timeit(lambda: record(TOPIC_OPENED, 123456789, "cursor"), number=count) / count
+    # Subtract the lambda call overhead measured on an empty call
+    baseline = timeit.timeit(lambda: None, number=count) / count
+    print(f"record():  {(per_event - baseline) * 1e9:8.0f} ns/event (hot path)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "analytics.db")
+
+        async def flush() -> float:
+            log.start(path, interval=3600)
+            start = time.perf_counter()
+            written = await log.flush()
+            elapsed = time.perf_counter() - start
+            await log.stop()
+            return written / elapsed
+
+        print(f"flush():   {asyncio.run(flush()):8.0f} events/s (SQLite batch, worker thread)")
+
+
+if __name__ == '__main__':
+    main()
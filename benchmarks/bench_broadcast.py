@@ -0,0 +1,116 @@
+"""Benchmark: a large broadcast next to interactive traffic.
+
+A broadcast to ``recipients`` fake chats runs through the real Broadcaster
+(pacing, chunked checkpoints in SQLite, retries) against a fake Bot API that
+answers after ``latency_ms``, rejects every 50th chat as "bot was blocked"
+and answers one send in 5000 with a 1-second flood wait. Meanwhile menu
+button presses go through the bot's real handlers every 20 ms; their
+latency (from the scheduled press to the handled update) is compared with
+the same presses without a broadcast.
+
+Usage:
+    python benchmarks/bench_broadcast.py [recipients] [rate_per_second] [latency_ms]
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Bot, Update
+
+from fake_bot import FakeBotRequest, build_fake_application, callback_update
+from src.utils.broadcast import Broadcaster
+
+PRESS_INTERVAL = 0.02
+
+
+class FakeSenderRequest(FakeBotRequest):
+    """Fake Bot API with blocked users and occasional flood control."""
+
+    def __init__(self, latency: float):
+        super().__init__(latency)
+        self.sends = 0
+
+    async def do_request(self, url, method, request_data=None, *args, **kwargs):
+        if url.endswith("/sendMessage"):
+            self.sends += 1
+            if self.sends % 5000 == 0:
+                return 429, json.dumps({"ok": False, "error_code": 429, "description": "Too Many Requests",
+                                        "parameters": {"retry_after": 1}}).encode()
+            if int(request_data.parameters["chat_id"]) % 50 == 0:
+                await asyncio.sleep(self.latency)
+                return 403, json.dumps({"ok": False, "error_code": 403,
+                                        "description": "Forbidden: bot was blocked by the user"}).encode()
+        return await super().do_request(url, method, request_data, *args, **kwargs)
+
+
+async def press_buttons(application, stop: asyncio.Event) -> list:
+    """Press menu buttons every PRESS_INTERVAL; latency of each from its scheduled time."""
+    latencies = []
+    update_id = 0
+    next_press = time.perf_counter()
+    while not stop.is_set():
+        update_id += 1
+        data = "mode_educational" if update_id % 2 else "back_to_main"
+        await application.process_update(Update.de_json(callback_update(update_id, 7, data), application.bot))
+        latencies.append(time.perf_counter() - next_press)
+        next_press += PRESS_INTERVAL
+        await asyncio.sleep(max(0.0, next_press - time.perf_counter()))
+    return latencies
+
+
+def summary(latencies: list) -> str:
+    latencies = sorted(latencies)
+    return (f"p50 {statistics.median(latencies) * 1000:6.2f} ms   "
+            f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} ms   ({len(latencies)} presses)")
+
+
+async def main() -> None:
+    recipients = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    latency = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.05
+
+    application, _ = await build_fake_application()
+    with tempfile.TemporaryDirectory() as directory:
+        broadcaster = Broadcaster()
+        broadcaster.open(os.path.join(directory, "broadcast.db"), rate, concurrency=max(8, int(rate * latency * 2)))
+        with sqlite3.connect(broadcaster.path) as conn:
+            conn.executemany("INSERT INTO recipients (chat_id, first_seen) VALUES (?, 0)",
+                             ((chat_id,) for chat_id in range(1, recipients + 1)))
+
+        stop = asyncio.Event()
+        presses = asyncio.create_task(press_buttons(application, stop))
+        await asyncio.sleep(3)
+        stop.set()
+        baseline = await presses
+
+        sender = FakeSenderRequest(latency)
+        job = await broadcaster.create("📣 Мастер-класс в субботу!", 1, None)
+        stop = asyncio.Event()
+        presses = asyncio.create_task(press_buttons(application, stop))
+        started, cpu_started = time.perf_counter(), time.process_time()
+        await broadcaster.run(job, Bot("123456:FAKE", request=sender))
+        elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+        stop.set()
+        during = await presses
+
+    await application.shutdown()
+    print(f"broadcast: {job.total} recipients in {elapsed:.1f} s ({job.processed / elapsed:.0f} msg/s at "
+          f"{rate:.0f}/s paced, {latency * 1000:.0f} ms API latency)")
+    print(f"           sent {job.sent}, blocked {job.blocked}, failed {job.failed}; "
+          f"{sender.sends - job.processed} retried sends")
+    print(f"           CPU {cpu / job.processed * 1e6:.0f} µs per message (incl. the button presses) -> "
+          f"{cpu / job.processed * 25 * 100:.2f}% of a core at 25 msg/s")
+    print(f"presses without broadcast: {summary(baseline)}")
+    print(f"presses during broadcast:  {summary(during)}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
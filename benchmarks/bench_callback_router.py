@@ -0,0 +1,91 @@
+"""Benchmark: regex CallbackQueryHandler chain vs compiled callback router.
+
+Usage:
+    python benchmarks/bench_callback_router.py [iterations]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import CallbackQuery, Update, User
+from telegram.ext import CallbackQueryHandler
+
+from main import (
+    CREATIVE_INPUT,
+    EDUCATIONAL_CONTENT,
+    EDUCATIONAL_TOPICS,
+    MODE_SELECTION,
+    build_callback_router,
+)
+
+
+async def _noop(update, context):
+    return None
+
+
+# The per-state regex chains as they were registered before the router
+REGEX_CHAINS = {
+    MODE_SELECTION: ['^mode_educational$', '^mode_creative$', '^help$'],
+    EDUCATIONAL_TOPICS: ['^topic_', '^back_to_main$'],
+    EDUCATIONAL_CONTENT: ['^topic_', '^back_to_topics$', '^back_to_main$', '^mode_creative$'],
+    CREATIVE_INPUT: ['^target_', '^tech_', '^mode_creative$', '^back_to_main$'],
+}
+
+# Representative presses: (state, callback_data)
+SAMPLES = [
+    (MODE_SELECTION, 'mode_educational'),
+    (MODE_SELECTION, 'help'),
+    (EDUCATIONAL_TOPICS, 'topic_cursor_github'),
+    (EDUCATIONAL_TOPICS, 'back_to_main'),
+    (EDUCATIONAL_CONTENT, 'topic_railway'),
+    (EDUCATIONAL_CONTENT, 'mode_creative'),
+    (CREATIVE_INPUT, 'target_work'),
+    (CREATIVE_INPUT, 'tech_any'),
+    (CREATIVE_INPUT, 'back_to_main'),
+]
+
+
+def make_update(data: str) -> Update:
+    """Build an offline callback-query update."""
+    user = User(id=1, first_name="Bench", is_bot=False)
+    query = CallbackQuery(id="1", from_user=user, chat_instance="bench", data=data)
+    return Update(update_id=1, callback_query=query)
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    chains = {
+        state: [CallbackQueryHandler(_noop, pattern=pattern) for pattern in patterns]
+        for state, patterns in REGEX_CHAINS.items()
+    }
+    router = build_callback_router()
+    routed = {state: router.handler_for(state) for state in REGEX_CHAINS}
+    updates = [(state, make_update(data)) for state, data in SAMPLES]
+
+    def regex_chain():
+        for state, update in updates:
+            for handler in chains[state]:
+                if handler.check_update(update):
+                    break
+
+    def compiled_router():
+        for state, update in updates:
+            if routed[state].check_update(update):
+                router.resolve(state, update.callback_query.data)
+
+    per_press = iterations * len(updates)
+    regex_s = timeit.timeit(regex_chain, number=iterations)
+    router_s = timeit.timeit(compiled_router, number=iterations)
+
+    print(f"Presses per run:   {per_press}")
+    print(f"Regex chain:       {regex_s / per_press * 1e9:8.0f} ns/press")
+    print(f"Compiled router:   {router_s / per_press * 1e9:8.0f} ns/press")
+    print(f"Speedup:           {regex_s / router_s:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark: update throughput on the stock asyncio loop vs uvloop.
+
+Simulated users walk the educational flow concurrently against the fake Bot
+API (with injected per-call latency), so the loop juggles many in-flight
+updates like in production.
+
+Usage:
+    python benchmarks/bench_event_loop.py [users] [latency_ms]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Update
+
+from fake_bot import build_fake_application, callback_update, message_update
+
+FLOW = ["/start", "mode_educational", "topic_cursor", "topic_github", "topic_git", "back_to_main"]
+
+
+async def run_users(users: int, latency: float) -> float:
+    """Process every user's flow concurrently; return updates per second."""
+    application, _ = await build_fake_application(latency)
+    counter = iter(range(1, 10**9))
+
+    async def user_flow(user_id: int) -> None:
+        for step in FLOW:
+            update_id = next(counter)
+            raw = message_update(update_id, user_id, step) if step.startswith("/") \
+                else callback_update(update_id, user_id, step)
+            await application.process_update(Update.de_json(raw, application.bot))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user_flow(user_id) for user_id in range(1, users + 1)))
+    elapsed = time.perf_counter() - start
+    await application.shutdown()
+    return users * len(FLOW) / elapsed
+
+
+def main() -> None:
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 2.0) / 1000
+
+    with asyncio.Runner() as runner:
+        stock = runner.run(run_users(users, latency))
+    print(f"asyncio loop:  {stock:10.0f} updates/s")
+
+    try:
+        import uvloop
+    except ImportError:
+        print("uvloop:        not installed")
+        return
+
+    with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+        fast = runner.run(run_users(users, latency))
+    print(f"uvloop:        {fast:10.0f} updates/s ({fast / stock:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
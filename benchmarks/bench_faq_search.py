@@ -0,0 +1,50 @@
+"""Benchmark: FAQ index build time and query latency.
+
+Usage:
+    python benchmarks/bench_faq_search.py [queries]
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.handlers.faq_handler import build_faq_index
+
+QUESTIONS = [
+    "как установить гит",
+    "что такое курсор",
+    "как зарегистрироваться на гитхабе",
+    "не работает push permission denied",
+    "как задеплоить бота на railway",
+    "куда спрятать токен бота",
+    "чем git отличается от github",
+    "как связать курсор с гитхабом",
+    "как вернуть старую версию файла",
+    "какая погода завтра",
+]
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    start = time.perf_counter()
+    index = build_faq_index()
+    build = time.perf_counter() - start
+    print(f"build:   {build * 1000:8.2f} ms for {len(index.documents)} documents")
+
+    timings = []
+    for i in range(count):
+        query = QUESTIONS[i % len(QUESTIONS)]
+        start = time.perf_counter()
+        index.search(query, limit=1)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"search:  p50 {statistics.median(timings) * 1e6:6.1f} µs   "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e6:6.1f} µs   ({count} queries)")
+
+
+if __name__ == '__main__':
+    main()
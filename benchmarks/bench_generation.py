@@ -0,0 +1,122 @@
+"""Benchmark: single-call vs parallel per-idea generation.
+
+The real ``YandexGPTClient`` (prompts, parsing, validation, streaming of
+partial results) runs against a simulated model: each completion takes a
+time-to-first-token plus its output length divided by the generation speed,
+with log-normal jitter, and is billed prompt + output tokens (~3 characters
+per token, as ``usage_tokens`` estimates). Reports time to the first idea, to
+all ideas, and tokens per generation for each mode.
+
+Usage:
+    python benchmarks/bench_generation.py [runs] [tokens_per_second] [first_token_ms]
+"""
+
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.yandex_gpt import (
+    EXPAND_PROMPT,
+    GENERATION_PARALLEL,
+    GENERATION_SINGLE,
+    TITLES_PROMPT,
+    RateLimiter,
+    YandexGPTClient,
+)
+
+CONTEXT = {
+    "target_audience": "Для себя",
+    "problem": "Хочу вести список прочитанных книг и делиться им с друзьями",
+    "tech_preference": "Телеграм-бот",
+}
+
+TITLES = ["Книжный дневник в Телеграме", "Полка друзей", "Бот-рекомендатор книг"]
+
+
+def idea_block(number: int, title: str) -> str:
+    return f"""**Идея {number}: {title}**
+Бот хранит список прочитанных книг, оценки и короткие заметки. Список можно отправить другу одной ссылкой.
+
+Решает: Прочитанное забывается, а советовать книги друзьям неудобно
+Технологии: Python, python-telegram-bot, SQLite, Railway
+Первые шаги:
+1. Создать бота через BotFather и получить токен
+2. Написать команды добавления книги и просмотра списка
+3. Сохранить данные в SQLite и задеплоить бота на Railway
+"""
+
+
+class SimulatedClient(YandexGPTClient):
+    """Client whose completion call is a simulated model run."""
+
+    def __init__(self, mode: str, tokens_per_second: float, first_token: float):
+        super().__init__("fake-key", "fake-folder", rate_limiter=RateLimiter(10**6, 10**6), generation_mode=mode)
+        self.tokens_per_second = tokens_per_second
+        self.first_token = first_token
+        self.tokens = 0
+
+    async def complete(self, system_prompt, user_prompt, max_tokens, temperature, admission=None):
+        if system_prompt == TITLES_PROMPT:
+            text = "\n".join(f"{i}. {title}" for i, title in enumerate(TITLES, 1))
+        elif system_prompt == EXPAND_PROMPT:
+            text = idea_block(1, user_prompt.split("НАЗВАНИЕ ИДЕИ: ", 1)[1].split("\n", 1)[0])
+        else:
+            text = "\n".join(idea_block(i, title) for i, title in enumerate(TITLES, 1))
+        output_tokens = len(text) // 3
+        jitter = random.lognormvariate(0, 0.25)
+        await asyncio.sleep((self.first_token + output_tokens / self.tokens_per_second) * jitter)
+        tokens = (len(system_prompt) + len(user_prompt)) // 3 + output_tokens
+        self.tokens += tokens
+        if admission is not None:
+            self.admission.settle(admission, tokens)
+        return text, None
+
+
+async def generate_once(client: SimulatedClient, user_id: int) -> tuple:
+    """(seconds to first idea, seconds to all ideas) for one generation."""
+    start = time.perf_counter()
+    first = []
+
+    async def on_partial(partial: dict) -> None:
+        if not first:
+            first.append(time.perf_counter() - start)
+
+    result = await client.generate_ideas(user_id, CONTEXT, on_partial=on_partial)
+    total = time.perf_counter() - start
+    assert result.get("success") and len(result["ideas"]) == len(TITLES), result
+    return (first[0] if first else total), total
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run_mode(mode: str, runs: int, tokens_per_second: float, first_token: float) -> None:
+    client = SimulatedClient(mode, tokens_per_second, first_token)
+    timings = await asyncio.gather(*(generate_once(client, user_id) for user_id in range(runs)))
+    first = [t[0] for t in timings]
+    total = [t[1] for t in timings]
+    print(f"{mode:8}  first idea p50 {statistics.median(first):5.2f}s p95 {percentile(first, 0.95):5.2f}s   "
+          f"all ideas p50 {statistics.median(total):5.2f}s p95 {percentile(total, 0.95):5.2f}s   "
+          f"{client.tokens / runs:5.0f} tokens/generation")
+
+
+async def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    tokens_per_second = float(sys.argv[2]) if len(sys.argv) > 2 else 60
+    first_token = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.4
+    random.seed(1)
+    print(f"{runs} generations per mode, {tokens_per_second:.0f} tokens/s, "
+          f"{first_token * 1000:.0f} ms to first token, ±25% jitter per call")
+    for mode in (GENERATION_SINGLE, GENERATION_PARALLEL):
+        await run_mode(mode, runs, tokens_per_second, first_token)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,154 @@
+"""Benchmark: logging overhead per update, synchronous handler vs the queue pipeline.
+
+Users walk the creative flow (4 updates each, GPT answers instantly) through
+the real handlers. What logging costs the event loop is the time spent in
+the log handlers on the loop thread (``Logger.callHandlers``, timed per
+update); the queue listener's writes happen on its own thread and are not
+counted. Wall time per update is shown next to it; it also includes the
+listener competing for the GIL, and run-to-run noise of the same order as
+the handler time at ``sink_ms`` 0. ``sink_ms`` makes every write to the log
+stream take that long, like stderr piped into a slow or backed-up log
+collector.
+
+Usage:
+    python benchmarks/bench_logging.py [users] [sink_ms]
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Update
+
+from fake_bot import build_fake_application, callback_update, fake_gpt_client, message_update
+import main as _bot  # noqa: F401 - installs the bot's logging on import; configure() replaces it
+from src.handlers import creative_handler
+from src.utils.log_pipeline import TEXT_FORMAT, setup_logging
+
+
+class SlowSink:
+    """Write-only stream where every write blocks for ``delay`` seconds."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._null = open(os.devnull, "w")
+
+    def write(self, data: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        return self._null.write(data)
+
+    def flush(self) -> None:
+        self._null.flush()
+
+
+class HandlerTimer:
+    """Accumulates the time loggers spend in their handlers on the calling thread."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self._call_handlers = logging.Logger.callHandlers
+
+    def __enter__(self):
+        call_handlers = self._call_handlers
+
+        def timed(logger, record):
+            start = time.perf_counter()
+            call_handlers(logger, record)
+            self.seconds += time.perf_counter() - start
+
+        logging.Logger.callHandlers = timed
+        return self
+
+    def __exit__(self, *exc):
+        logging.Logger.callHandlers = self._call_handlers
+
+
+def configure(mode: str, level: str, sink: SlowSink):
+    """Install one logging setup; returns the queue listener, if any."""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    if mode == "off":
+        root.setLevel(logging.CRITICAL + 1)
+        return None
+    if mode == "sync text":
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(getattr(logging, level))
+        return None
+    return setup_logging(level, mode.split()[1], stream=sink)
+
+
+async def run(users: int) -> tuple:
+    """(wall seconds, seconds in log handlers) per update for the creative flow of ``users`` users."""
+    creative_handler.gpt_client = fake_gpt_client()
+    creative_handler.gpt_client.rate_limiter.requests_per_hour = 10**6
+    creative_handler.gpt_client.rate_limiter.requests_per_day = 10**6
+    application, _ = await build_fake_application()
+    counter = iter(range(1, 10**9))
+    steps = ("mode_creative", "target_self", "Хочу сайт для книжного клуба", "tech_any")
+
+    with HandlerTimer() as timer:
+        start = time.perf_counter()
+        for user_id in range(1, users + 1):
+            for step in steps:
+                raw = callback_update(next(counter), user_id, step) if "_" in step \
+                    else message_update(next(counter), user_id, step)
+                await application.process_update(Update.de_json(raw, application.bot))
+        elapsed = time.perf_counter() - start
+    await application.shutdown()
+    updates = users * len(steps)
+    return elapsed / updates, timer.seconds / updates
+
+
+def disabled_debug_call() -> None:
+    """Cost of a debug call below the log level: f-string vs lazy %-args."""
+    logger = logging.getLogger("bench")
+    logger.setLevel(logging.INFO)
+    idea = {"steps": ["a", "b"], "title": "Бот для книжного клуба"}
+    number = 200000
+    eager = timeit.timeit(lambda: logger.debug(f"Idea {idea['title']} has {len(idea['steps'])} steps"),
+                          number=number) / number
+    lazy = timeit.timeit(lambda: logger.debug("Idea %s has %d steps", idea['title'], len(idea['steps'])),
+                         number=number) / number
+    print(f"disabled debug call: f-string {eager * 1e9:.0f} ns, lazy {lazy * 1e9:.0f} ns")
+
+
+def main() -> None:
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    sink_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    disabled_debug_call()
+    configure("off", "INFO", SlowSink(0))
+    asyncio.run(run(users))  # warm-up: imports, caches, first-call costs
+    modes = ("off", "sync text", "queue text", "queue json")
+    print(f"{'':<17}" + "".join(f"{mode:>24}" for mode in modes))
+    print(f"{'':<17}" + f"{'wall / in handlers, µs per update':>96}")
+    for level in ("INFO", "DEBUG"):
+        for delay in (0.0, sink_ms / 1000):
+            sink = SlowSink(delay)
+            results = {mode: [] for mode in modes}
+            # Modes are interleaved so drift in machine load hits them alike
+            for _ in range(3):
+                for mode in modes:
+                    listener = configure(mode, level, sink)
+                    results[mode].append(asyncio.run(run(users)))
+                    if listener is not None:
+                        listener.stop()
+            cells = ""
+            for mode in modes:
+                wall = min(result[0] for result in results[mode])
+                handlers = min(result[1] for result in results[mode])
+                cells += f"{wall * 1e6:>14.0f} / {handlers * 1e6:>7.1f}"
+            print(f"{level:<6} sink {delay * 1000:4.1f} ms" + cells)
+
+
+if __name__ == '__main__':
+    main()
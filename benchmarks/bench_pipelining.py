@@ -0,0 +1,111 @@
+"""Benchmark: per-press latency with sequential vs pipelined Bot API calls.
+
+One user walks the menus and the creative flow through the bot's real
+handlers; every Bot API call takes ``latency_ms`` (fake transport) and a GPT
+generation ``gpt_latency_s``. Updates are processed one at a time, as the
+application does by default, so a press's latency is also how long it holds
+up the next update.
+
+"sequential" reproduces the old handlers, which awaited each call before
+starting the next: Bot API calls and the GPT call go through one FIFO lock in
+the order they are issued. "pipelined" is the handlers as they are.
+
+Usage:
+    python benchmarks/bench_pipelining.py [rounds] [latency_ms] [gpt_latency_s]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Update
+
+from fake_bot import FakeBotRequest, build_fake_application, callback_update, fake_gpt_client, message_update
+from src.handlers import creative_handler
+
+# (label, press); presses without "_" are text messages
+FLOW = [
+    ("educational menu", "mode_educational"),
+    ("topic", "topic_cursor"),
+    ("back to topics", "back_to_topics"),
+    ("back to main", "back_to_main"),
+    ("history", "history_0"),
+    ("creative menu", "mode_creative"),
+    ("question 1", "target_self"),
+    ("question 2 (text)", "Хочу бота для книжного клуба"),
+    ("question 3 + GPT", "tech_any"),
+    ("all ideas", "ideas_all"),
+    ("regenerate + GPT", "ideas_regenerate"),
+]
+
+
+class SerialFakeRequest(FakeBotRequest):
+    """Fake transport whose calls run one at a time, in the order they were issued."""
+
+    def __init__(self, latency: float, lock: asyncio.Lock):
+        super().__init__(latency)
+        self.lock = lock
+
+    async def do_request(self, *args, **kwargs):
+        async with self.lock:
+            return await super().do_request(*args, **kwargs)
+
+
+async def run(rounds: int, latency: float, gpt_latency: float, sequential: bool) -> tuple:
+    """(per-press latencies {label: [seconds, ...]}, Bot API calls per round)."""
+    lock = asyncio.Lock()
+    request = SerialFakeRequest(latency, lock) if sequential else FakeBotRequest(latency)
+    application, _ = await build_fake_application(request=request)
+
+    client = fake_gpt_client(gpt_latency)
+    client.rate_limiter.requests_per_hour = client.rate_limiter.requests_per_day = 10**6
+    generate_ideas = client.generate_ideas
+
+    async def serial_generate(*args, **kwargs):
+        async with lock:
+            return await generate_ideas(*args, **kwargs)
+
+    if sequential:
+        client.generate_ideas = serial_generate
+    creative_handler.gpt_client = client
+
+    latencies = defaultdict(list)
+    update_id = 0
+    for _ in range(rounds):
+        for label, press in FLOW:
+            update_id += 1
+            raw = callback_update(update_id, 7, press) if "_" in press else message_update(update_id, 7, press)
+            start = time.perf_counter()
+            await application.process_update(Update.de_json(raw, application.bot))
+            latencies[label].append(time.perf_counter() - start)
+    await application.shutdown()
+    return latencies, len(request.calls) / rounds
+
+
+async def main() -> None:
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.08
+    gpt_latency = float(sys.argv[3]) if len(sys.argv) > 3 else 1.5
+
+    sequential, calls_before = await run(rounds, latency, gpt_latency, sequential=True)
+    pipelined, calls_after = await run(rounds, latency, gpt_latency, sequential=False)
+
+    print(f"{rounds} rounds, {latency * 1000:.0f} ms per Bot API call, {gpt_latency:.1f} s per generation "
+          f"({calls_before:.0f} / {calls_after:.0f} Bot API calls per round)")
+    print(f"{'press':<20} {'sequential':>12} {'pipelined':>12}")
+    for label, _ in FLOW:
+        before = statistics.median(sequential[label]) * 1000
+        after = statistics.median(pipelined[label]) * 1000
+        print(f"{label:<20} {before:9.0f} ms {after:9.0f} ms")
+    total_before = sum(map(sum, sequential.values())) / rounds
+    total_after = sum(map(sum, pipelined.values())) / rounds
+    print(f"{'whole flow':<20} {total_before:10.2f} s {total_after:10.2f} s")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""Benchmark: memory per user for session state, before and after idle eviction.
+
+Fills the bot's Application with N users paused at question 3 of the
+creative flow (answers collected, conversation in CREATIVE_INPUT) and
+measures traced allocations per user for the old dict layout and for
+``UserSession``, then ages everyone past the idle timeout and sweeps.
+
+Usage:
+    python benchmarks/bench_sessions.py [users]
+"""
+
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bot import build_fake_application
+
+CREATIVE_INPUT = 4
+AUDIENCE = "Для работы/организации"
+
+
+def problem_text(user_id: int) -> str:
+    return f"Нужна автоматизация отчетов для библиотеки №{user_id}"
+
+
+def measure(fill) -> float:
+    """Bytes allocated (and still alive) by fill()."""
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = fill()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    del keep
+    return after - before
+
+
+def fill_legacy(users: int):
+    """Pre-session layout: user_data dict holding a nested creative_context dict."""
+    user_data = defaultdict(dict)
+    conversations = {}
+    for user_id in range(1, users + 1):
+        data = user_data[user_id]
+        data['creative_context'] = {}
+        data['creative_step'] = 1
+        data['creative_context']['target_audience'] = AUDIENCE
+        data['creative_step'] = 2
+        data['creative_context']['problem'] = problem_text(user_id)
+        data['creative_step'] = 3
+        conversations[(user_id, user_id)] = CREATIVE_INPUT
+    return user_data, conversations
+
+
+async def run(users: int) -> None:
+    application, _ = await build_fake_application()
+    conv_handler = application.handlers[0][0]
+    sweeper = application.bot_data["session_sweeper"]
+
+    def fill_sessions():
+        # Same containers PTB fills while processing updates
+        for user_id in range(1, users + 1):
+            session = application._user_data[user_id]
+            session.start_creative()
+            session.target_audience = AUDIENCE
+            session.creative_step = 2
+            session.problem = problem_text(user_id)
+            session.creative_step = 3
+            conv_handler._conversations[(user_id, user_id)] = CREATIVE_INPUT
+
+    tracemalloc.start()
+    legacy = measure(lambda: fill_legacy(users))
+    active = measure(fill_sessions)
+
+    def evict():
+        for session in application.user_data.values():
+            session.last_seen -= sweeper.idle_timeout + 1
+        start = time.perf_counter()
+        evicted = sweeper.sweep()
+        print(f"sweep:            {(time.perf_counter() - start) * 1000:8.1f} ms for {evicted} users")
+        # The conversations end through conversation_timeout (JobQueue jobs), not run here
+        conv_handler._conversations.clear()
+
+    idle = active + measure(evict)
+    tracemalloc.stop()
+    await application.shutdown()
+
+    print(f"dict layout:      {legacy / users:8.0f} bytes/active user")
+    print(f"UserSession:      {active / users:8.0f} bytes/active user ({legacy / active:.2f}x smaller)")
+    print(f"after eviction:   {idle / users:8.0f} bytes/idle user")
+
+
+def main() -> None:
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    asyncio.run(run(users))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark: perceived generation latency with and without speculative prefetch.
+
+Users walk the creative flow; after question 2 they spend ``think`` seconds
+before picking a project type. Perceived latency is the time from that last
+button press until the ideas are shown. GPT calls take ``latency`` seconds.
+
+Usage:
+    python benchmarks/bench_speculation.py [users] [gpt_latency_s] [think_s]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Update
+
+from fake_bot import build_fake_application, callback_update, fake_gpt_client, message_update
+from src.handlers import creative_handler
+
+
+async def run(users: int, latency: float, think: float, speculate: bool, choice: str) -> tuple:
+    """Return (median perceived latency, GPT calls per user)."""
+    creative_handler.SPECULATIVE_PREFETCH = speculate
+    creative_handler.prefetcher.budget_per_hour = creative_handler.prefetcher._tokens = users
+    creative_handler.prefetcher.max_in_flight = users
+    creative_handler.gpt_client = client = fake_gpt_client(latency)
+    application, _ = await build_fake_application()
+    counter = iter(range(1, 10**9))
+    perceived = []
+
+    async def send(user_id: int, step: str) -> None:
+        raw = callback_update(next(counter), user_id, step) if "_" in step \
+            else message_update(next(counter), user_id, step)
+        await application.process_update(Update.de_json(raw, application.bot))
+
+    async def user_flow(user_id: int) -> None:
+        for step in ("mode_creative", "target_self", f"Проблема пользователя {user_id}"):
+            await send(user_id, step)
+        await asyncio.sleep(think)
+        start = time.perf_counter()
+        await send(user_id, choice)
+        perceived.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(user_flow(user_id) for user_id in range(1, users + 1)))
+    await application.shutdown()
+    return statistics.median(perceived), len(client.calls) / users
+
+
+def main() -> None:
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    think = float(sys.argv[3]) if len(sys.argv) > 3 else 2.0
+
+    cases = [
+        ("no prefetch", False, "tech_any"),
+        ("prefetch, predicted", True, "tech_any"),
+        ("prefetch, mispredicted", True, "tech_web"),
+    ]
+    for name, speculate, choice in cases:
+        median, calls = asyncio.run(run(users, latency, think, speculate, choice))
+        print(f"{name:<24} perceived {median:6.2f} s   GPT calls/user {calls:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark: cold-start cost (import time and time to first processed update).
+
+Each run is a fresh interpreter so nothing is warm. Reports the median over runs.
+
+Usage:
+    python benchmarks/bench_startup.py [runs]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def child() -> None:
+    """Single cold start, measured from interpreter start of this process."""
+    start = time.perf_counter()
+
+    sys.path.insert(0, os.path.dirname(HERE))
+    sys.path.insert(0, HERE)
+    import main  # noqa: F401
+    imported = time.perf_counter()
+
+    import asyncio
+    from telegram import Update
+    from fake_bot import build_fake_application, message_update
+
+    async def first_update() -> None:
+        application, _ = await build_fake_application()
+        await application.process_update(Update.de_json(message_update(1, 42, "/start"), application.bot))
+        await application.shutdown()
+
+    asyncio.run(first_update())
+    done = time.perf_counter()
+
+    print(json.dumps({
+        "import_ms": (imported - start) * 1000,
+        "first_update_ms": (done - start) * 1000,
+        "aiohttp_loaded": "aiohttp" in sys.modules,
+    }))
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    env = dict(os.environ, YANDEX_GPT_API_KEY="", YANDEX_FOLDER_ID="", LOG_LEVEL="WARNING")
+
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, __file__, "--child"], env=env, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"Runs:                  {runs}")
+    print(f"Import main:           {statistics.median(r['import_ms'] for r in results):8.1f} ms")
+    print(f"First update handled:  {statistics.median(r['first_update_ms'] for r in results):8.1f} ms")
+    print(f"aiohttp loaded:        {any(r['aiohttp_loaded'] for r in results)}")
+
+
+if __name__ == '__main__':
+    if "--child" in sys.argv:
+        child()
+    else:
+        main()
@@ -0,0 +1,58 @@
+"""Benchmark: memory cost of an additional tenant.
+
+Builds ``tenants`` bots the way ``main.py`` does in multi-tenant mode (real
+handlers, router, session sweeper, broadcaster and HTTPX transports; nothing
+is sent) and compares the memory each extra bot adds with the resident size
+of a process running one bot, i.e. what every library costs when each runs
+its own process. The bots are idle: user sessions come on top, the same in
+either setup.
+
+Usage:
+    python benchmarks/bench_tenants.py [tenants]
+"""
+
+import gc
+import os
+import resource
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    from main import build_tenant_application
+    from src.utils.tenants import Tenant
+    import src.utils.yandex_gpt  # noqa: F401 - loaded by the first GPT call in a real process
+
+    tls_context = httpx.create_ssl_context()
+    applications = [build_tenant_application(Tenant("t0", "100000:TENANT0"), tls_context)]
+    gc.collect()
+    single = rss_mb()
+
+    for i in range(1, count):
+        applications.append(build_tenant_application(Tenant(f"t{i}", f"{100000 + i}:TENANT{i}"), tls_context))
+    gc.collect()
+    total = rss_mb()
+    per_tenant = (total - single) / (count - 1)
+
+    print(f"one bot per process:  {single:6.1f} MB RSS")
+    print(f"{count} bots in one process: {total:6.1f} MB RSS "
+          f"(vs {single * count:.0f} MB as {count} processes)")
+    print(f"per additional tenant: {per_tenant:6.2f} MB RSS -> {per_tenant / single * 100:.1f}% of a full process")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark: Bot API send pool size vs burst latency over real HTTP.
+
+Bursts of ``burst`` concurrent sendMessage calls go through the production
+transport (``transport.build_request``: HTTPX pool, timeouts, metrics) to the
+fake Bot API server (in its own process), which answers after
+``latency_ms``, once for each send pool size. Reports per-call latency, the
+time calls waited for a pooled connection and the connections opened (from
+the transport's own metrics) and the bot process's CPU time per call: a
+bigger pool is not free, httpcore's bookkeeping per call grows with the
+number of connections and queued calls.
+
+Usage:
+    python benchmarks/bench_transport.py [burst] [latency_ms] [bursts]
+"""
+
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Bot
+
+from src.utils import transport
+from src.utils.transport import BOT_API_CONNECTIONS, BOT_API_POOL_WAIT, api_urls, build_request
+
+POOL_SIZES = (4, 16, 32, 64, 256)
+
+
+async def run(pool_size: int, burst: int, bursts: int) -> None:
+    pool = f"bench{pool_size}"
+    base_url, base_file_url = api_urls()
+    # A long pool timeout: a small pool queues calls instead of failing them
+    transport.POOL_TIMEOUT = 60.0
+    bot = Bot("123456:FAKE", base_url=base_url, base_file_url=base_file_url,
+              request=build_request(pool, pool_size))
+    latencies = []
+
+    async def send(chat_id: int) -> None:
+        start = time.perf_counter()
+        await bot.send_message(chat_id, "📣 Мастер-класс в субботу!")
+        latencies.append(time.perf_counter() - start)
+
+    async with bot:
+        started, cpu_started = time.perf_counter(), time.process_time()
+        for _ in range(bursts):
+            await asyncio.gather(*(send(chat_id) for chat_id in range(1, burst + 1)))
+        elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+
+    latencies.sort()
+    wait = BOT_API_POOL_WAIT.labels(pool)
+    print(f"pool {pool_size:4}   p50 {statistics.median(latencies) * 1000:7.1f} ms   "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.1f} ms   "
+          f"pool wait avg {wait.sum / wait.count * 1000:7.1f} ms   "
+          f"{len(latencies) / elapsed:5.0f} calls/s   CPU {cpu / len(latencies) * 1000:5.2f} ms/call   "
+          f"{BOT_API_CONNECTIONS.labels(pool).value:3.0f} connections")
+
+
+async def main() -> None:
+    burst = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+    bursts = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_bot_api.py"),
+        str(port), str(latency * 1000), stdout=asyncio.subprocess.PIPE
+    )
+    await server.stdout.readline()  # Listening
+    transport.API_URL = f"http://127.0.0.1:{port}"
+    print(f"{bursts} bursts of {burst} concurrent sends, {latency * 1000:.0f} ms per call, "
+          f"HTTP/{transport.http_version()}")
+    try:
+        for pool_size in POOL_SIZES:
+            await run(pool_size, burst, bursts)
+    finally:
+        server.terminate()
+        await server.wait()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
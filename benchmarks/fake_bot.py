@@ -0,0 +1,195 @@
+"""In-process fake Telegram Bot API for benchmarks.
+
+``FakeBotRequest`` plugs into ``ApplicationBuilder.request()`` and answers
+every Bot API method with a canned success payload after an optional
+injected latency. Helpers build raw update dicts for messages and button
+presses.
+"""
+
+import asyncio
+import json
+import os
+import sys
+from typing import Callable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram.ext import Application
+from telegram.request import BaseRequest
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "DigiLib", "username": "digilib_bot"}
+
+
+class FakeBotRequest(BaseRequest):
+    """Bot API transport that never leaves the process."""
+
+    def __init__(self, latency: float = 0.0):
+        """Initialize fake transport.
+
+        Args:
+            latency: Seconds to sleep before answering each call
+        """
+        self.latency = latency
+        self.calls: List[str] = []
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return 5.0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_request(self, url, method, request_data=None, *args, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        self.calls.append(api_method)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        return 200, json.dumps({"ok": True, "result": fake_result(api_method, request_data.parameters
+                                                                   if request_data else {})}).encode()
+
+
+
+class RecordingRequest(FakeBotRequest):
+    """Fake transport that also keeps the text of every message sent or edited (and callback answer)."""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(latency)
+        self.texts: List[str] = []
+
+    async def do_request(self, url, method, request_data=None, *args, **kwargs):
+        if request_data is not None and "text" in request_data.parameters:
+            self.texts.append(request_data.parameters["text"])
+        return await super().do_request(url, method, request_data, *args, **kwargs)
+
+def fake_result(api_method: str, params: dict):
+    """Canned ``result`` of a successful Bot API call."""
+    if api_method == "getMe":
+        return BOT_USER
+    if api_method in ("sendMessage", "editMessageText"):
+        return {
+            "message_id": params.get("message_id", 100),
+            "date": 0,
+            "chat": {"id": params.get("chat_id", 1), "type": "private"},
+            "text": params.get("text", ""),
+        }
+    if api_method == "getUpdates":
+        return []
+    return True
+
+
+# A well-formed completion, parsed by the real YandexGPTClient.process_response
+CANNED_COMPLETION = """**Идея 1: Бот для книжного клуба**
+Телеграм-бот напоминает о встречах и собирает голоса за следующую книгу.
+
+Решает: Участники забывают о встречах
+Технологии: Python, python-telegram-bot, Railway
+Первые шаги:
+1. Создать бота через BotFather
+2. Написать команды расписания
+3. Задеплоить на Railway
+
+**Идея 2: Каталог клуба**
+Простой сайт со списком прочитанных книг и отзывами участников.
+
+Решает: История клуба нигде не собрана
+Технологии: GitHub Pages, Markdown
+Первые шаги:
+1. Создать репозиторий
+2. Описать первые книги
+3. Включить GitHub Pages
+"""
+
+
+def fake_gpt_client(latency: float = 0.0, script: Optional[Callable[[int], Tuple[float, str]]] = None):
+    """YandexGPTClient whose completion call is replaced by a sleep and a canned answer.
+
+    Rate limiting, quota charging and response parsing are the real ones.
+
+    Args:
+        latency: Seconds each completion takes
+        script: Optional ``script(user_id) -> (seconds, outcome)`` overriding the
+            latency per call; outcomes other than "success" are returned as errors
+    """
+    from src.utils.yandex_gpt import YandexGPTClient
+
+    class FakeGPTClient(YandexGPTClient):
+        async def generate_ideas(self, user_id, context, charge=True, on_partial=None):
+            allowed, error_msg = self.rate_limiter.can_request(user_id)
+            if not allowed:
+                return {"error": "rate_limit", "message": error_msg}
+            self.calls.append(dict(context))
+            seconds, outcome = script(user_id) if script else (latency, "success")
+            await asyncio.sleep(seconds)
+            if outcome != "success":
+                return {"error": outcome, "message": "❌ Ошибка API. Попробуй позже."}
+            processed = self.process_response(CANNED_COMPLETION)
+            if processed.get("success") and charge:
+                self.rate_limiter.record_request(user_id)
+            return processed
+
+    client = FakeGPTClient("fake-key", "fake-folder")
+    client.calls = []
+    return client
+
+
+def message_update(update_id: int, user_id: int, text: str) -> dict:
+    """Raw update for a text message (commands get a bot_command entity)."""
+    message = {
+        "message_id": update_id,
+        "date": 0,
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+        "text": text,
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+def callback_update(update_id: int, user_id: int, data: str) -> dict:
+    """Raw update for an inline button press."""
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "from": {"id": user_id, "is_bot": False, "first_name": "User"},
+            "message": {
+                "message_id": 100,
+                "date": 0,
+                "chat": {"id": user_id, "type": "private"},
+                "text": "menu",
+            },
+        },
+    }
+
+
+async def build_fake_application(latency: float = 0.0, application_class=Application, tenant=None,
+                                 request: Optional[FakeBotRequest] = None):
+    """Build and initialize the bot's Application on top of FakeBotRequest.
+
+    Args:
+        latency: Seconds each Bot API call takes
+        application_class: Application subclass to build
+        tenant: Optional ``Tenant`` the bot serves (its token is used)
+        request: Fake transport to use instead of a plain ``FakeBotRequest(latency)``
+    """
+    from main import build_application
+
+    request = request or FakeBotRequest(latency)
+    builder = (
+        Application.builder()
+        .token(tenant.token if tenant else "123456:FAKE")
+        .application_class(application_class)
+        .request(request)
+        .get_updates_request(FakeBotRequest())
+        .updater(None)
+    )
+    application = build_application(builder, tenant)
+    await application.initialize()
+    return application, request
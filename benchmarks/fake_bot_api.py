@@ -0,0 +1,126 @@
+"""Stand-in Bot API HTTP server for tests and benchmarks.
+
+Speaks enough of the Bot API over real HTTP/1.1 (keep-alive, form or JSON
+bodies) for the bot's production transport: every method answers the canned
+success payload of ``fake_bot.fake_result`` after ``latency`` seconds, and
+``getUpdates`` holds the long poll for up to ``poll_seconds`` and returns no
+updates. Point the bot at it like at a self-hosted Bot API server:
+
+    python benchmarks/fake_bot_api.py 8081 80
+    TELEGRAM_API_URL=http://127.0.0.1:8081 TELEGRAM_BOT_TOKEN=123456:FAKE python main.py
+
+Usage:
+    python benchmarks/fake_bot_api.py [port] [latency_ms]
+"""
+
+import asyncio
+import json
+import os
+import sys
+from typing import Dict, Optional
+from urllib.parse import parse_qsl
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_bot import fake_result
+
+
+def _decode_value(value: str):
+    # Bot API form fields carry JSON for everything but plain strings
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+class FakeBotAPIServer:
+    """Bot API server answering every call with a canned success after a delay."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, poll_seconds: float = 1.0):
+        """Initialize server (nothing listens until start()).
+
+        Args:
+            host: Interface to bind
+            port: TCP port (0 = any free port, see ``url`` after start())
+            latency: Seconds before each answer
+            poll_seconds: Longest time a getUpdates call is held
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.poll_seconds = poll_seconds
+        self.calls: Dict[str, int] = {}
+        self.connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        """Server root for TELEGRAM_API_URL / ``transport.API_URL``."""
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self) -> None:
+        # Bursts open hundreds of connections at once
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    return
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                path = request_line.decode("latin-1").split()[1].split("?", 1)[0]
+                api_method = path.rsplit("/", 1)[-1]
+                if headers.get("content-type", "").startswith("application/json"):
+                    params = json.loads(body or b"{}")
+                else:
+                    params = {key: _decode_value(value) for key, value in parse_qsl(body.decode("utf-8"))}
+                self.calls[api_method] = self.calls.get(api_method, 0) + 1
+
+                if api_method == "getUpdates":
+                    await asyncio.sleep(min(float(params.get("timeout", 0)), self.poll_seconds) + self.latency)
+                elif self.latency:
+                    await asyncio.sleep(self.latency)
+                payload = json.dumps({"ok": True, "result": fake_result(api_method, params)}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode("latin-1")
+                    + payload
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass  # Client went away, or the server is stopping during a long poll
+        finally:
+            writer.close()
+
+
+async def main() -> None:
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8081
+    latency = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+    server = FakeBotAPIServer(port=port, latency=latency, poll_seconds=10.0)
+    await server.start()
+    print(f"Fake Bot API on {server.url} ({latency * 1000:.0f} ms per call) - Ctrl+C to stop", flush=True)
+    await asyncio.Event().wait()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,179 @@
+"""Replay a recorded traffic log against the bot with fake Telegram and GPT backends.
+
+Updates from a ``TRAFFIC_RECORD_PATH`` recording are put on the update queue
+of the Application built by ``main.build_application`` at their recorded
+times (divided by ``--speed``), so bursts and pauses look like production.
+Each user's GPT calls take the recorded durations (also scaled) and end with
+the recorded outcomes. The report gives throughput and per-update latency,
+measured from arrival on the queue to the end of processing, so queueing
+delay counts. Save it with ``--json`` and pass it to a later run with
+``--compare`` to diff two versions.
+
+Usage:
+    python benchmarks/replay_traffic.py RECORDING [--speed 10] [--bot-latency-ms 50]
+        [--json report.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Deque, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from telegram import Update
+
+from fake_bot import build_fake_application, callback_update, fake_gpt_client, message_update
+from src.handlers import creative_handler
+from src.utils.callback_router import parse_callback_data
+from src.utils.tracing import TracedApplication
+from src.utils.traffic_recorder import read_records
+
+
+def load_recording(path: str) -> Tuple[List[list], Dict[int, Deque[Tuple[float, str]]]]:
+    """Split a recording into a timeline of updates and per-user GPT call scripts.
+
+    Sessions (one per recorded process run) are laid end to end.
+    """
+    updates, gpt_calls = [], collections.defaultdict(collections.deque)
+    offset = last = 0.0
+    for record in read_records(path):
+        t, kind = record[0], record[1]
+        if kind == "s":
+            offset = last + 1.0 if updates else 0.0
+            continue
+        last = offset + t
+        if kind in ("m", "c"):
+            updates.append([last, kind, record[2], record[3]])
+        elif kind == "g":
+            gpt_calls[record[2]].append((record[3], record[4]))
+    return updates, gpt_calls
+
+
+def update_group(kind: str, payload: str) -> str:
+    """Report bucket for an update: command, text or callback namespace."""
+    if kind == "c":
+        return f"callback:{parse_callback_data(payload)[0]}"
+    return payload if payload.startswith("/") else "text"
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "p50_ms": round(pick(0.50) * 1000, 1),
+        "p90_ms": round(pick(0.90) * 1000, 1),
+        "p99_ms": round(pick(0.99) * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+async def replay(path: str, speed: float, bot_latency: float) -> Dict:
+    updates, gpt_calls = load_recording(path)
+    if not updates:
+        raise SystemExit(f"No updates in {path}")
+    durations = [seconds for calls in gpt_calls.values() for seconds, _ in calls]
+    default_call = (statistics.median(durations) if durations else 1.0, "success")
+
+    def gpt_script(user_id: int) -> Tuple[float, str]:
+        calls = gpt_calls.get(user_id)
+        seconds, outcome = calls.popleft() if calls else default_call
+        return seconds / speed, outcome
+
+    arrived: Dict[int, float] = {}
+    finished: Dict[int, float] = {}
+
+    class ReplayApplication(TracedApplication):
+        async def process_update(self, update: object) -> None:
+            try:
+                await super().process_update(update)
+            finally:
+                finished[update.update_id] = time.perf_counter()
+
+    creative_handler.gpt_client = fake_gpt_client(script=gpt_script)
+    application, request = await build_fake_application(bot_latency, ReplayApplication)
+    await application.start()
+
+    start = time.perf_counter()
+    for update_id, (t, kind, user_id, payload) in enumerate(updates, 1):
+        delay = start + t / speed - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        raw = callback_update(update_id, user_id, payload) if kind == "c" \
+            else message_update(update_id, user_id, payload)
+        arrived[update_id] = time.perf_counter()
+        await application.update_queue.put(Update.de_json(raw, application.bot))
+
+    while len(finished) < len(updates):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    await application.stop()
+    await application.shutdown()
+
+    by_group = collections.defaultdict(list)
+    for update_id, (_, kind, _, payload) in enumerate(updates, 1):
+        latency = finished[update_id] - arrived[update_id]
+        by_group["all"].append(latency)
+        by_group[update_group(kind, payload)].append(latency)
+
+    return {
+        "recording": os.path.basename(path),
+        "speed": speed,
+        "updates": len(updates),
+        "users": len({user_id for _, _, user_id, _ in updates}),
+        "gpt_calls": len(creative_handler.gpt_client.calls),
+        "bot_api_calls": len(request.calls),
+        "duration_s": round(elapsed, 2),
+        "throughput_per_s": round(len(updates) / elapsed, 1),
+        "latency": {group: percentiles(values) for group, values in sorted(by_group.items())},
+    }
+
+
+def print_report(report: Dict, baseline: Dict = None) -> None:
+    print(f"{report['updates']} updates from {report['users']} users at {report['speed']}x: "
+          f"{report['duration_s']} s, {report['throughput_per_s']} updates/s, "
+          f"{report['gpt_calls']} GPT calls, {report['bot_api_calls']} Bot API calls")
+    header = f"{'group':<24}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header + ("   p90 vs baseline" if baseline else ""))
+    for group, stats in report["latency"].items():
+        line = f"{group:<24}{stats['count']:>7}{stats['p50_ms']:>10}{stats['p90_ms']:>10}" \
+               f"{stats['p99_ms']:>10}{stats['max_ms']:>10}"
+        old = (baseline or {}).get("latency", {}).get(group)
+        if old and old["p90_ms"]:
+            line += f"   {(stats['p90_ms'] - old['p90_ms']) / old['p90_ms']:+.0%}"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded traffic against the bot")
+    parser.add_argument("recording", help="File written with TRAFFIC_RECORD_PATH")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time compression factor (>0)")
+    parser.add_argument("--bot-latency-ms", type=float, default=50.0, help="Fake Bot API latency")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--compare", help="Baseline report (from --json) to compare with")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    report = asyncio.run(replay(args.recording, args.speed, args.bot_latency_ms / 1000))
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
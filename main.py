@@ -7,23 +7,77 @@ Main entry point with ConversationHandler state machine.
 Implements the hierarchical menu structure from UI/UX Creative Phase.
 """
 
+import asyncio
+import json
 import logging
+import signal
+import ssl
+from typing import List, Optional
+
+import httpx
 from telegram import Update
+from telegram.error import TelegramError
 from telegram.ext import (
     Application,
-    CommandHandler,
+    ApplicationBuilder,
     CallbackQueryHandler,
+    CommandHandler,
     MessageHandler,
     ConversationHandler,
+    TypeHandler,
     filters,
     ContextTypes,
 )
 
-from src.config import TELEGRAM_BOT_TOKEN, validate_config, DEBUG, LOG_LEVEL
+from src.config import (
+    TELEGRAM_BOT_TOKEN,
+    validate_config,
+    DEBUG,
+    LOG_LEVEL,
+    LOG_FORMAT,
+    LOG_SAMPLE_RATES,
+    LOG_MAX_FIELD_CHARS,
+    METRICS_HOST,
+    METRICS_PORT,
+    HEALTH_HOST,
+    HEALTH_PORT,
+    LOOP_LAG_THRESHOLD_MS,
+    USE_UVLOOP,
+    SHUTDOWN_DRAIN_SECONDS,
+    PENDING_GENERATIONS_PATH,
+    ANALYTICS_ENABLED,
+    ANALYTICS_DB_PATH,
+    ANALYTICS_FLUSH_SECONDS,
+    IDEA_HISTORY_ENABLED,
+    IDEA_HISTORY_DB_PATH,
+    IDEA_HISTORY_PER_USER,
+    IDEA_HISTORY_MAX_AGE_DAYS,
+    SESSION_IDLE_TIMEOUT_SECONDS,
+    SESSION_SWEEP_SECONDS,
+    TRAFFIC_RECORD_PATH,
+    GPT_BUDGET_STATE_PATH,
+    ADMIN_USER_IDS,
+    BROADCAST_DB_PATH,
+    BROADCAST_RATE_PER_SECOND,
+    BROADCAST_CONCURRENCY,
+    TENANTS_CONFIG_PATH,
+    TRACE_SLOW_UPDATE_SECONDS,
+    PROFILER_INTERVAL_MS,
+    MEMORY_TRACE_FRAMES,
+    TELEGRAM_API_URL,
+    TELEGRAM_POOL_SIZE,
+    TELEGRAM_CONNECT_TIMEOUT,
+    TELEGRAM_READ_TIMEOUT,
+    TELEGRAM_WRITE_TIMEOUT,
+    TELEGRAM_POOL_TIMEOUT,
+    TELEGRAM_KEEPALIVE_SECONDS,
+    TELEGRAM_HTTP2,
+)
 from src.handlers import (
     start_command,
     help_command,
     cancel_command,
+    expired_callback,
     educational_menu,
     show_topic,
     back_to_topics,
@@ -32,13 +86,48 @@ from src.handlers import (
     process_creative_input,
     handle_target_audience,
     handle_tech_preference,
+    regenerate_ideas,
+    show_idea_history,
+    refine_idea,
+    simplify_idea,
+    show_current_ideas,
+    EMITTED_KEYBOARDS,
+    generation_tracker,
+    prefetcher,
+    admission,
+    resume_pending_generations,
+    close_gpt_client,
+    answer_question,
+    broadcast_command,
+    broadcast_send,
+    broadcast_cancel,
+    broadcast_status,
+    resume_broadcast,
+    memory_command,
 )
+from src.utils import CallbackRouter
+from src.utils.metrics import TELEGRAM_ERRORS, render_metrics, track_conversations
+from src.utils.analytics import analytics
+from src.utils.broadcast import Broadcaster
+from src.utils.generation_tracker import load_pending, save_pending
+from src.utils.health import HealthMonitor
+from src.utils.idea_history import idea_history
+from src.utils.log_pipeline import parse_sample_rates, setup_logging
+from src.utils.loop_monitor import LoopLagMonitor, install_uvloop
+from src.utils.memory import memory_accounting
+from src.utils.ops_server import OpsServer
+from src.utils.session import SessionSweeper, UserSession, touch_session
+from src.utils.tenants import DEFAULT_TENANT, Tenant, activate_tenant, load_tenants
+from src.utils import tracing
+from src.utils.tracing import TracedApplication
+from src.utils import transport
+from src.utils.transport import POOL_SEND, POOL_UPDATES, api_urls, build_request
+from src.utils.traffic_recorder import record_update, traffic_recorder
 
-# Setup logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=getattr(logging, LOG_LEVEL)
-)
+# Setup logging (records are written by a background thread)
+setup_logging(LOG_LEVEL, LOG_FORMAT, parse_sample_rates(LOG_SAMPLE_RATES), LOG_MAX_FIELD_CHARS)
+# Conversation timeouts add and remove a JobQueue job on every update
+logging.getLogger("apscheduler").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
 # Conversation states
@@ -47,10 +136,348 @@ EDUCATIONAL_TOPICS = 2
 EDUCATIONAL_CONTENT = 3
 CREATIVE_INPUT = 4
 
+# Runtime monitors and ops HTTP servers (started in on_startup)
+loop_monitor = LoopLagMonitor(threshold=LOOP_LAG_THRESHOLD_MS / 1000)
+ops_servers = []
+
+STATE_NAMES = {
+    MODE_SELECTION: "mode_selection",
+    EDUCATIONAL_TOPICS: "educational_topics",
+    EDUCATIONAL_CONTENT: "educational_content",
+    CREATIVE_INPUT: "creative_input",
+}
+
 
 async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle errors in the bot."""
-    logger.error(f"Exception while handling an update: {context.error}", exc_info=context.error)
+    if isinstance(context.error, TelegramError):
+        TELEGRAM_ERRORS.labels(type(context.error).__name__).inc()
+    logger.error("Exception while handling an update: %s", context.error, exc_info=context.error)
+
+
+def build_callback_router() -> CallbackRouter:
+    """Build callback-data dispatch tables for every conversation state."""
+    router = CallbackRouter()
+
+    router.add(MODE_SELECTION, 'mode_educational', educational_menu)
+    router.add(MODE_SELECTION, 'mode_creative', creative_menu)
+    router.add(MODE_SELECTION, 'help', help_command)
+    router.add(MODE_SELECTION, 'back_to_main', back_to_main)
+    router.add_namespace(MODE_SELECTION, 'history', show_idea_history)
+    router.add(MODE_SELECTION, 'ideas_regenerate', regenerate_ideas)
+    router.add(MODE_SELECTION, 'ideas_all', show_current_ideas)
+    router.add_namespace(MODE_SELECTION, 'refine', refine_idea)
+    router.add_namespace(MODE_SELECTION, 'simplify', simplify_idea)
+    # Lesson buttons under a FAQ answer given outside a conversation (see build_application)
+    router.add_namespace(MODE_SELECTION, 'topic', show_topic)
+    router.add(MODE_SELECTION, 'back_to_topics', back_to_topics)
+
+    router.add_namespace(EDUCATIONAL_TOPICS, 'topic', show_topic)
+    router.add(EDUCATIONAL_TOPICS, 'back_to_main', back_to_main)
+
+    router.add_namespace(EDUCATIONAL_CONTENT, 'topic', show_topic)
+    router.add(EDUCATIONAL_CONTENT, 'back_to_topics', back_to_topics)
+    router.add(EDUCATIONAL_CONTENT, 'back_to_main', back_to_main)
+    router.add(EDUCATIONAL_CONTENT, 'mode_creative', creative_menu)
+
+    router.add_namespace(CREATIVE_INPUT, 'target', handle_target_audience)
+    router.add_namespace(CREATIVE_INPUT, 'tech', handle_tech_preference)
+    router.add(CREATIVE_INPUT, 'mode_creative', creative_menu)
+    router.add(CREATIVE_INPUT, 'back_to_main', back_to_main)
+
+    return router
+
+
+def build_conversation_handler(router: CallbackRouter) -> ConversationHandler:
+    """Build the ConversationHandler state machine on top of the callback router."""
+    # Free text outside the creative questionnaire is a question for the FAQ search
+    # (not an entry point: allow_reentry checks those first, so it would swallow the answer to question 2)
+    questions = MessageHandler(filters.TEXT & ~filters.COMMAND, answer_question)
+    return ConversationHandler(
+        # Main-menu buttons also start a conversation, so old menus keep working after a restart
+        entry_points=[
+            CommandHandler('start', start_command),
+            router.handler_for(MODE_SELECTION, routed_only=True),
+        ],
+        states={
+            MODE_SELECTION: [router.handler_for(MODE_SELECTION), questions],
+            EDUCATIONAL_TOPICS: [router.handler_for(EDUCATIONAL_TOPICS), questions],
+            EDUCATIONAL_CONTENT: [router.handler_for(EDUCATIONAL_CONTENT), questions],
+            CREATIVE_INPUT: [
+                router.handler_for(CREATIVE_INPUT),
+                MessageHandler(filters.TEXT & ~filters.COMMAND, process_creative_input),
+            ],
+        },
+        fallbacks=[
+            CommandHandler('cancel', cancel_command),
+            CommandHandler('start', start_command),
+        ],
+        allow_reentry=True,
+        # Idle users' conversation state is dropped with their session (needs the JobQueue)
+        conversation_timeout=SESSION_IDLE_TIMEOUT_SECONDS or None,
+    )
+
+
+def start_profiler() -> tuple:
+    """Switch the sampling profiler on (ops endpoint)."""
+    tracing.profiler.interval = PROFILER_INTERVAL_MS / 1000
+    tracing.profiler.start()
+    return 200, "text/plain", "profiler started\n"
+
+
+def stop_profiler() -> tuple:
+    """Switch the sampling profiler off and return collapsed stacks (ops endpoint)."""
+    tracing.profiler.stop()
+    return 200, "text/plain", tracing.profiler.collapsed()
+
+
+def start_memory_tracing() -> tuple:
+    """Switch tracemalloc on (ops endpoint)."""
+    started = memory_accounting.start(MEMORY_TRACE_FRAMES)
+    return 200, "text/plain", "tracemalloc started\n" if started else "tracemalloc already running\n"
+
+
+def stop_memory_tracing() -> tuple:
+    """Switch tracemalloc off and drop its snapshots (ops endpoint)."""
+    stopped = memory_accounting.stop()
+    return 200, "text/plain", "tracemalloc stopped\n" if stopped else "tracemalloc was not running\n"
+
+
+async def memory_snapshot() -> tuple:
+    """Take a heap snapshot and diff it with the previous one (ops endpoint)."""
+    return 200, "text/plain", await memory_accounting.snapshot_diff()
+
+
+async def start_ops_servers(applications: List[Application]) -> None:
+    """Start metrics and health endpoints.
+    
+    Metrics and health share one server when configured on the same port.
+    """
+    servers = {}
+
+    if METRICS_PORT:
+        server = servers.setdefault(METRICS_PORT, OpsServer(METRICS_HOST, METRICS_PORT))
+        server.add_route("/metrics", lambda: (200, "text/plain; version=0.0.4", render_metrics()))
+        server.add_route("/debug/profile/start", start_profiler)
+        server.add_route("/debug/profile/stop", stop_profiler)
+        server.add_route("/debug/profile", lambda: (200, "text/plain", tracing.profiler.collapsed()))
+        server.add_route("/debug/budget", lambda: (200, "application/json", json.dumps(admission.snapshot())))
+        server.add_route("/debug/memory", lambda: (200, "application/json", json.dumps(memory_accounting.report())))
+        server.add_route("/debug/memory/start", start_memory_tracing)
+        server.add_route("/debug/memory/snapshot", memory_snapshot)
+        server.add_route("/debug/memory/stop", stop_memory_tracing)
+
+    if HEALTH_PORT:
+        health_monitor = HealthMonitor(applications, loop_monitor)
+        server = servers.setdefault(HEALTH_PORT, OpsServer(HEALTH_HOST, HEALTH_PORT))
+        server.add_route("/healthz", health_monitor.liveness)
+        server.add_route("/readyz", health_monitor.readiness)
+
+    for server in servers.values():
+        await server.start()
+        ops_servers.append(server)
+
+
+async def stop_ops_servers() -> None:
+    """Stop metrics and health endpoints."""
+    while ops_servers:
+        await ops_servers.pop().stop()
+
+
+async def graceful_shutdown(applications: List[Application]) -> None:
+    """Drain in-flight GPT generations before stopping (SIGTERM/SIGINT).
+    
+    1. Stop fetching new updates (for every bot).
+    2. Give running generations up to SHUTDOWN_DRAIN_SECONDS to finish.
+    3. Save the rest so the next instance can finish them.
+    """
+    if generation_tracker.draining:
+        return
+    logger.info("Stop signal received - draining in-flight generations")
+
+    for application in applications:
+        if application.updater and application.updater.running:
+            await application.updater.stop()
+
+    deferred = await generation_tracker.drain(SHUTDOWN_DRAIN_SECONDS)
+    save_pending(PENDING_GENERATIONS_PATH, deferred)
+    # All bots run on this loop - stopping it ends run_applications()
+    asyncio.get_running_loop().stop()
+
+
+def install_stop_signals(applications: List[Application]) -> None:
+    """Route SIGTERM/SIGINT to graceful_shutdown instead of an immediate stop."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, lambda: applications[0].create_task(graceful_shutdown(applications)))
+        except (NotImplementedError, RuntimeError):
+            # Windows: Ctrl+C still stops the bot, just without draining
+            logger.warning("Cannot install handler for %s; shutdown will not drain generations", sig.name)
+
+
+async def on_startup(applications: List[Application]) -> None:
+    """Start runtime monitors and ops endpoints, resume deferred work.
+    
+    Process-wide services start once; sweepers, broadcasts and deferred
+    generations are per bot (tenant). Runs after the applications are initialized.
+    """
+    loop_monitor.start()
+    await start_ops_servers(applications)
+    install_stop_signals(applications)
+    admission.load(GPT_BUDGET_STATE_PATH)
+    if ANALYTICS_ENABLED:
+        analytics.start(ANALYTICS_DB_PATH, ANALYTICS_FLUSH_SECONDS)
+    if IDEA_HISTORY_ENABLED:
+        idea_history.open(IDEA_HISTORY_DB_PATH, IDEA_HISTORY_PER_USER, IDEA_HISTORY_MAX_AGE_DAYS)
+    if TRAFFIC_RECORD_PATH:
+        traffic_recorder.start(TRAFFIC_RECORD_PATH)
+        logger.info("Recording anonymized traffic to %s", TRAFFIC_RECORD_PATH)
+
+    pending = load_pending(PENDING_GENERATIONS_PATH)
+    for application in applications:
+        tenant = application.bot_data["tenant"]
+        admission.set_tenant_quota(tenant.tenant_id, tenant.tokens_per_hour, tenant.tokens_per_day)
+        if SESSION_IDLE_TIMEOUT_SECONDS:
+            application.bot_data["session_sweeper"].start()
+        application.bot_data["broadcaster"].open(
+            tenant.data_path(BROADCAST_DB_PATH), BROADCAST_RATE_PER_SECOND, BROADCAST_CONCURRENCY
+        )
+
+        own = [item for item in pending if item.tenant == tenant.tenant_id]
+        if own:
+            logger.info("Resuming %d generation(s) deferred by the previous instance (%s)", len(own), tenant.tenant_id)
+            application.create_task(resume_pending_generations(application.bot, own))
+        application.create_task(resume_broadcast(application))
+
+    tenant_ids = {application.bot_data["tenant"].tenant_id for application in applications}
+    orphans = [item for item in pending if item.tenant not in tenant_ids]
+    if orphans:
+        logger.warning("Dropping %d deferred generation(s) of tenants no longer configured", len(orphans))
+
+
+async def on_shutdown(applications: List[Application]) -> None:
+    """Persist deferred work, stop ops endpoints and runtime monitors (after the applications shut down)."""
+    # Updates already fetched before the drain may have deferred more generations
+    save_pending(PENDING_GENERATIONS_PATH, generation_tracker.deferred)
+    prefetcher.cancel_all()
+    admission.save(GPT_BUDGET_STATE_PATH)
+    await analytics.stop()
+    for application in applications:
+        await application.bot_data["broadcaster"].stop()
+        await application.bot_data["session_sweeper"].stop()
+    await traffic_recorder.stop()
+    await close_gpt_client()
+    await stop_ops_servers()
+    await loop_monitor.stop()
+
+
+def build_application(builder: ApplicationBuilder, tenant: Optional[Tenant] = None) -> Application:
+    """Build the application and register all handlers on it.
+    
+    Args:
+        builder: Builder with the bot token and transport set
+        tenant: Library this bot serves (default: the single bot from the environment)
+    """
+    # context.user_data is a compact UserSession instead of a dict
+    application = builder.context_types(ContextTypes(user_data=UserSession)).build()
+    if tenant is None:
+        tenant = Tenant(DEFAULT_TENANT, application.bot.token, admin_user_ids=ADMIN_USER_IDS)
+    application.bot_data["tenant"] = tenant
+    broadcaster = application.bot_data["broadcaster"] = Broadcaster(tenant.tenant_id)
+
+    # Compile callback routes and make sure every button has one
+    router = build_callback_router()
+    router.validate(EMITTED_KEYBOARDS)
+    conv_handler = build_conversation_handler(router)
+    track_conversations(conv_handler, STATE_NAMES)
+    # ConversationHandler has no public accessor for its state map
+    memory_accounting.add_source(f"conversations[{tenant.tenant_id}]", lambda: conv_handler._conversations)
+    memory_accounting.add_source(f"user_data[{tenant.tenant_id}]", lambda: application.user_data)
+    memory_accounting.add_source(f"chat_data[{tenant.tenant_id}]", lambda: application.chat_data)
+
+    # Register handlers (negative groups run first: tenant, broadcast recipients, traffic recording, user activity)
+    application.add_handler(TypeHandler(Update, activate_tenant), group=-4)
+    application.add_handler(TypeHandler(Update, broadcaster.track), group=-3)
+    if TRAFFIC_RECORD_PATH:
+        application.add_handler(TypeHandler(Update, record_update), group=-2)
+    application.add_handler(TypeHandler(Update, touch_session), group=-1)
+    application.add_handler(conv_handler)
+    # Questions from users without a conversation (never started, or it timed out)
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, answer_question))
+    # Buttons of a timed-out conversation: answer them (no endless spinner) and show the menu again
+    application.add_handler(CallbackQueryHandler(expired_callback))
+    application.add_handler(CommandHandler("help", help_command))
+    if tenant.admin_user_ids:
+        admins = filters.User(user_id=tenant.admin_user_ids)
+        application.add_handler(CommandHandler("broadcast", broadcast_command, filters=admins))
+        application.add_handler(CommandHandler("broadcast_send", broadcast_send, filters=admins))
+        application.add_handler(CommandHandler("broadcast_cancel", broadcast_cancel, filters=admins))
+        application.add_handler(CommandHandler("broadcast_status", broadcast_status, filters=admins))
+        application.add_handler(CommandHandler("memory", memory_command, filters=admins))
+
+    # Register error handler
+    application.add_error_handler(error_handler)
+
+    # Idle users' sessions are evicted (started in on_startup)
+    application.bot_data["session_sweeper"] = SessionSweeper(
+        application, SESSION_IDLE_TIMEOUT_SECONDS, SESSION_SWEEP_SECONDS
+    )
+
+    return application
+
+
+def build_tenant_application(tenant: Tenant, tls_context: ssl.SSLContext) -> Application:
+    """Build one tenant's bot with the production transport.
+    
+    Every bot's connections share ``tls_context``: a TLS context of its own
+    per HTTP client (two per bot) would cost about a megabyte each.
+    """
+    base_url, base_file_url = api_urls()
+    builder = (
+        Application.builder()
+        .token(tenant.token)
+        .base_url(base_url)
+        .base_file_url(base_file_url)
+        .application_class(TracedApplication)
+        .request(build_request(POOL_SEND, TELEGRAM_POOL_SIZE, tls_context))
+        # One long poll at a time; a separate pool so sends never wait behind it
+        .get_updates_request(build_request(POOL_UPDATES, 1, tls_context))
+    )
+    return build_application(builder, tenant)
+
+
+def run_applications(applications: List[Application]) -> None:
+    """Poll every bot on one event loop until stopped.
+    
+    The multi-bot counterpart of ``Application.run_polling``: all applications
+    are initialized, started and (on a stop signal or Ctrl+C) shut down in
+    the same order, with process-wide services around them.
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        for application in applications:
+            loop.run_until_complete(application.initialize())
+        loop.run_until_complete(on_startup(applications))
+        for application in applications:
+            loop.run_until_complete(application.updater.start_polling(allowed_updates=Update.ALL_TYPES))
+            application.bot_data["update_mode"] = "polling"  # Reported by /readyz
+            loop.run_until_complete(application.start())
+        loop.run_forever()
+    except (KeyboardInterrupt, SystemExit):
+        logger.debug("Received stop signal, shutting down")
+    finally:
+        try:
+            for application in applications:
+                if application.updater.running:
+                    loop.run_until_complete(application.updater.stop())
+                if application.running:
+                    loop.run_until_complete(application.stop())
+                loop.run_until_complete(application.shutdown())
+            loop.run_until_complete(on_shutdown(applications))
+        finally:
+            loop.close()
 
 
 def main() -> None:
@@ -68,56 +495,34 @@ def main() -> None:
         sys.exit(1)
 
     print("\n🔧 Creating bot application...")
-    print(f"   Using token: {TELEGRAM_BOT_TOKEN[:10]}...{TELEGRAM_BOT_TOKEN[-4:]}")
 
     try:
-        # Create the Application
-        print("   Connecting to Telegram API...")
-        application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
-        print("✅ Bot application created successfully")
-
-        # Define conversation handler with states
-        conv_handler = ConversationHandler(
-            entry_points=[CommandHandler('start', start_command)],
-            states={
-                MODE_SELECTION: [
-                    CallbackQueryHandler(educational_menu, pattern='^mode_educational$'),
-                    CallbackQueryHandler(creative_menu, pattern='^mode_creative$'),
-                    CallbackQueryHandler(help_command, pattern='^help$'),
-                ],
-                EDUCATIONAL_TOPICS: [
-                    CallbackQueryHandler(show_topic, pattern='^topic_'),
-                    CallbackQueryHandler(back_to_main, pattern='^back_to_main$'),
-                ],
-                EDUCATIONAL_CONTENT: [
-                    CallbackQueryHandler(show_topic, pattern='^topic_'),
-                    CallbackQueryHandler(back_to_topics, pattern='^back_to_topics$'),
-                    CallbackQueryHandler(back_to_main, pattern='^back_to_main$'),
-                    CallbackQueryHandler(creative_menu, pattern='^mode_creative$'),
-                ],
-                CREATIVE_INPUT: [
-                    CallbackQueryHandler(handle_target_audience, pattern='^target_'),
-                    CallbackQueryHandler(handle_tech_preference, pattern='^tech_'),
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, process_creative_input),
-                    CallbackQueryHandler(creative_menu, pattern='^mode_creative$'),
-                    CallbackQueryHandler(back_to_main, pattern='^back_to_main$'),
-                ],
-            },
-            fallbacks=[
-                CommandHandler('cancel', cancel_command),
-                CommandHandler('start', start_command),
-            ],
-            allow_reentry=True,
-        )
-
-        # Register handlers
-        application.add_handler(conv_handler)
-        application.add_handler(CommandHandler("help", help_command))
-
-        # Register error handler
-        application.add_error_handler(error_handler)
+        if TENANTS_CONFIG_PATH:
+            tenants = load_tenants(TENANTS_CONFIG_PATH, ADMIN_USER_IDS)
+        else:
+            tenants = [Tenant(DEFAULT_TENANT, TELEGRAM_BOT_TOKEN, admin_user_ids=ADMIN_USER_IDS)]
 
+        # Create the Applications (one per library bot, all on one event loop)
+        print("   Connecting to Telegram API...")
+        tracing.SLOW_UPDATE_SECONDS = TRACE_SLOW_UPDATE_SECONDS
+        transport.API_URL = TELEGRAM_API_URL
+        transport.CONNECT_TIMEOUT = TELEGRAM_CONNECT_TIMEOUT
+        transport.READ_TIMEOUT = TELEGRAM_READ_TIMEOUT
+        transport.WRITE_TIMEOUT = TELEGRAM_WRITE_TIMEOUT
+        transport.POOL_TIMEOUT = TELEGRAM_POOL_TIMEOUT
+        transport.KEEPALIVE_EXPIRY = TELEGRAM_KEEPALIVE_SECONDS
+        transport.HTTP2 = TELEGRAM_HTTP2
+        if TELEGRAM_API_URL:
+            print(f"   Bot API server: {TELEGRAM_API_URL}")
+        tls_context = httpx.create_ssl_context()
+        applications = []
+        for tenant in tenants:
+            print(f"   Using token: {tenant.token[:10]}...{tenant.token[-4:]} ({tenant.tenant_id})")
+            applications.append(build_tenant_application(tenant, tls_context))
+        print(f"✅ Bot application created successfully ({len(applications)} bot(s))")
         print("✅ Bot handlers registered")
+        if USE_UVLOOP and install_uvloop():
+            print("✅ Event loop: uvloop")
         print(f"✅ Debug mode: {DEBUG}")
         print(f"✅ Log level: {LOG_LEVEL}")
         print("\n📊 Bot Features:")
@@ -129,11 +534,12 @@ def main() -> None:
         print("🤖 Bot is running... Press Ctrl+C to stop")
         print("="*60 + "\n")
 
-        # Start the bot
-        application.run_polling(allowed_updates=Update.ALL_TYPES)
+        # Start the bots
+        # Stop signals are handled by graceful_shutdown (installed in on_startup)
+        run_applications(applications)
 
     except Exception as e:
-        logger.error(f"Failed to start bot: {e}", exc_info=True)
+        logger.error("Failed to start bot: %s", e, exc_info=True)
         print(f"\n❌ Error starting bot: {e}")
         print(f"   Error type: {type(e).__name__}")
         import traceback
@@ -10,6 +10,18 @@ load_dotenv(override=False)
 # Telegram Bot Configuration
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 
+# Bot API transport: server root of a self-hosted Bot API server (empty = api.telegram.org),
+# connections for sends (getUpdates has its own), timeouts and idle connection lifetime in seconds,
+# HTTP/2 (needs httpx[http2])
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
+TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE", "16"))
+TELEGRAM_CONNECT_TIMEOUT = float(os.getenv("TELEGRAM_CONNECT_TIMEOUT", "5"))
+TELEGRAM_READ_TIMEOUT = float(os.getenv("TELEGRAM_READ_TIMEOUT", "5"))
+TELEGRAM_WRITE_TIMEOUT = float(os.getenv("TELEGRAM_WRITE_TIMEOUT", "5"))
+TELEGRAM_POOL_TIMEOUT = float(os.getenv("TELEGRAM_POOL_TIMEOUT", "1"))
+TELEGRAM_KEEPALIVE_SECONDS = float(os.getenv("TELEGRAM_KEEPALIVE_SECONDS", "30"))
+TELEGRAM_HTTP2 = os.getenv("TELEGRAM_HTTP2", "False").lower() == "true"
+
 # Yandex GPT Configuration
 YANDEX_GPT_API_KEY = os.getenv("YANDEX_GPT_API_KEY", "")
 YANDEX_FOLDER_ID = os.getenv("YANDEX_FOLDER_ID", "")
@@ -20,15 +32,92 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./digilib.db")
 # Application Settings
 DEBUG = os.getenv("DEBUG", "True").lower() == "true"
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Logs are written by a background thread; "json" adds trace/update/user ids to every line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "2000"))
 
 # Rate Limiting
 GPT_REQUESTS_PER_HOUR = int(os.getenv("GPT_REQUESTS_PER_HOUR", "10"))
 GPT_REQUESTS_PER_DAY = int(os.getenv("GPT_REQUESTS_PER_DAY", "50"))
 
+# Metrics (Prometheus text format on a local port; 0 disables)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Health checks (/healthz liveness, /readyz readiness; 0 disables)
+HEALTH_HOST = os.getenv("HEALTH_HOST", "0.0.0.0")
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", os.getenv("PORT", "8080")))
+
+# Graceful shutdown: how long in-flight GPT generations may finish after SIGTERM,
+# and where unfinished ones are saved for the next instance (use a Railway volume)
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "20"))
+PENDING_GENERATIONS_PATH = os.getenv("PENDING_GENERATIONS_PATH", "data/pending_generations.json")
+
+# Usage analytics (batched to an append-only SQLite file)
+ANALYTICS_ENABLED = os.getenv("ANALYTICS_ENABLED", "True").lower() == "true"
+ANALYTICS_DB_PATH = os.getenv("ANALYTICS_DB_PATH", "data/analytics.db")
+ANALYTICS_FLUSH_SECONDS = float(os.getenv("ANALYTICS_FLUSH_SECONDS", "5"))
+
+# Idea history ("🗂 Мои идеи"; compressed, newest N results per user)
+IDEA_HISTORY_ENABLED = os.getenv("IDEA_HISTORY_ENABLED", "True").lower() == "true"
+IDEA_HISTORY_DB_PATH = os.getenv("IDEA_HISTORY_DB_PATH", "data/idea_history.db")
+IDEA_HISTORY_PER_USER = int(os.getenv("IDEA_HISTORY_PER_USER", "20"))
+IDEA_HISTORY_MAX_AGE_DAYS = float(os.getenv("IDEA_HISTORY_MAX_AGE_DAYS", "90"))
+
+# Speculative prefetch (start generating at question 2 with a predicted project type)
+SPECULATIVE_PREFETCH = os.getenv("SPECULATIVE_PREFETCH", "False").lower() == "true"
+SPECULATIVE_BUDGET_PER_HOUR = int(os.getenv("SPECULATIVE_BUDGET_PER_HOUR", "60"))
+SPECULATIVE_MAX_IN_FLIGHT = int(os.getenv("SPECULATIVE_MAX_IN_FLIGHT", "4"))
+
+# Idea generation: "single" (one completion with all ideas) or "parallel" (titles first,
+# then one completion per idea concurrently; ideas are shown as they finish)
+GPT_GENERATION_MODE = os.getenv("GPT_GENERATION_MODE", "single").lower()
+
+# User sessions (idle users' conversation state and data are evicted; 0 = keep forever)
+SESSION_IDLE_TIMEOUT_SECONDS = float(os.getenv("SESSION_IDLE_TIMEOUT_SECONDS", "3600"))
+SESSION_SWEEP_SECONDS = float(os.getenv("SESSION_SWEEP_SECONDS", "60"))
+
+# Traffic recording for replay tests (anonymized, gzip JSON lines; empty = off)
+TRAFFIC_RECORD_PATH = os.getenv("TRAFFIC_RECORD_PATH", "")
+
+# Free-text questions: answered from the lessons/FAQ index when the best match's relevance
+# (0-1, see SearchIndex.search) reaches FAQ_MIN_SCORE, otherwise by GPT (if FAQ_GPT_FALLBACK)
+FAQ_MIN_SCORE = float(os.getenv("FAQ_MIN_SCORE", "0.4"))
+FAQ_GPT_FALLBACK = os.getenv("FAQ_GPT_FALLBACK", "True").lower() == "true"
+
+# Admins (comma-separated Telegram user ids) may run /broadcast
+ADMIN_USER_IDS = [int(item) for item in os.getenv("ADMIN_USER_IDS", "").split(",") if item.strip()]
+
+# Broadcasts to everyone who has used the bot (recipient list and resumable jobs in SQLite)
+BROADCAST_DB_PATH = os.getenv("BROADCAST_DB_PATH", "data/broadcast.db")
+BROADCAST_RATE_PER_SECOND = float(os.getenv("BROADCAST_RATE_PER_SECOND", "25"))
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "8"))
+
+# Multi-tenant mode: JSON list of library bots run by this process (empty = single bot from
+# TELEGRAM_BOT_TOKEN); tenants share the GPT client and budget, each with its own quota
+TENANTS_CONFIG_PATH = os.getenv("TENANTS_CONFIG_PATH", "")
+
+# Global GPT token budget (UTC hour/day windows; 0 = unlimited). As it runs low, answers get
+# shorter, then only cached ideas are served, then creative mode closes.
+GPT_TOKENS_PER_HOUR = int(os.getenv("GPT_TOKENS_PER_HOUR", "0"))
+GPT_TOKENS_PER_DAY = int(os.getenv("GPT_TOKENS_PER_DAY", "0"))
+GPT_REDUCED_MAX_TOKENS = int(os.getenv("GPT_REDUCED_MAX_TOKENS", "1000"))
+GPT_BUDGET_STATE_PATH = os.getenv("GPT_BUDGET_STATE_PATH", "data/token_budget.json")
+
+# Event loop
+LOOP_LAG_THRESHOLD_MS = int(os.getenv("LOOP_LAG_THRESHOLD_MS", "500"))
+USE_UVLOOP = os.getenv("USE_UVLOOP", "False").lower() == "true"
+
+# Tracing & profiling
+TRACE_SLOW_UPDATE_SECONDS = float(os.getenv("TRACE_SLOW_UPDATE_SECONDS", "5.0"))
+PROFILER_INTERVAL_MS = int(os.getenv("PROFILER_INTERVAL_MS", "10"))
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "1"))
+
 
 def validate_config() -> bool:
     """Validate that all required configuration is present."""
-    if not TELEGRAM_BOT_TOKEN:
+    if not TELEGRAM_BOT_TOKEN and not TENANTS_CONFIG_PATH:
         print("❌ ERROR: TELEGRAM_BOT_TOKEN is not set")
         print("   Please check:")
         print("   - Railway: Variables tab")
@@ -39,7 +128,13 @@ def validate_config() -> bool:
     print("✅ Configuration loaded successfully")
     print(f"   - Debug Mode: {DEBUG}")
     print(f"   - Log Level: {LOG_LEVEL}")
-    print(f"   - Bot Token: {'*' * 20}{TELEGRAM_BOT_TOKEN[-4:]}")
+    if TENANTS_CONFIG_PATH:
+        print(f"   - Tenants: {TENANTS_CONFIG_PATH}")
+    else:
+        print(f"   - Bot Token: {'*' * 20}{TELEGRAM_BOT_TOKEN[-4:]}")
+    
+    if METRICS_PORT:
+        print(f"   - Metrics: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
     
     # Log Yandex GPT status
     if YANDEX_GPT_API_KEY and YANDEX_FOLDER_ID:
@@ -1,6 +1,14 @@
-"""Handlers package for DigiLib Assistant bot."""
+"""Handlers package for DigiLib Assistant bot.
 
-from .common_handler import start_command, help_command, cancel_command
+The idea generator (``creative_handler``) and the keyboard registry that
+includes its keyboards are loaded on first access, so the menu, lesson and
+FAQ handlers can be imported without it.
+"""
+
+import importlib
+
+from .common_handler import start_command, help_command, cancel_command, expired_callback
+from .common_handler import EMITTED_KEYBOARDS as _COMMON_KEYBOARDS
 from .educational_handler import (
     educational_menu,
     show_topic,
@@ -8,17 +16,41 @@ from .educational_handler import (
     back_to_main,
     EDUCATIONAL_TOPICS,
 )
-from .creative_handler import (
-    creative_menu,
-    process_creative_input,
-    handle_target_audience,
-    handle_tech_preference,
+from .educational_handler import EMITTED_KEYBOARDS as _EDUCATIONAL_KEYBOARDS
+from .faq_handler import answer_question
+from .admin_handler import (
+    broadcast_command,
+    broadcast_send,
+    broadcast_cancel,
+    broadcast_status,
+    resume_broadcast,
+    memory_command,
 )
+from .faq_handler import EMITTED_KEYBOARDS as _FAQ_KEYBOARDS
+
+# Public name -> submodule, imported on first attribute access
+_LAZY_ATTRIBUTES = {
+    'creative_menu': '.creative_handler',
+    'process_creative_input': '.creative_handler',
+    'handle_target_audience': '.creative_handler',
+    'handle_tech_preference': '.creative_handler',
+    'regenerate_ideas': '.creative_handler',
+    'show_idea_history': '.creative_handler',
+    'refine_idea': '.creative_handler',
+    'simplify_idea': '.creative_handler',
+    'show_current_ideas': '.creative_handler',
+    'generation_tracker': '.creative_handler',
+    'prefetcher': '.creative_handler',
+    'admission': '.creative_handler',
+    'resume_pending_generations': '.creative_handler',
+    'close_gpt_client': '.creative_handler',
+}
 
 __all__ = [
     'start_command',
     'help_command',
     'cancel_command',
+    'expired_callback',
     'educational_menu',
     'show_topic',
     'back_to_topics',
@@ -27,5 +59,46 @@ __all__ = [
     'process_creative_input',
     'handle_target_audience',
     'handle_tech_preference',
+    'regenerate_ideas',
+    'show_idea_history',
+    'refine_idea',
+    'simplify_idea',
+    'show_current_ideas',
+    'generation_tracker',
+    'prefetcher',
+    'admission',
+    'resume_pending_generations',
+    'close_gpt_client',
+    'answer_question',
+    'broadcast_command',
+    'broadcast_send',
+    'broadcast_cancel',
+    'broadcast_status',
+    'resume_broadcast',
+    'memory_command',
     'EDUCATIONAL_TOPICS',
+    'EMITTED_KEYBOARDS',
 ]
+
+
+def _emitted_keyboards() -> dict:
+    """All inline keyboards the handlers can show: {state: [InlineKeyboardMarkup, ...]}."""
+    from .creative_handler import EMITTED_KEYBOARDS as creative_keyboards
+
+    keyboards = {}
+    for emitted in (_COMMON_KEYBOARDS, _EDUCATIONAL_KEYBOARDS, creative_keyboards, _FAQ_KEYBOARDS):
+        for state, markups in emitted.items():
+            keyboards.setdefault(state, []).extend(markups)
+    return keyboards
+
+
+def __getattr__(name: str):
+    if name == 'EMITTED_KEYBOARDS':
+        value = _emitted_keyboards()
+    else:
+        module_name = _LAZY_ATTRIBUTES.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,192 @@
+"""Admin commands - broadcasts to everyone who has used the bot, memory diagnostics."""
+
+import logging
+from typing import Dict, Tuple
+
+from telegram import Bot, Update
+from telegram.error import BadRequest, TelegramError
+from telegram.ext import Application, ContextTypes
+
+from src.config import BROADCAST_CONCURRENCY, MEMORY_TRACE_FRAMES
+from src.utils.broadcast import (
+    BroadcastJob,
+    CANCELLED,
+    DONE,
+    ProgressCallback,
+    broadcast_payload,
+)
+from src.utils.memory import memory_accounting
+from src.utils.metrics import timed_handler
+from src.utils.transport import POOL_BROADCAST, api_urls, build_request
+
+logger = logging.getLogger(__name__)
+
+# (bot id, admin chat id) -> broadcast text waiting for /broadcast_send
+_drafts: Dict[Tuple[int, int], str] = {}
+
+USAGE_MESSAGE = """📣 Рассылка всем, кто пользовался ботом.
+
+/broadcast <текст> - подготовить (Markdown, как в сообщениях бота)
+/broadcast_send - отправить подготовленный текст
+/broadcast_cancel - отменить черновик или остановить рассылку
+/broadcast_status - ход последней рассылки"""
+
+MEMORY_USAGE = """/memory - размер структур в памяти
+/memory start - включить tracemalloc
+/memory snapshot - снимок кучи и разница с предыдущим
+/memory stop - выключить tracemalloc"""
+
+# Telegram rejects longer messages
+MAX_MESSAGE_CHARS = 4000
+
+
+def build_sender_bot(bot: Bot) -> Bot:
+    """Bot for broadcast sends, with its own connection pool so interactive calls never queue behind it."""
+    base_url, base_file_url = api_urls()
+    return Bot(bot.token, base_url=base_url, base_file_url=base_file_url,
+               request=build_request(POOL_BROADCAST, BROADCAST_CONCURRENCY))
+
+
+def format_progress(job: BroadcastJob) -> str:
+    """Status line of a broadcast for the admin."""
+    if job.status == DONE:
+        state = "завершена"
+    elif job.status == CANCELLED:
+        state = "остановлена"
+    else:
+        state = "идет"
+    percent = job.processed * 100 // job.total if job.total else 100
+    return (
+        f"📣 Рассылка #{job.job_id} {state}: {job.processed} из {job.total} ({percent}%)\n"
+        f"✅ Доставлено: {job.sent}\n"
+        f"🚫 Заблокировали бота: {job.blocked}\n"
+        f"❌ Ошибки: {job.failed}"
+    )
+
+
+def progress_reporter(bot: Bot) -> ProgressCallback:
+    """Callback that edits the admin's status message with the job's progress."""
+    async def report(job: BroadcastJob) -> None:
+        try:
+            if job.status_message_id:
+                await bot.edit_message_text(format_progress(job), chat_id=job.admin_chat_id,
+                                            message_id=job.status_message_id)
+            else:
+                await bot.send_message(job.admin_chat_id, format_progress(job))
+        except TelegramError as e:
+            logger.debug("Broadcast progress update failed: %s", e)
+    return report
+
+
+async def resume_broadcast(application: Application) -> None:
+    """Continue a broadcast interrupted by the previous instance's shutdown."""
+    bot = application.bot
+    job = await application.bot_data["broadcaster"].resume(build_sender_bot(bot), progress_reporter(bot))
+    if job is not None:
+        await progress_reporter(bot)(job)
+
+
+@timed_handler
+async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Prepare a broadcast: show the message exactly as recipients will get it."""
+    broadcaster = context.bot_data["broadcaster"]
+    parts = update.message.text.split(maxsplit=1)
+    if len(parts) < 2:
+        await update.message.reply_text(USAGE_MESSAGE)
+        return
+    if broadcaster.busy:
+        await update.message.reply_text("⏳ Уже идет рассылка. Ход: /broadcast_status")
+        return
+
+    text = parts[1]
+    try:
+        await update.message.reply_text(**broadcast_payload(text))
+    except BadRequest as e:
+        # The same payload would fail for every recipient
+        await update.message.reply_text(f"❌ Telegram не принял текст: {e.message}\nПроверь Markdown-разметку.")
+        return
+
+    _drafts[(context.bot.id, update.effective_chat.id)] = text
+    await update.message.reply_text(
+        f"👆 Так выглядит сообщение. Получателей: {broadcaster.recipient_count()}.\n\n"
+        "/broadcast_send - отправить\n/broadcast_cancel - отменить"
+    )
+
+
+@timed_handler
+async def broadcast_send(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Start the prepared broadcast."""
+    broadcaster = context.bot_data["broadcaster"]
+    chat_id = update.effective_chat.id
+    if broadcaster.busy:
+        await update.message.reply_text("⏳ Уже идет рассылка. Ход: /broadcast_status")
+        return
+    text = _drafts.pop((context.bot.id, chat_id), None)
+    if text is None:
+        await update.message.reply_text("Сначала подготовь текст: /broadcast <текст>")
+        return
+
+    status = await update.message.reply_text("📣 Запускаю рассылку...")
+    job = await broadcaster.create(text, chat_id, status.message_id)
+    if job is None:
+        await status.edit_text("❌ Не удалось сохранить рассылку, подробности в логах.")
+        return
+    broadcaster.start(job, build_sender_bot(context.bot), progress_reporter(context.bot))
+    logger.info("Broadcast #%d started by %s for %d recipients", job.job_id, update.effective_user.id, job.total)
+
+
+@timed_handler
+async def broadcast_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Drop the draft, or stop the running broadcast."""
+    broadcaster = context.bot_data["broadcaster"]
+    if _drafts.pop((context.bot.id, update.effective_chat.id), None) is not None:
+        await update.message.reply_text("🗑 Черновик рассылки удален.")
+    elif broadcaster.cancel():
+        await update.message.reply_text("🛑 Останавливаю рассылку - итог придет в сообщение о ходе рассылки.")
+    else:
+        await update.message.reply_text("Нечего отменять.")
+
+
+@timed_handler
+async def broadcast_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show the progress of the running (or last) broadcast."""
+    broadcaster = context.bot_data["broadcaster"]
+    job = await broadcaster.latest()
+    if job is None:
+        await update.message.reply_text("Рассылок еще не было.")
+        return
+    await update.message.reply_text(format_progress(job))
+
+
+def format_memory_report(report: dict) -> str:
+    """Memory report (see MemoryAccounting.report) as a message for the admin."""
+    rss = report["rss_bytes"]
+    lines = [f"🧠 RSS {rss / 1024 / 1024:.1f} MiB" if rss is not None else "🧠 RSS недоступен"]
+    for name, sizes in report["structures"].items():
+        lines.append(f"{name}: {sizes['entries']} шт., ~{sizes['bytes'] / 1024:.0f} KiB")
+    tracing = report["tracemalloc"]
+    if tracing["tracing"]:
+        lines.append(f"tracemalloc: {tracing['traced_bytes'] / 1024 / 1024:.1f} MiB, "
+                     f"снимков {tracing['snapshots']}")
+    else:
+        lines.append("tracemalloc выключен")
+    return "\n".join(lines)
+
+
+@timed_handler
+async def memory_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Report memory use; start/stop tracemalloc or diff heap snapshots."""
+    parts = update.message.text.split()
+    action = parts[1] if len(parts) > 1 else ""
+    if not action:
+        text = format_memory_report(memory_accounting.report())
+    elif action == "start":
+        started = memory_accounting.start(MEMORY_TRACE_FRAMES)
+        text = "🔬 tracemalloc включен." if started else "tracemalloc уже включен."
+    elif action == "snapshot":
+        text = await memory_accounting.snapshot_diff()
+    elif action == "stop":
+        text = "tracemalloc выключен." if memory_accounting.stop() else "tracemalloc и так выключен."
+    else:
+        text = MEMORY_USAGE
+    await update.message.reply_text(text[:MAX_MESSAGE_CHARS])
@@ -3,36 +3,53 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
+from src.utils.metrics import timed_handler
+from src.utils.pipelining import answers_callback
 
+
+# Hierarchical menu - Level 1: Mode Selection (built once, shared by all entry points)
+MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📚 Изучить основы", callback_data="mode_educational")],
+    [InlineKeyboardButton("💡 Придумать проект", callback_data="mode_creative")],
+    [InlineKeyboardButton("🗂 Мои идеи", callback_data="history_0")],
+    [InlineKeyboardButton("❓ Помощь", callback_data="help")]
+])
+
+# Keyboards shown by this module, keyed by the conversation state they are shown in
+EMITTED_KEYBOARDS = {
+    1: [MAIN_MENU_MARKUP],  # MODE_SELECTION
+}
+
+
+@timed_handler
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle /start command - Main menu with mode selection."""
     user = update.effective_user
+    tenant = context.bot_data["tenant"]
+    # Library name and greeting of this bot (multi-tenant mode)
+    library = "\n".join(filter(None, (f"🏛 {tenant.name}" if tenant.name else "", tenant.welcome)))
+    if library:
+        library += "\n\n"
     
     # Welcome message following Style Guide
     message = f"""👋 Привет, {user.first_name}!
 
 Я DigiLib Assistant - твой проводник в мир создания цифровых решений. 🚀
 
-**Чем займемся сегодня?**
+{library}**Чем займемся сегодня?**
 • Изучим основы работы с современными инструментами
 • Придумаем идею для твоего проекта
 
 Просто нажми на кнопку ниже!"""
 
-    # Hierarchical menu - Level 1: Mode Selection
-    keyboard = [
-        [InlineKeyboardButton("📚 Изучить основы", callback_data="mode_educational")],
-        [InlineKeyboardButton("💡 Придумать проект", callback_data="mode_creative")],
-        [InlineKeyboardButton("❓ Помощь", callback_data="help")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+    await update.message.reply_text(message, reply_markup=MAIN_MENU_MARKUP, parse_mode='Markdown')
     
     # Return state for ConversationHandler
     return 1  # MODE_SELECTION state
 
 
+@timed_handler
+@answers_callback
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /help command."""
     help_text = """📚 **Справка по DigiLib Assistant**
@@ -56,30 +73,37 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
   • Подобрать технологии
   • Составить план действий
 
+🗂 **Мои идеи** - Все идеи, которые ты уже получил
+
 **Нужна помощь?**
 Просто напиши свой вопрос, и я постараюсь помочь!"""
 
     # Check if called from callback query or direct command
     if update.callback_query:
-        await update.callback_query.answer()
         await update.callback_query.message.reply_text(help_text, parse_mode='Markdown')
     else:
         await update.message.reply_text(help_text, parse_mode='Markdown')
 
 
+@timed_handler
 async def cancel_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle /cancel command - Return to main menu."""
     message = """❌ Действие отменено.
 
 Возвращаю тебя в главное меню."""
 
-    keyboard = [
-        [InlineKeyboardButton("📚 Изучить основы", callback_data="mode_educational")],
-        [InlineKeyboardButton("💡 Придумать проект", callback_data="mode_creative")],
-        [InlineKeyboardButton("❓ Помощь", callback_data="help")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(message, reply_markup=reply_markup)
+    await update.message.reply_text(message, reply_markup=MAIN_MENU_MARKUP)
     
     return 1  # Return to MODE_SELECTION state
+
+
+@timed_handler
+async def expired_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle a button no conversation state accepts (its conversation timed out or the bot restarted)."""
+    query = update.callback_query
+    await query.answer("⌛ Сессия истекла")
+    message = """⌛ Сессия истекла.
+
+Начнем сначала - выбери, чем займемся:"""
+
+    await query.edit_message_text(message, reply_markup=MAIN_MENU_MARKUP)
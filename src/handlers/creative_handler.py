@@ -1,37 +1,286 @@
 """Creative mode handler - AI-powered idea generation with Yandex GPT."""
 
+import asyncio
 import logging
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import time
+from typing import TYPE_CHECKING, Optional
+
+from telegram import CallbackQuery, Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
+from telegram.helpers import escape_markdown
+
+from src.config import (
+    YANDEX_GPT_API_KEY,
+    YANDEX_FOLDER_ID,
+    SPECULATIVE_PREFETCH,
+    SPECULATIVE_BUDGET_PER_HOUR,
+    SPECULATIVE_MAX_IN_FLIGHT,
+    GPT_TOKENS_PER_HOUR,
+    GPT_TOKENS_PER_DAY,
+    GPT_REDUCED_MAX_TOKENS,
+    GPT_GENERATION_MODE,
+)
+from src.utils.admission import AdmissionController, CACHED_ONLY, EDUCATIONAL_ONLY, FULL
+from src.utils.analytics import (
+    analytics,
+    CREATIVE_STARTED,
+    AUDIENCE_SELECTED,
+    PROBLEM_ENTERED,
+    TECH_SELECTED,
+    IDEAS_SHOWN,
+    GPT_FAILED,
+    IDEAS_REUSED,
+    HISTORY_OPENED,
+    IDEA_REFINED,
+)
+from src.utils.generation_tracker import GenerationTracker, PendingGeneration
+from src.utils.idea_history import HistoryEntry, format_ideas, idea_history
+from src.utils.metrics import timed_handler
+from src.utils.pipelining import answers_callback, start_call
+from src.utils.session import UserSession
+from src.utils.speculation import SpeculativePrefetcher
+from src.utils.tenants import set_current_tenant
 
-from src.config import YANDEX_GPT_API_KEY, YANDEX_FOLDER_ID
-from src.utils import YandexGPTClient
+if TYPE_CHECKING:
+    from src.utils.yandex_gpt import YandexGPTClient
 
 logger = logging.getLogger(__name__)
 
 # Global GPT client instance (initialized once)
 gpt_client = None
 
+# In-flight generations (drained on shutdown)
+generation_tracker = GenerationTracker()
+
+# Generations started at question 2 for a predicted answer to question 3 (opt-in)
+prefetcher = SpeculativePrefetcher(SPECULATIVE_BUDGET_PER_HOUR, SPECULATIVE_MAX_IN_FLIGHT)
+
+# Global token budget shared by all GPT calls
+admission = AdmissionController(GPT_TOKENS_PER_HOUR, GPT_TOKENS_PER_DAY, GPT_REDUCED_MAX_TOKENS)
+
+# Static keyboards (built once at import)
+TARGET_AUDIENCE_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🎓 Для себя (учеба/хобби)", callback_data="target_self")],
+    [InlineKeyboardButton("💼 Для работы/организации", callback_data="target_work")],
+    [InlineKeyboardButton("🚀 Для бизнеса/стартапа", callback_data="target_business")],
+    [InlineKeyboardButton("🔙 В главное меню", callback_data="back_to_main")]
+])
+
+PROBLEM_INPUT_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔙 Назад", callback_data="mode_creative")],
+    [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
+])
+
+TECH_PREFERENCE_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🌐 Веб-сайт", callback_data="tech_web")],
+    [InlineKeyboardButton("🤖 Телеграм-бот", callback_data="tech_bot")],
+    [InlineKeyboardButton("📱 Мобильное приложение", callback_data="tech_mobile")],
+    [InlineKeyboardButton("❓ Не знаю, посоветуй", callback_data="tech_any")],
+    [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
+])
+
+# Shown when AI is unavailable or rate limited
+EDUCATIONAL_FALLBACK_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📚 Изучить основы", callback_data="mode_educational")],
+    [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
+])
+
+RETRY_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Попробовать еще раз", callback_data="mode_creative")],
+    [InlineKeyboardButton("📚 Изучить основы", callback_data="mode_educational")],
+    [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
+])
+
+# Shown when the global token budget only allows cached ideas
+BUDGET_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🗂 Мои идеи", callback_data="history_0")],
+    [InlineKeyboardButton("📚 Изучить основы", callback_data="mode_educational")],
+    [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
+])
+
+def build_results_markup(count: int) -> InlineKeyboardMarkup:
+    """Buttons under generated ideas: rework any one of them, or start over."""
+    rows = [
+        [
+            InlineKeyboardButton(f"✏️ Уточнить идею {number}", callback_data=f"refine_{number}"),
+            InlineKeyboardButton("🪶 Упростить", callback_data=f"simplify_{number}"),
+        ]
+        for number in range(1, count + 1)
+    ]
+    rows.append([InlineKeyboardButton("💡 Еще идеи", callback_data="mode_creative")])
+    rows.append([InlineKeyboardButton("📚 Изучить основы", callback_data="mode_educational")])
+    rows.append([InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")])
+    return InlineKeyboardMarkup(rows)
+
+
+def build_refined_markup(number: int) -> InlineKeyboardMarkup:
+    """Buttons under a reworked idea (also shown when reworking it failed)."""
+    return InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton("✏️ Еще подробнее", callback_data=f"refine_{number}"),
+            InlineKeyboardButton("🪶 Еще проще", callback_data=f"simplify_{number}"),
+        ],
+        [InlineKeyboardButton("🔙 Ко всем идеям", callback_data="ideas_all")],
+        [InlineKeyboardButton("💡 Еще идеи", callback_data="mode_creative")],
+        [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
+    ])
+
+
+# Shown when an equivalent questionnaire is answered from the idea history
+REUSED_RESULTS_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔄 Сгенерировать новые", callback_data="ideas_regenerate")],
+    [InlineKeyboardButton("🗂 Мои идеи", callback_data="history_0")],
+    [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
+])
+
+HISTORY_EMPTY_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("💡 Придумать проект", callback_data="mode_creative")],
+    [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
+])
+
+
+def build_history_markup(index: int, total: int) -> InlineKeyboardMarkup:
+    """Pager for the idea history (one stored result per page)."""
+    nav = []
+    if index > 0:
+        nav.append(InlineKeyboardButton("◀️ Новее", callback_data=f"history_{index - 1}"))
+    if index + 1 < total:
+        nav.append(InlineKeyboardButton("Старее ▶️", callback_data=f"history_{index + 1}"))
+    rows = [nav] if nav else []
+    rows.append([InlineKeyboardButton("💡 Придумать проект", callback_data="mode_creative")])
+    rows.append([InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")])
+    return InlineKeyboardMarkup(rows)
+
+
+# Keyboards shown by this module, keyed by the conversation state they are shown in
+EMITTED_KEYBOARDS = {
+    1: [  # MODE_SELECTION
+        EDUCATIONAL_FALLBACK_MARKUP, BUDGET_MARKUP, RETRY_MARKUP, build_results_markup(3),
+        build_refined_markup(2), REUSED_RESULTS_MARKUP, HISTORY_EMPTY_MARKUP, build_history_markup(1, 3),
+    ],
+    4: [TARGET_AUDIENCE_MARKUP, PROBLEM_INPUT_MARKUP, TECH_PREFERENCE_MARKUP],  # CREATIVE_INPUT
+}
+
+# Callback arg -> human-readable answer
+AUDIENCE_MAP = {
+    "self": "Для себя (учеба/хобби)",
+    "work": "Для работы/организации",
+    "business": "Для бизнеса/стартапа"
+}
+
+TECH_MAP = {
+    "web": "Веб-сайт",
+    "bot": "Телеграм-бот",
+    "mobile": "Мобильное приложение",
+    "any": "Не знаю, посоветуй"
+}
 
-def get_gpt_client() -> YandexGPTClient:
-    """Get or create GPT client instance."""
+
+def get_gpt_client() -> Optional["YandexGPTClient"]:
+    """Get or create GPT client instance.
+    
+    The client module (and aiohttp with it) is imported on first use, so
+    startup does not pay for it and it is never loaded without credentials.
+    """
     global gpt_client
     if gpt_client is None:
         if not YANDEX_GPT_API_KEY or not YANDEX_FOLDER_ID:
             logger.warning("Yandex GPT credentials not configured")
             return None
-        gpt_client = YandexGPTClient(YANDEX_GPT_API_KEY, YANDEX_FOLDER_ID)
+        from src.utils.yandex_gpt import YandexGPTClient
+        gpt_client = YandexGPTClient(YANDEX_GPT_API_KEY, YANDEX_FOLDER_ID, admission=admission,
+                                     generation_mode=GPT_GENERATION_MODE)
     return gpt_client
 
 
+async def close_gpt_client() -> None:
+    """Close the GPT client's connections, if it was ever created (on shutdown)."""
+    if gpt_client is not None:
+        await gpt_client.close()
+
+
+def build_result_message(client: "YandexGPTClient", result: dict) -> tuple:
+    """Turn a generate_ideas result into (text, reply_markup)."""
+    if result.get("error"):
+        error_msg = result.get("message", "❌ Неизвестная ошибка")
+        
+        if result.get("error") == "rate_limit":
+            # Rate limit error - show when can retry
+            return error_msg, EDUCATIONAL_FALLBACK_MARKUP
+        if result.get("error") == "budget":
+            # Token budget low - cached ideas only
+            return error_msg, BUDGET_MARKUP
+        # Other errors - offer to try again
+        return error_msg, RETRY_MARKUP
+    
+    # Success - format ideas
+    return client.format_ideas_for_telegram(result['ideas']), build_results_markup(len(result['ideas']))
+
+
+async def resume_pending_generations(bot, pending: list) -> None:
+    """Finish generations deferred by the previous instance and edit their waiting messages."""
+    client = get_gpt_client()
+    if not client:
+        return
+    
+    async def generate(item: PendingGeneration) -> dict:
+        result = await client.generate_ideas(item.user_id, item.context)
+        return await client.salvage_ideas(item.user_id, item.context, result)
+    
+    async def finish(item: PendingGeneration) -> None:
+        # Charged to the bot the request came from (each item runs in its own task)
+        set_current_tenant(item.tenant)
+        result = await generation_tracker.run(item, generate(item))
+        if result is None:
+            return  # Deferred again - shutting down
+        if result.get("success"):
+            await idea_history.add(item.user_id, item.context, result['ideas'])
+        text, reply_markup = build_result_message(client, result)
+        await bot.edit_message_text(
+            text,
+            chat_id=item.chat_id,
+            message_id=item.message_id,
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+        logger.info("Resumed deferred generation for user %s", item.user_id)
+    
+    results = await asyncio.gather(*(finish(item) for item in pending), return_exceptions=True)
+    for item, outcome in zip(pending, results):
+        if isinstance(outcome, Exception):
+            logger.error("Failed to resume generation for user %s: %s", item.user_id, outcome)
+
+
+@timed_handler
+@answers_callback
 async def creative_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Show creative mode menu - start context collection."""
     query = update.callback_query
-    await query.answer()
+    
+    level = admission.level_for(update.effective_user.id)
+    if level >= EDUCATIONAL_ONLY:
+        # Token budget exhausted - don't start a questionnaire that can't be answered
+        message = """🌙 **Генератор идей отдыхает**
+
+Общий лимит AI на сейчас исчерпан. Новые идеи снова будут доступны позже.
+
+А пока можно изучить основы создания проектов →"""
+        await query.edit_message_text(message, reply_markup=EDUCATIONAL_FALLBACK_MARKUP, parse_mode='Markdown')
+        return 1  # MODE_SELECTION
+    if level == CACHED_ONLY:
+        # Only stored ideas can be shown - don't ask 3 questions to refuse at the end
+        message = """🌙 **Новые идеи на паузе**
+
+Общий лимит AI почти исчерпан, поэтому сейчас я показываю только уже придуманные идеи. За новыми возвращайся чуть позже!
+
+Загляни в «Мои идеи» или изучи основы →"""
+        await query.edit_message_text(message, reply_markup=BUDGET_MARKUP, parse_mode='Markdown')
+        return 1  # MODE_SELECTION
     
     # Initialize context collection
-    context.user_data['creative_context'] = {}
-    context.user_data['creative_step'] = 1
+    context.user_data.start_creative()
+    prefetcher.cancel(update.effective_user.id)
+    analytics.record(CREATIVE_STARTED, update.effective_user.id)
     
     message = """💡 **Генератор идей проектов**
 
@@ -42,34 +291,22 @@ async def creative_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
 **Вопрос 1 из 3:**
 Для кого будет этот проект?"""
     
-    keyboard = [
-        [InlineKeyboardButton("🎓 Для себя (учеба/хобби)", callback_data="target_self")],
-        [InlineKeyboardButton("💼 Для работы/организации", callback_data="target_work")],
-        [InlineKeyboardButton("🚀 Для бизнеса/стартапа", callback_data="target_business")],
-        [InlineKeyboardButton("🔙 В главное меню", callback_data="back_to_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+    await query.edit_message_text(message, reply_markup=TARGET_AUDIENCE_MARKUP, parse_mode='Markdown')
     
     return 4  # CREATIVE_INPUT state
 
 
+@timed_handler
+@answers_callback
 async def handle_target_audience(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle target audience selection (Question 1)."""
     query = update.callback_query
-    await query.answer()
-    
-    # Map callback data to audience text
-    audience_map = {
-        "target_self": "Для себя (учеба/хобби)",
-        "target_work": "Для работы/организации",
-        "target_business": "Для бизнеса/стартапа"
-    }
     
-    audience = audience_map.get(query.data, "не указано")
-    context.user_data['creative_context']['target_audience'] = audience
-    context.user_data['creative_step'] = 2
+    # Map callback arg to audience text
+    audience = AUDIENCE_MAP.get(context.callback_arg, "не указано")
+    context.user_data.target_audience = audience
+    context.user_data.creative_step = 2
+    analytics.record(AUDIENCE_SELECTED, update.effective_user.id, context.callback_arg)
     
     message = """✅ Отлично!
 
@@ -79,60 +316,159 @@ async def handle_target_audience(update: Update, context: ContextTypes.DEFAULT_T
 💬 Напиши своими словами:
 _Например: "Хочу сайт для книжного клуба" или "Нужна автоматизация отчетов"_"""
     
-    keyboard = [
-        [InlineKeyboardButton("🔙 Назад", callback_data="mode_creative")],
-        [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+    await query.edit_message_text(message, reply_markup=PROBLEM_INPUT_MARKUP, parse_mode='Markdown')
     
     return 4  # Stay in CREATIVE_INPUT state
 
 
+@timed_handler
 async def handle_problem_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle problem/goal text input (Question 2)."""
     user_input = update.message.text
     
     # Save problem description
-    context.user_data['creative_context']['problem'] = user_input
-    context.user_data['creative_step'] = 3
+    context.user_data.problem = user_input
+    context.user_data.creative_step = 3
+    analytics.record(PROBLEM_ENTERED, update.effective_user.id)
     
     message = """✅ Понял!
 
 **Вопрос 3 из 3:**
 Какой тип проекта тебе интереснее?"""
     
-    keyboard = [
-        [InlineKeyboardButton("🌐 Веб-сайт", callback_data="tech_web")],
-        [InlineKeyboardButton("🤖 Телеграм-бот", callback_data="tech_bot")],
-        [InlineKeyboardButton("📱 Мобильное приложение", callback_data="tech_mobile")],
-        [InlineKeyboardButton("❓ Не знаю, посоветуй", callback_data="tech_any")],
-        [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    await update.message.reply_text(message, reply_markup=TECH_PREFERENCE_MARKUP, parse_mode='Markdown')
     
-    await update.message.reply_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+    if SPECULATIVE_PREFETCH:
+        # Use the user's think-time on question 3
+        await start_speculation(update.effective_user.id, context.user_data.creative_context())
     
     return 4  # Stay in CREATIVE_INPUT state
 
 
+async def predict_tech_preference(user_id: int) -> str:
+    """The project type the user chose last time (idea history), else the neutral choice."""
+    entry, _ = await idea_history.page(user_id, 0)
+    if entry is not None and entry.context.get('tech_preference') in TECH_MAP.values():
+        return entry.context['tech_preference']
+    return TECH_MAP["any"]
+
+
+async def start_speculation(user_id: int, creative_context: dict) -> None:
+    """Start generating for the predicted answer to question 3 in the background."""
+    client = get_gpt_client()
+    if not client or admission.global_level() != FULL:
+        return  # No speculative spending while the token budget is under pressure
+    
+    predicted = dict(creative_context, tech_preference=await predict_tech_preference(user_id))
+    if await idea_history.find(user_id, predicted):
+        return  # Would be answered from the history anyway
+    allowed, _ = client.rate_limiter.can_request(user_id)
+    if not allowed:
+        return
+    
+    # Not charged to the user's quota until the result is shown
+    prefetcher.start(user_id, predicted, lambda: client.generate_ideas(user_id, predicted, charge=False))
+
+
+async def claim_speculation(client: "YandexGPTClient", user_id: int, creative_context: dict,
+                            task: asyncio.Task) -> dict:
+    """Finish a matching speculative generation and charge the quota for it.
+    
+    A failed speculation is retried as a regular generation unless it can be repaired.
+    """
+    result = await task
+    if result.get("success"):
+        client.rate_limiter.record_request(user_id)
+        return result
+    if result.get("broken"):
+        return result  # salvage_ideas repairs it (and charges the quota if it succeeds)
+    return await client.generate_ideas(user_id, creative_context)
+
+
+@timed_handler
+@answers_callback
 async def handle_tech_preference(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle tech preference selection (Question 3) and generate ideas."""
     query = update.callback_query
-    await query.answer()
     
-    # Map callback data to tech preference text
-    tech_map = {
-        "tech_web": "Веб-сайт",
-        "tech_bot": "Телеграм-бот",
-        "tech_mobile": "Мобильное приложение",
-        "tech_any": "Не знаю, посоветуй"
-    }
+    # Map callback arg to tech preference text
+    tech = TECH_MAP.get(context.callback_arg, "не указано")
+    context.user_data.tech_preference = tech
+    analytics.record(TECH_SELECTED, update.effective_user.id, context.callback_arg)
     
-    tech = tech_map.get(query.data, "не указано")
-    context.user_data['creative_context']['tech_preference'] = tech
+    # Same questionnaire as before - answer from the history without a GPT call
+    user_id = update.effective_user.id
+    creative_context = context.user_data.creative_context()
+    ideas = await idea_history.find(user_id, creative_context)
+    if ideas:
+        prefetcher.cancel(user_id)
+        analytics.record(IDEAS_REUSED, user_id)
+        context.user_data.show_ideas(ideas, creative_context)
+        message = "♻️ **Ты уже спрашивал об этом — вот идеи из твоей истории:**\n\n" + format_ideas(ideas)
+        await query.edit_message_text(message, reply_markup=REUSED_RESULTS_MARKUP, parse_mode='Markdown')
+        return 1  # Return to MODE_SELECTION
     
+    return await generate_and_show_ideas(query, user_id, creative_context, context.user_data)
+
+
+@timed_handler
+@answers_callback
+async def regenerate_ideas(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Generate fresh ideas for the last questionnaire, bypassing the history."""
+    query = update.callback_query
+    
+    session = context.user_data
+    if session.tech_preference is None:
+        # Session expired since the answers were given - ask again
+        return await creative_menu(update, context)
+    
+    return await generate_and_show_ideas(query, update.effective_user.id, session.creative_context(), session)
+
+
+@timed_handler
+@answers_callback
+async def show_idea_history(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Show one stored result from the user's idea history (no GPT call)."""
+    query = update.callback_query
+    
+    user_id = update.effective_user.id
+    index = int(context.callback_arg) if context.callback_arg.isdigit() else 0
+    entry, total = await idea_history.page(user_id, index)
+    if entry is None and total:
+        # Old pager button after the history was pruned - show the oldest result
+        index = total - 1
+        entry, total = await idea_history.page(user_id, index)
+    analytics.record(HISTORY_OPENED, user_id, str(index))
+    
+    if entry is None:
+        message = """🗂 **Мои идеи**
+
+Здесь будут идеи, которые я для тебя придумал. Пока их нет - давай придумаем первую!"""
+        await query.edit_message_text(message, reply_markup=HISTORY_EMPTY_MARKUP, parse_mode='Markdown')
+        return 1  # MODE_SELECTION
+    
+    await query.edit_message_text(
+        format_history_entry(entry, index, total),
+        reply_markup=build_history_markup(index, total),
+        parse_mode='Markdown'
+    )
+    return 1  # MODE_SELECTION
+
+
+def format_history_entry(entry: HistoryEntry, index: int, total: int) -> str:
+    """Render a stored result with its date and the problem it was generated for."""
+    created = time.strftime("%d.%m.%Y", time.localtime(entry.created_at))
+    problem = escape_markdown(entry.context.get('problem', 'не указано'))
+    return (
+        f"🗂 **Мои идеи** ({index + 1} из {total}) · {created}\n"
+        f"Запрос: {problem}\n\n"
+        + format_ideas(entry.ideas)
+    )
+
+
+async def generate_and_show_ideas(query: CallbackQuery, user_id: int, creative_context: dict,
+                                  session: UserSession) -> int:
+    """Call GPT for a questionnaire and replace the button message with the result."""
     # Show loading message
     loading_message = """⏳ **Обрабатываю твой запрос...**
 
@@ -140,12 +476,14 @@ async def handle_tech_preference(update: Update, context: ContextTypes.DEFAULT_T
 
 🤖 AI думает..."""
     
-    await query.edit_message_text(loading_message, parse_mode='Markdown')
-    
+    # Sent while GPT works; later edits of the message wait for it (Telegram applies edits in arrival order)
+    loading = start_call(query.edit_message_text(loading_message, parse_mode='Markdown'), "loading edit")
+        
     # Get GPT client
     client = get_gpt_client()
     
     if not client:
+        await loading
         # API credentials not configured - show helpful message
         error_message = """⚠️ **Режим AI временно недоступен**
 
@@ -158,64 +496,159 @@ async def handle_tech_preference(update: Update, context: ContextTypes.DEFAULT_T
 
 А пока предлагаю изучить основы создания проектов →"""
         
-        keyboard = [
-            [InlineKeyboardButton("📚 Изучить основы", callback_data="mode_educational")],
-            [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await query.edit_message_text(error_message, reply_markup=reply_markup, parse_mode='Markdown')
+        await query.edit_message_text(error_message, reply_markup=EDUCATIONAL_FALLBACK_MARKUP, parse_mode='Markdown')
         return 1  # Return to MODE_SELECTION
     
     # Generate ideas using Yandex GPT
-    user_id = update.effective_user.id
-    creative_context = context.user_data['creative_context']
+    # (tracked so a deploy can drain it or hand it over to the next instance)
+    pending = PendingGeneration(user_id, query.message.chat_id, query.message.message_id, creative_context)
+    speculation = prefetcher.take(user_id, creative_context)
     
-    result = await client.generate_ideas(user_id, creative_context)
+    shown_partial = []
     
-    if result.get("error"):
-        # Handle errors
-        error_msg = result.get("message", "❌ Неизвестная ошибка")
-        
-        if result.get("error") == "rate_limit":
-            # Rate limit error - show when can retry
-            keyboard = [
-                [InlineKeyboardButton("📚 Изучить основы", callback_data="mode_educational")],
-                [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
-            ]
+    async def show_partial(partial: dict) -> None:
+        # Valid ideas go out right away; the rest are still being written or repaired
+        text, _ = build_result_message(client, partial)
+        if shown_partial and shown_partial[-1] == text:
+            return  # Same ideas as already shown (Telegram rejects unchanged edits)
+        shown_partial.append(text)
+        await loading
+        await query.edit_message_text(text + "\n\n⏳ _Дорабатываю остальные идеи..._", parse_mode='Markdown')
+    
+    async def generate() -> dict:
+        if speculation is not None:
+            result = await claim_speculation(client, user_id, creative_context, speculation)
         else:
-            # Other errors - offer to try again
-            keyboard = [
-                [InlineKeyboardButton("🔄 Попробовать еще раз", callback_data="mode_creative")],
-                [InlineKeyboardButton("📚 Изучить основы", callback_data="mode_educational")],
-                [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
-            ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_text(error_msg, reply_markup=reply_markup, parse_mode='Markdown')
-        return 1  # Return to MODE_SELECTION
+            result = await client.generate_ideas(user_id, creative_context, on_partial=show_partial)
+        return await client.salvage_ideas(user_id, creative_context, result, show_partial)
     
-    # Success - format and show ideas
-    ideas = result['ideas']
-    formatted_message = client.format_ideas_for_telegram(ideas)
+    started = time.perf_counter()
+    try:
+        result = await generation_tracker.run(pending, generate())
+    finally:
+        await loading
     
-    keyboard = [
-        [InlineKeyboardButton("💡 Еще идеи", callback_data="mode_creative")],
-        [InlineKeyboardButton("📚 Изучить основы", callback_data="mode_educational")],
-        [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    if result is None:
+        # Bot is restarting - the next instance will edit the loading message
+        return 1  # Return to MODE_SELECTION
     
-    await query.edit_message_text(formatted_message, reply_markup=reply_markup, parse_mode='Markdown')
+    elapsed = time.perf_counter() - started
+    if result.get("error"):
+        analytics.record(GPT_FAILED, user_id, result["error"], elapsed)
+    else:
+        analytics.record(IDEAS_SHOWN, user_id, "", elapsed)
+        session.show_ideas(result['ideas'], creative_context)
+        await idea_history.add(user_id, creative_context, result['ideas'])
+    
+    text, reply_markup = build_result_message(client, result)
+    await query.edit_message_text(text, reply_markup=reply_markup, parse_mode='Markdown')
     
-    logger.info(f"Successfully generated and displayed {len(ideas)} ideas for user {user_id}")
+    if result.get("success"):
+        logger.info("Successfully generated and displayed %d ideas for user %s", len(result['ideas']), user_id)
     
     return 1  # Return to MODE_SELECTION
 
 
+async def current_ideas(session: UserSession, user_id: int) -> tuple:
+    """Ideas on the user's screen and their questionnaire: from the session, else the newest history entry."""
+    if session.ideas:
+        return session.ideas, session.ideas_context
+    # Session expired (or the result came from a resumed generation)
+    entry, _ = await idea_history.page(user_id, 0)
+    if entry is None:
+        return None, None
+    return entry.ideas, entry.context
+
+
+@timed_handler
+@answers_callback
+async def refine_idea(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Make one shown idea more concrete ("✏️ Уточнить идею N")."""
+    return await rework_idea(update, context, "refine")
+
+
+@timed_handler
+@answers_callback
+async def simplify_idea(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Make one shown idea simpler ("🪶 Упростить")."""
+    return await rework_idea(update, context, "simplify")
+
+
+async def rework_idea(update: Update, context: ContextTypes.DEFAULT_TYPE, mode: str) -> int:
+    """Rework idea N with a compact GPT call instead of a new questionnaire and full generation."""
+    query = update.callback_query
+    
+    user_id = update.effective_user.id
+    session = context.user_data
+    ideas, creative_context = await current_ideas(session, user_id)
+    number = int(context.callback_arg) if context.callback_arg.isdigit() else 0
+    if not ideas or not 1 <= number <= len(ideas):
+        # Nothing to rework any more - start a new questionnaire
+        return await creative_menu(update, context)
+    
+    client = get_gpt_client()
+    if not client:
+        await query.edit_message_text("⚠️ Режим AI временно недоступен.", reply_markup=EDUCATIONAL_FALLBACK_MARKUP)
+        return 1  # MODE_SELECTION
+    
+    action = "Уточняю" if mode == "refine" else "Упрощаю"
+    loading = start_call(query.edit_message_text(f"⏳ **{action} идею {number}...**", parse_mode='Markdown'),
+                         "loading edit")
+    
+    started = time.perf_counter()
+    try:
+        result = await client.refine_idea(user_id, creative_context, ideas[number - 1], mode)
+    finally:
+        await loading
+    elapsed = time.perf_counter() - started
+    
+    if result.get("error"):
+        analytics.record(GPT_FAILED, user_id, result["error"], elapsed)
+        if result["error"] == "rate_limit":
+            reply_markup = EDUCATIONAL_FALLBACK_MARKUP
+        elif result["error"] == "budget":
+            reply_markup = BUDGET_MARKUP
+        else:
+            reply_markup = build_refined_markup(number)
+        await query.edit_message_text(result.get("message", "❌ Неизвестная ошибка"), reply_markup=reply_markup)
+        return 1  # MODE_SELECTION
+    
+    analytics.record(IDEA_REFINED, user_id, mode, elapsed)
+    ideas = list(ideas)
+    ideas[number - 1] = result['idea']
+    session.show_ideas(ideas, creative_context)
+    
+    header = "✏️ **Идея подробнее:**" if mode == "refine" else "🪶 **Идея попроще:**"
+    await query.edit_message_text(
+        f"{header}\n\n" + format_ideas([result['idea']], start=number),
+        reply_markup=build_refined_markup(number),
+        parse_mode='Markdown'
+    )
+    return 1  # MODE_SELECTION
+
+
+@timed_handler
+@answers_callback
+async def show_current_ideas(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Show all ideas again, including reworked ones (no GPT call)."""
+    query = update.callback_query
+    
+    ideas, _ = await current_ideas(context.user_data, update.effective_user.id)
+    if not ideas:
+        return await creative_menu(update, context)
+    
+    await query.edit_message_text(
+        "🎨 **Вот идеи для твоего проекта:**\n\n" + format_ideas(ideas),
+        reply_markup=build_results_markup(len(ideas)),
+        parse_mode='Markdown'
+    )
+    return 1  # MODE_SELECTION
+
+
+@timed_handler
 async def process_creative_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Route creative input based on current step."""
-    step = context.user_data.get('creative_step', 1)
+    step = context.user_data.creative_step
     
     if step == 2:
         # Expecting problem description text
@@ -3,6 +3,12 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
+from src.utils.analytics import analytics, TOPIC_OPENED
+from src.utils.metrics import timed_handler
+from src.utils.pipelining import answers_callback
+
+from .common_handler import MAIN_MENU_MARKUP
+
 
 # Educational Topics Content (from Creative Phase: Content Design)
 EDUCATIONAL_TOPICS = {
@@ -174,105 +180,126 @@ TOPIC_SEQUENCE = {
 }
 
 
+# 2-column grid layout per UI/UX design
+TOPICS_MENU_MARKUP = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("🖥️ Cursor", callback_data="topic_cursor"),
+        InlineKeyboardButton("🐙 GitHub", callback_data="topic_github")
+    ],
+    [
+        InlineKeyboardButton("📦 Git", callback_data="topic_git"),
+        InlineKeyboardButton("🔗 Cursor+GitHub", callback_data="topic_cursor_github")
+    ],
+    [
+        InlineKeyboardButton("⬆️ Push", callback_data="topic_push"),
+        InlineKeyboardButton("🚂 Railway", callback_data="topic_railway")
+    ],
+    [InlineKeyboardButton("🔙 В меню", callback_data="back_to_main")]
+])
+
+
+def _build_topic_markup(topic_id: str) -> InlineKeyboardMarkup:
+    """Build navigation keyboard for a topic page."""
+    next_topic_id = EDUCATIONAL_TOPICS[topic_id].get("next_topic")
+    keyboard = []
+    
+    if next_topic_id:
+        next_topic = EDUCATIONAL_TOPICS[next_topic_id]
+        keyboard.append([
+            InlineKeyboardButton(f"⏭️ {next_topic['title']}", callback_data=f"topic_{next_topic_id}"),
+            InlineKeyboardButton("🔙 К темам", callback_data="back_to_topics")
+        ])
+    else:
+        # Last topic - suggest Creative Mode
+        keyboard.append([
+            InlineKeyboardButton("💡 Придумать проект", callback_data="mode_creative"),
+            InlineKeyboardButton("🔙 К темам", callback_data="back_to_topics")
+        ])
+    
+    keyboard.append([InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")])
+    
+    return InlineKeyboardMarkup(keyboard)
+
+
+def _build_topic_page(topic_id: str) -> str:
+    """Build full page text for a topic."""
+    topic = EDUCATIONAL_TOPICS[topic_id]
+    content = topic["content"]
+    # Special message for completing all topics
+    if not topic.get("next_topic"):
+        content += "\n\n🎉 **Поздравляю!** Ты изучил все основы. Теперь можно придумать свой проект →"
+    return content
+
+
+# Topic pages and keyboards are static - build them once at import
+TOPIC_MARKUPS = {topic_id: _build_topic_markup(topic_id) for topic_id in EDUCATIONAL_TOPICS}
+TOPIC_PAGES = {topic_id: _build_topic_page(topic_id) for topic_id in EDUCATIONAL_TOPICS}
+
+# Keyboards shown by this module, keyed by the conversation state they are shown in
+EMITTED_KEYBOARDS = {
+    1: [MAIN_MENU_MARKUP],  # MODE_SELECTION
+    2: [TOPICS_MENU_MARKUP],  # EDUCATIONAL_TOPICS
+    3: list(TOPIC_MARKUPS.values()),  # EDUCATIONAL_CONTENT
+}
+
+
+@timed_handler
+@answers_callback
 async def educational_menu(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Show educational topics menu (Level 2 of hierarchical menu)."""
     query = update.callback_query
-    await query.answer()
     
     message = """📚 **Основы создания цифровых проектов**
 
 Выбери тему, с которой хочешь начать:"""
     
-    # 2-column grid layout per UI/UX design
-    keyboard = [
-        [
-            InlineKeyboardButton("🖥️ Cursor", callback_data="topic_cursor"),
-            InlineKeyboardButton("🐙 GitHub", callback_data="topic_github")
-        ],
-        [
-            InlineKeyboardButton("📦 Git", callback_data="topic_git"),
-            InlineKeyboardButton("🔗 Cursor+GitHub", callback_data="topic_cursor_github")
-        ],
-        [
-            InlineKeyboardButton("⬆️ Push", callback_data="topic_push"),
-            InlineKeyboardButton("🚂 Railway", callback_data="topic_railway")
-        ],
-        [InlineKeyboardButton("🔙 В меню", callback_data="back_to_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await query.edit_message_text(message, reply_markup=reply_markup, parse_mode='Markdown')
+    await query.edit_message_text(message, reply_markup=TOPICS_MENU_MARKUP, parse_mode='Markdown')
     
     return 2  # EDUCATIONAL_TOPICS state
 
 
+@timed_handler
+@answers_callback
 async def show_topic(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Show selected topic content."""
     query = update.callback_query
-    await query.answer()
     
-    # Extract topic ID from callback_data
-    topic_id = query.data.replace("topic_", "")
+    # Topic ID is parsed once by the callback router
+    topic_id = getattr(context, 'callback_arg', None) or query.data.replace("topic_", "")
     
     topic = EDUCATIONAL_TOPICS.get(topic_id)
     if not topic:
         await query.edit_message_text("❌ Тема не найдена")
         return 2
     
-    # Get next topic for navigation
-    next_topic_id = topic.get("next_topic")
+    analytics.record(TOPIC_OPENED, update.effective_user.id, topic_id)
     
-    # Build navigation keyboard
-    keyboard = []
-    
-    if next_topic_id:
-        next_topic = EDUCATIONAL_TOPICS[next_topic_id]
-        keyboard.append([
-            InlineKeyboardButton(f"⏭️ {next_topic['title']}", callback_data=f"topic_{next_topic_id}"),
-            InlineKeyboardButton("🔙 К темам", callback_data="back_to_topics")
-        ])
-    else:
-        # Last topic - suggest Creative Mode
-        keyboard.append([
-            InlineKeyboardButton("💡 Придумать проект", callback_data="mode_creative"),
-            InlineKeyboardButton("🔙 К темам", callback_data="back_to_topics")
-        ])
-    
-    keyboard.append([InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")])
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    # Special message for completing all topics
-    content = topic["content"]
-    if not next_topic_id:
-        content += "\n\n🎉 **Поздравляю!** Ты изучил все основы. Теперь можно придумать свой проект →"
-    
-    await query.edit_message_text(content, reply_markup=reply_markup, parse_mode='Markdown')
+    await query.edit_message_text(
+        TOPIC_PAGES[topic_id],
+        reply_markup=TOPIC_MARKUPS[topic_id],
+        parse_mode='Markdown'
+    )
     
     return 3  # EDUCATIONAL_CONTENT state
 
 
+@timed_handler
+@answers_callback
 async def back_to_topics(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Return to educational topics menu."""
     return await educational_menu(update, context)
 
 
+@timed_handler
+@answers_callback
 async def back_to_main(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Return to main menu."""
     query = update.callback_query
-    await query.answer()
     
     message = """🏠 **Главное меню**
 
 Выбери, что хочешь сделать:"""
     
-    keyboard = [
-        [InlineKeyboardButton("📚 Изучить основы", callback_data="mode_educational")],
-        [InlineKeyboardButton("💡 Придумать проект", callback_data="mode_creative")],
-        [InlineKeyboardButton("❓ Помощь", callback_data="help")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await query.edit_message_text(message, reply_markup=reply_markup)
+    await query.edit_message_text(message, reply_markup=MAIN_MENU_MARKUP)
     
     return 1  # MODE_SELECTION state
@@ -0,0 +1,259 @@
+"""Free-text questions - answered offline from lesson sections and a curated FAQ."""
+
+import re
+
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes
+
+from src.config import FAQ_MIN_SCORE, FAQ_GPT_FALLBACK
+from src.utils.analytics import analytics, QUESTION_ASKED
+from src.utils.faq_search import Document, SearchIndex
+from src.utils.metrics import FAQ_ANSWERS, timed_handler
+from src.utils.tracing import span
+
+from .educational_handler import EDUCATIONAL_TOPICS
+
+_FROM_INDEX = FAQ_ANSWERS.labels("index")
+_FROM_GPT = FAQ_ANSWERS.labels("gpt")
+_MISSED = FAQ_ANSWERS.labels("miss")
+
+# Curated answers to questions the lessons don't cover directly
+FAQ_ENTRIES = [
+    {
+        "question": "Cursor платный? Сколько стоит Cursor?",
+        "answer": "У Cursor есть бесплатный тариф - его хватает, чтобы учиться и делать первые проекты. "
+                  "Платная подписка дает больше запросов к AI. Начни с бесплатного, а актуальные цены "
+                  "смотри на cursor.sh.",
+        "topic": "cursor",
+    },
+    {
+        "question": "Нужно ли знать английский для Cursor и программирования?",
+        "answer": "Не обязательно. Cursor понимает вопросы на русском и объясняет код по-русски. "
+                  "Английский пригодится со временем - для документации и сообщений об ошибках, "
+                  "но начать можно и без него.",
+        "topic": "cursor",
+    },
+    {
+        "question": "Чем Git отличается от GitHub?",
+        "answer": "Git - программа на твоем компьютере, которая хранит историю изменений кода. "
+                  "GitHub - сайт, где эта история хранится в облаке и доступна другим людям. "
+                  "Git работает и без GitHub, а GitHub без Git - нет.",
+        "topic": "git",
+    },
+    {
+        "question": "Что такое репозиторий?",
+        "answer": "Репозиторий - это папка проекта вместе со всей историей его изменений. "
+                  "Локальный репозиторий лежит на твоем компьютере, удаленный - на GitHub.",
+        "topic": "github",
+    },
+    {
+        "question": "Что такое коммит? Как сохранить изменения в Git?",
+        "answer": "Коммит - это снимок проекта в определенный момент с коротким описанием, что изменилось. "
+                  "Сначала ты делаешь коммит (сохраняешь версию у себя), потом пуш (отправляешь на GitHub).",
+        "topic": "push",
+    },
+    {
+        "question": "Как отменить изменения или вернуться к прошлой версии кода?",
+        "answer": "Git хранит все коммиты, поэтому к любой версии можно вернуться. Проще всего - "
+                  "во вкладке Source Control в Cursor: там видна история и можно откатить файл. "
+                  "Несохраненные изменения файла отменяются кнопкой Discard Changes.",
+        "topic": "git",
+    },
+    {
+        "question": "Ошибка git не является внутренней или внешней командой, git command not found",
+        "answer": "Значит, Git не установлен или терминал его не видит. Установи Git с git-scm.com, "
+                  "затем закрой и снова открой терминал (или перезапусти Cursor) и проверь командой "
+                  "git --version.",
+        "topic": "git",
+    },
+    {
+        "question": "Не получается сделать push: ошибка авторизации, permission denied, rejected",
+        "answer": "Чаще всего Cursor не подключен к GitHub. Подключи аккаунт через иконку профиля "
+                  "в Cursor (Connect to GitHub) и повтори пуш. Если ошибка rejected - сначала забери "
+                  "изменения с GitHub (Pull), а потом снова сделай пуш.",
+        "topic": "push",
+    },
+    {
+        "question": "Railway бесплатный? Сколько стоит хостинг на Railway?",
+        "answer": "У Railway есть пробный период с бесплатными кредитами, дальше - недорогой платный тариф. "
+                  "Небольшому боту или сайту обычно хватает минимального плана. Актуальные цены - "
+                  "на странице Pricing сайта railway.app.",
+        "topic": "railway",
+    },
+    {
+        "question": "Что такое деплой?",
+        "answer": "Деплой - это запуск проекта на сервере, чтобы он работал круглосуточно и был доступен "
+                  "другим людям, а не только на твоем компьютере.",
+        "topic": "railway",
+    },
+    {
+        "question": "Где хранить токен бота, пароли и API ключи? Как не выложить их на GitHub?",
+        "answer": "Храни секреты в файле .env и добавь его в .gitignore, чтобы он не попал на GitHub. "
+                  "На Railway те же значения задаются во вкладке Variables проекта.",
+        "topic": "railway",
+    },
+    {
+        "question": "Какой язык программирования выбрать новичку?",
+        "answer": "Для первых проектов удобен Python: простой синтаксис, много примеров, на нем легко "
+                  "сделать Телеграм-бота. Для сайтов пригодятся HTML, CSS и JavaScript. "
+                  "Cursor поможет с любым из них.",
+        "topic": None,
+    },
+    {
+        "question": "Не знаю, какой проект сделать. Как придумать идею?",
+        "answer": "Загляни в режим «💡 Придумать проект»: ответь на 3 вопроса, и я предложу идеи "
+                  "с технологиями и первыми шагами.",
+        "topic": None,
+    },
+]
+
+# Spellings users type for the tools in the lessons
+SYNONYMS = {
+    "гитхаб": "github", "гитхабе": "github", "гитхаба": "github", "гитхабом": "github",
+    "гит": "git", "гита": "git", "гите": "git", "гитом": "git",
+    "курсор": "cursor", "курсоре": "cursor", "курсора": "cursor", "курсором": "cursor",
+    "рейлвей": "railway", "рэйлвей": "railway", "рейлвэй": "railway",
+    "пуш": "push", "пушить": "push", "запушить": "push", "пушнуть": "push", "пушу": "push",
+    "деплой": "deploy", "деплоить": "deploy", "задеплоить": "deploy", "деплоя": "deploy", "деплою": "deploy",
+    "коммит": "commit", "коммита": "commit", "коммиты": "commit", "закоммитить": "commit",
+    "репо": "репозиторий",
+    "связать": "connect", "связка": "connect", "связки": "connect", "связываешь": "connect",
+    "связывать": "connect", "подключить": "connect", "подключи": "connect", "подключение": "connect",
+}
+
+# Sections answering "what is X" are merged into one; link lists are left to the full lesson
+INTRO_SECTIONS = ("Простыми словами", "Суть")
+SKIPPED_SECTIONS = ("Полезные ссылки",)
+
+_SECTION_RE = re.compile(r"^\*\*(.+?):\*\*\s*$", re.MULTILINE)
+# "GitHub - это платформа..." - the term a lesson defines
+_DEFINITION_RE = re.compile(r"^(\S+) - это ", re.MULTILINE)
+_FAQ_DEFINITION_RE = re.compile(r"^Что такое ([^?]+)\?")
+
+
+def lesson_sections():
+    """Split each lesson into its "**Heading:**" sections as (Document, searchable text).
+    
+    The intro sections become one document defining the term of its "X - это"
+    sentences; it is searched by the lesson title and that term (twice each)
+    and the "Суть" section, so "что такое X" lands on the definition rather
+    than on a section that merely mentions X.
+    """
+    for topic_id, topic in EDUCATIONAL_TOPICS.items():
+        content = topic["content"]
+        header = content.split("\n", 1)[0]
+        matches = list(_SECTION_RE.finditer(content))
+        intro = []
+        for i, match in enumerate(matches):
+            heading = match.group(1)
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(content)
+            block = f"**{heading}:**\n{content[match.end():end].strip()}"
+            if heading in INTRO_SECTIONS:
+                intro.append(block)
+            elif heading not in SKIPPED_SECTIONS:
+                yield (
+                    Document(f"{topic_id}#{i}", topic_id, topic["title"], f"{header}\n\n{block}"),
+                    f"{topic['title']} {block}",
+                )
+        if intro:
+            text = "\n\n".join(intro)
+            defined = list(dict.fromkeys(_DEFINITION_RE.findall(text)))
+            yield (
+                Document(f"{topic_id}#intro", topic_id, topic["title"], f"{header}\n\n{text}", ",".join(defined)),
+                f"{topic['title']} {topic['title']} {' '.join(defined * 2)} {intro[-1]}",
+            )
+
+
+def faq_documents():
+    """Curated FAQ entries as (Document, searchable text); the question counts twice."""
+    for i, entry in enumerate(FAQ_ENTRIES):
+        answer = f"❓ **{entry['question']}**\n\n{entry['answer']}"
+        defined = _FAQ_DEFINITION_RE.match(entry["question"])
+        yield (
+            Document(f"faq:{i}", entry["topic"], entry["question"], answer, defined.group(1) if defined else ""),
+            f"{entry['question']} {entry['question']} {entry['answer']}",
+        )
+
+
+def build_faq_index() -> SearchIndex:
+    """Index lesson sections and the FAQ."""
+    return SearchIndex(synonyms=SYNONYMS).build(list(lesson_sections()) + list(faq_documents()))
+
+
+# Built once at import - lessons and FAQ are static
+faq_index = build_faq_index()
+
+
+def _build_answer_markup(topic_id: str) -> InlineKeyboardMarkup:
+    """Buttons under an answer taken from (or related to) a lesson."""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(f"📖 Урок: {EDUCATIONAL_TOPICS[topic_id]['title']}", callback_data=f"topic_{topic_id}")],
+        [InlineKeyboardButton("🔙 К темам", callback_data="back_to_topics")],
+        [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
+    ])
+
+
+ANSWER_MARKUPS = {topic_id: _build_answer_markup(topic_id) for topic_id in EDUCATIONAL_TOPICS}
+
+# Answers not tied to a lesson, and questions nothing could answer
+GENERAL_ANSWER_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📚 Изучить основы", callback_data="mode_educational")],
+    [InlineKeyboardButton("💡 Придумать проект", callback_data="mode_creative")],
+    [InlineKeyboardButton("🏠 В главное меню", callback_data="back_to_main")]
+])
+
+# Keyboards shown by this module, keyed by the conversation state they are shown in
+EMITTED_KEYBOARDS = {
+    1: [GENERAL_ANSWER_MARKUP],  # MODE_SELECTION
+    3: list(ANSWER_MARKUPS.values()),  # EDUCATIONAL_CONTENT
+}
+
+NOT_FOUND_MESSAGE = """🤷 Не нашел ответа на этот вопрос.
+
+Попробуй спросить иначе или загляни в уроки - там пошагово разобраны Cursor, GitHub, Git и деплой."""
+
+
+@timed_handler
+async def answer_question(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Answer a free-text question from the lessons/FAQ index, falling back to GPT."""
+    question = update.message.text
+    user_id = update.effective_user.id
+
+    with span("faq.search"):
+        results = faq_index.search(question, limit=1)
+
+    if results and results[0][0] >= FAQ_MIN_SCORE:
+        score, document = results[0]
+        _FROM_INDEX.inc()
+        analytics.record(QUESTION_ASKED, user_id, document.doc_id, score)
+        if document.topic_id:
+            await update.message.reply_text(
+                document.answer, reply_markup=ANSWER_MARKUPS[document.topic_id], parse_mode='Markdown'
+            )
+            return 3  # EDUCATIONAL_CONTENT (lesson navigation buttons)
+        await update.message.reply_text(document.answer, reply_markup=GENERAL_ANSWER_MARKUP, parse_mode='Markdown')
+        return 1  # MODE_SELECTION
+
+    # Imported here: answering from the index does not need the idea flow loaded
+    from .creative_handler import get_gpt_client
+
+    client = get_gpt_client() if FAQ_GPT_FALLBACK else None
+    if client is None:
+        _MISSED.inc()
+        analytics.record(QUESTION_ASKED, user_id, "miss", results[0][0] if results else 0.0)
+        await update.message.reply_text(NOT_FOUND_MESSAGE, reply_markup=GENERAL_ANSWER_MARKUP)
+        return 1  # MODE_SELECTION
+
+    best_score = results[0][0] if results else 0.0
+    waiting = await update.message.reply_text("🤔 Ищу ответ...")
+    result = await client.answer_question(user_id, question)
+    if result.get("success"):
+        _FROM_GPT.inc()
+        analytics.record(QUESTION_ASKED, user_id, "gpt", best_score)
+        text = f"{result['answer']}\n\n🤖 Ответ подготовлен AI"
+    else:
+        _MISSED.inc()
+        analytics.record(QUESTION_ASKED, user_id, "miss", best_score)
+        text = result.get("message") if result.get("error") in ("rate_limit", "budget") else NOT_FOUND_MESSAGE
+    await waiting.edit_text(text, reply_markup=GENERAL_ANSWER_MARKUP)
+    return 1  # MODE_SELECTION
@@ -1,5 +1,26 @@
-"""Utilities package for DigiLib Assistant."""
+"""Utilities package for DigiLib Assistant.
 
-from .yandex_gpt import YandexGPTClient, RateLimiter
+The Yandex GPT client pulls in aiohttp, which dominates import time, so it is
+loaded on first access rather than at package import.
+"""
 
-__all__ = ['YandexGPTClient', 'RateLimiter']
+import importlib
+
+from .callback_router import CallbackRouter, parse_callback_data
+
+# Public name -> submodule, imported on first attribute access
+_LAZY_ATTRIBUTES = {
+    'YandexGPTClient': '.yandex_gpt',
+    'RateLimiter': '.yandex_gpt',
+}
+
+__all__ = ['YandexGPTClient', 'RateLimiter', 'CallbackRouter', 'parse_callback_data']
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,308 @@
+"""Global token budget admission control for Yandex GPT calls.
+
+``RateLimiter`` caps requests per user; this caps the folder's token spend.
+Every completion is admitted against hourly and daily token budgets before it
+is sent: the expected cost is reserved up front (so a burst of concurrent
+requests cannot overshoot) and settled with the reported usage afterwards.
+
+As the remaining budget shrinks, service degrades step by step instead of
+failing all at once:
+
+    FULL              normal generation
+    REDUCED           lower ``max_tokens``
+    CACHED_ONLY       no new generations, only ideas from the history
+    EDUCATIONAL_ONLY  creative mode closed, educational mode only
+
+Users who have used more than their weighted fair share of the hourly budget
+are served one step lower than everyone else.
+
+In multi-tenant mode a tenant may also have its own hourly/daily quota inside
+the global budget. Calls are admitted against whichever of the two has less
+left, so one library running out does not close creative mode for the others.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from .memory import memory_accounting
+from .metrics import Counter, GaugeFunc
+from .tenants import DEFAULT_TENANT, current_tenant
+
+logger = logging.getLogger(__name__)
+
+FULL = 0
+REDUCED = 1
+CACHED_ONLY = 2
+EDUCATIONAL_ONLY = 3
+
+LEVEL_NAMES = {
+    FULL: "full",
+    REDUCED: "reduced",
+    CACHED_ONLY: "cached_only",
+    EDUCATIONAL_ONLY: "educational_only",
+}
+
+# Rough prompt cost added to max_tokens when reserving (system + user prompt)
+PROMPT_TOKENS_ESTIMATE = 400
+
+ADMISSION_DECISIONS = Counter(
+    "digilib_gpt_admission_decisions_total", "GPT call admission decisions by degradation level", ["level"]
+)
+TOKEN_BUDGET_USED = GaugeFunc(
+    "digilib_gpt_token_budget_used", "GPT tokens used (incl. reserved) in the current window", ["window"]
+)
+TOKEN_BUDGET_LIMIT = GaugeFunc(
+    "digilib_gpt_token_budget_limit", "GPT token budget per window (0 = unlimited)", ["window"]
+)
+TENANT_TOKENS_USED = GaugeFunc(
+    "digilib_gpt_tenant_tokens_used", "GPT tokens used (incl. reserved) per tenant in the current window",
+    ["tenant", "window"]
+)
+DEGRADATION_LEVEL = GaugeFunc(
+    "digilib_gpt_degradation_level", "Current global degradation level (0 = full service)"
+)
+_DECISIONS = {level: ADMISSION_DECISIONS.labels(name) for level, name in LEVEL_NAMES.items()}
+
+
+class Admission:
+    """Outcome of admitting one completion call."""
+
+    __slots__ = ("user_id", "tenant", "level", "max_tokens", "reserved")
+
+    def __init__(self, user_id: int, level: int, max_tokens: int, reserved: int, tenant: str = DEFAULT_TENANT):
+        self.user_id = user_id
+        self.tenant = tenant
+        self.level = level
+        self.max_tokens = max_tokens
+        self.reserved = reserved
+
+    @property
+    def allowed(self) -> bool:
+        """Whether a new completion may be made."""
+        return self.level < CACHED_ONLY
+
+
+class AdmissionController:
+    """Hourly/daily token budgets with weighted fair share and a degradation ladder."""
+
+    def __init__(self, tokens_per_hour: int = 0, tokens_per_day: int = 0, reduced_max_tokens: int = 1000,
+                 reduce_below: float = 0.25, cached_below: float = 0.10):
+        """Initialize controller.
+
+        Args:
+            tokens_per_hour: Hourly token budget (0 = unlimited)
+            tokens_per_day: Daily token budget, UTC days (0 = unlimited)
+            reduced_max_tokens: Completion limit at the REDUCED level
+            reduce_below: Remaining budget fraction below which calls are REDUCED
+            cached_below: Remaining budget fraction below which only cached ideas are served
+        """
+        self.tokens_per_hour = tokens_per_hour
+        self.tokens_per_day = tokens_per_day
+        self.reduced_max_tokens = reduced_max_tokens
+        self.reduce_below = reduce_below
+        self.cached_below = cached_below
+        self._hour = self._day = -1
+        self._hour_used = self._day_used = 0
+        self._user_hour_used: Dict[int, int] = {}
+        self._weights: Dict[int, float] = {}
+        # Tenant id -> (tokens per hour, tokens per day); usage of tenants with a quota
+        self._tenant_limits: Dict[str, Tuple[int, int]] = {}
+        self._tenant_hour_used: Dict[str, int] = {}
+        self._tenant_day_used: Dict[str, int] = {}
+        TOKEN_BUDGET_USED.add_function(lambda: {("hour",): self.hour_used, ("day",): self.day_used})
+        TOKEN_BUDGET_LIMIT.add_function(lambda: {("hour",): self.tokens_per_hour, ("day",): self.tokens_per_day})
+        DEGRADATION_LEVEL.add_function(lambda: {(): self.global_level()})
+        TENANT_TOKENS_USED.add_function(self._tenant_samples)
+        memory_accounting.add_source("admission.user_hour_used", lambda: self._user_hour_used)
+
+    def _roll(self) -> None:
+        now = time.time()
+        hour, day = int(now // 3600), int(now // 86400)
+        if hour != self._hour:
+            self._hour, self._hour_used, self._user_hour_used, self._tenant_hour_used = hour, 0, {}, {}
+        if day != self._day:
+            self._day, self._day_used, self._tenant_day_used = day, 0, {}
+
+    @property
+    def hour_used(self) -> int:
+        self._roll()
+        return self._hour_used
+
+    @property
+    def day_used(self) -> int:
+        self._roll()
+        return self._day_used
+
+    def set_tenant_quota(self, tenant: str, tokens_per_hour: int, tokens_per_day: int) -> None:
+        """Give a tenant its own hourly/daily quota within the global budget (0 = none)."""
+        if tokens_per_hour or tokens_per_day:
+            self._tenant_limits[tenant] = (tokens_per_hour, tokens_per_day)
+        else:
+            self._tenant_limits.pop(tenant, None)
+
+    def remaining_fraction(self, tenant: Optional[str] = None) -> float:
+        """Smallest remaining share of the hourly and daily budgets (1.0 if unlimited).
+
+        Args:
+            tenant: Tenant whose quota also counts (default: the current tenant)
+        """
+        self._roll()
+        remaining = 1.0
+        if self.tokens_per_hour:
+            remaining = min(remaining, 1 - self._hour_used / self.tokens_per_hour)
+        if self.tokens_per_day:
+            remaining = min(remaining, 1 - self._day_used / self.tokens_per_day)
+        tenant = current_tenant() if tenant is None else tenant
+        per_hour, per_day = self._tenant_limits.get(tenant, (0, 0))
+        if per_hour:
+            remaining = min(remaining, 1 - self._tenant_hour_used.get(tenant, 0) / per_hour)
+        if per_day:
+            remaining = min(remaining, 1 - self._tenant_day_used.get(tenant, 0) / per_day)
+        return remaining
+
+    def global_level(self, tenant: Optional[str] = None) -> int:
+        """Degradation level for everyone (of the tenant), from the remaining budget."""
+        remaining = self.remaining_fraction(tenant)
+        if remaining <= 0:
+            return EDUCATIONAL_ONLY
+        if remaining < self.cached_below:
+            return CACHED_ONLY
+        if remaining < self.reduce_below:
+            return REDUCED
+        return FULL
+
+    def set_weight(self, user_id: int, weight: float) -> None:
+        """Give a user a larger (or smaller) fair share; the default weight is 1."""
+        self._weights[user_id] = weight
+
+    def fair_share(self, user_id: int) -> float:
+        """User's weighted share of the hourly budget among users active this hour."""
+        self._roll()
+        if not self.tokens_per_hour:
+            return float("inf")
+        active = set(self._user_hour_used) | {user_id}
+        total_weight = sum(self._weights.get(uid, 1.0) for uid in active)
+        return self.tokens_per_hour * self._weights.get(user_id, 1.0) / total_weight
+
+    def level_for(self, user_id: int, tenant: Optional[str] = None) -> int:
+        """Level a completion for the user would get now, without reserving anything."""
+        level = self.global_level(tenant)
+        if level < CACHED_ONLY and self._user_hour_used.get(user_id, 0) > self.fair_share(user_id):
+            level += 1  # Heavy users degrade first
+        return level
+
+    def admit(self, user_id: int, max_tokens: int) -> Admission:
+        """Decide how (and whether) a completion for a user may run, reserving its cost.
+
+        Args:
+            user_id: Telegram user ID
+            max_tokens: Completion limit the caller would like
+
+        Returns:
+            Admission with the level and granted max_tokens; settle() it after the call
+        """
+        tenant = current_tenant()
+        level = self.level_for(user_id, tenant)
+        if level == REDUCED:
+            max_tokens = min(max_tokens, self.reduced_max_tokens)
+        reserved = PROMPT_TOKENS_ESTIMATE + max_tokens if level < CACHED_ONLY else 0
+        self._charge(user_id, tenant, reserved)
+        _DECISIONS[level].inc()
+        return Admission(user_id, level, max_tokens, reserved, tenant)
+
+    def settle(self, admission: Admission, tokens_used: int) -> None:
+        """Replace an admission's reservation with the tokens actually used."""
+        self._charge(admission.user_id, admission.tenant, tokens_used - admission.reserved)
+        admission.reserved = tokens_used
+
+    def _charge(self, user_id: int, tenant: str, tokens: int) -> None:
+        if not tokens:
+            return
+        self._roll()
+        self._hour_used = max(0, self._hour_used + tokens)
+        self._day_used = max(0, self._day_used + tokens)
+        self._user_hour_used[user_id] = max(0, self._user_hour_used.get(user_id, 0) + tokens)
+        self._tenant_hour_used[tenant] = max(0, self._tenant_hour_used.get(tenant, 0) + tokens)
+        self._tenant_day_used[tenant] = max(0, self._tenant_day_used.get(tenant, 0) + tokens)
+
+    def _tenant_samples(self) -> Dict[Tuple[str, ...], int]:
+        self._roll()
+        samples = {}
+        for tenant, used in self._tenant_hour_used.items():
+            samples[(tenant, "hour")] = used
+        for tenant, used in self._tenant_day_used.items():
+            samples[(tenant, "day")] = used
+        return samples
+
+    def snapshot(self) -> Dict:
+        """Budget state for the ops endpoint."""
+        self._roll()
+        top = sorted(self._user_hour_used.items(), key=lambda item: item[1], reverse=True)[:10]
+        # Without an hourly budget (e.g. only tenant quotas) the fair share is unbounded
+        limited = bool(self.tokens_per_hour)
+        return {
+            "level": LEVEL_NAMES[self.global_level()],
+            "hour": {"used": self._hour_used, "limit": self.tokens_per_hour},
+            "day": {"used": self._day_used, "limit": self.tokens_per_day},
+            "remaining_fraction": round(self.remaining_fraction(), 3),
+            "active_users": len(self._user_hour_used),
+            "top_users_hour": [
+                {"user_id": uid, "tokens": used, "fair_share": round(self.fair_share(uid)) if limited else None}
+                for uid, used in top
+            ],
+            "tenants": {
+                tenant: {
+                    "level": LEVEL_NAMES[self.global_level(tenant)],
+                    "hour": {"used": self._tenant_hour_used.get(tenant, 0),
+                             "limit": self._tenant_limits.get(tenant, (0, 0))[0]},
+                    "day": {"used": self._tenant_day_used.get(tenant, 0),
+                            "limit": self._tenant_limits.get(tenant, (0, 0))[1]},
+                }
+                for tenant in sorted(set(self._tenant_day_used) | set(self._tenant_limits))
+            },
+        }
+
+    def save(self, path: str) -> None:
+        """Persist current window usage so a restart does not reset the budget."""
+        self._roll()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        state = {
+            "hour": self._hour,
+            "hour_used": self._hour_used,
+            "day": self._day,
+            "day_used": self._day_used,
+            "user_hour_used": {str(uid): used for uid, used in self._user_hour_used.items()},
+            "tenant_hour_used": self._tenant_hour_used,
+            "tenant_day_used": self._tenant_day_used,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> None:
+        """Restore window usage saved by a previous instance (stale windows are ignored)."""
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("Could not read token budget state from %s: %s", path, e)
+            return
+        self._roll()
+        if state.get("hour") == self._hour:
+            self._hour_used += state.get("hour_used", 0)
+            for uid, used in state.get("user_hour_used", {}).items():
+                self._user_hour_used[int(uid)] = self._user_hour_used.get(int(uid), 0) + used
+            for tenant, used in state.get("tenant_hour_used", {}).items():
+                self._tenant_hour_used[tenant] = self._tenant_hour_used.get(tenant, 0) + used
+        if state.get("day") == self._day:
+            self._day_used += state.get("day_used", 0)
+            for tenant, used in state.get("tenant_day_used", {}).items():
+                self._tenant_day_used[tenant] = self._tenant_day_used.get(tenant, 0) + used
@@ -0,0 +1,225 @@
+"""Usage analytics: in-memory event ring buffer flushed in batches to SQLite.
+
+Handlers call ``analytics.record(...)``, which only stores one fixed-shape
+tuple into a preallocated ring slot - no I/O, no locks, well under a
+microsecond. A background task periodically moves buffered events into an
+append-only SQLite table from a worker thread.
+
+Aggregate queries:
+    python -m src.utils.analytics funnel|topics|questions|latency [--db PATH] [--days N]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Event kinds (stored as small ints)
+TOPIC_OPENED = 1
+CREATIVE_STARTED = 2
+AUDIENCE_SELECTED = 3
+PROBLEM_ENTERED = 4
+TECH_SELECTED = 5
+IDEAS_SHOWN = 6
+GPT_FAILED = 7
+IDEAS_REUSED = 8
+HISTORY_OPENED = 9
+QUESTION_ASKED = 10
+IDEA_REFINED = 11
+
+EVENT_NAMES = {
+    TOPIC_OPENED: "topic_opened",
+    CREATIVE_STARTED: "creative_started",
+    AUDIENCE_SELECTED: "audience_selected",
+    PROBLEM_ENTERED: "problem_entered",
+    TECH_SELECTED: "tech_selected",
+    IDEAS_SHOWN: "ideas_shown",
+    GPT_FAILED: "gpt_failed",
+    IDEAS_REUSED: "ideas_reused",
+    HISTORY_OPENED: "history_opened",
+    QUESTION_ASKED: "question_asked",
+    IDEA_REFINED: "idea_refined",
+}
+
+# Creative flow stages in order (funnel report)
+CREATIVE_FUNNEL = (CREATIVE_STARTED, AUDIENCE_SELECTED, PROBLEM_ENTERED, TECH_SELECTED, IDEAS_SHOWN)
+
+# (timestamp, kind, user_id, arg, value)
+Event = Tuple[float, int, int, str, float]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    ts REAL NOT NULL,
+    kind INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    arg TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_kind_ts ON events (kind, ts);
+"""
+
+
+class EventLog:
+    """Fixed-size ring buffer of analytics events with a batching flusher."""
+
+    def __init__(self, capacity: int = 65536):
+        """Initialize event log.
+
+        Args:
+            capacity: Ring size (rounded up to a power of two). When the
+                flusher falls behind, the oldest events are overwritten.
+        """
+        size = 1
+        while size < capacity:
+            size <<= 1
+        self._mask = size - 1
+        self._buffer: List[Optional[Event]] = [None] * size
+        self._head = 0  # next slot to write (monotonic)
+        self._tail = 0  # next slot to flush (monotonic)
+        self.dropped = 0
+        self.path: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, kind: int, user_id: int, arg: str = "", value: float = 0.0) -> None:
+        """Buffer one event (hot path)."""
+        head = self._head
+        self._buffer[head & self._mask] = (time.time(), kind, user_id, arg, value)
+        self._head = head + 1
+
+    def drain(self) -> List[Event]:
+        """Take all buffered events, oldest first."""
+        head, tail = self._head, self._tail
+        size = self._mask + 1
+        if head - tail > size:
+            self.dropped += head - tail - size
+            tail = head - size
+        events = [self._buffer[i & self._mask] for i in range(tail, head)]
+        self._tail = head
+        return events
+
+    def start(self, path: str, interval: float = 5.0) -> None:
+        """Start flushing to the SQLite database at ``path`` every ``interval`` seconds."""
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with sqlite3.connect(path) as conn:
+            conn.executescript(SCHEMA)
+        self._task = asyncio.get_running_loop().create_task(self._flush_loop(interval))
+
+    async def stop(self) -> None:
+        """Stop the flusher and write out what is left."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        """Write buffered events in one batch (off the event loop)."""
+        events = self.drain()
+        if events and self.path:
+            await asyncio.to_thread(_write_batch, self.path, events)
+        return len(events)
+
+    async def _flush_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except sqlite3.Error as e:
+                logger.error("Analytics flush failed: %s", e)
+
+
+def _write_batch(path: str, events: List[Event]) -> None:
+    with sqlite3.connect(path) as conn:
+        conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?)", events)
+
+
+# Process-wide event log
+analytics = EventLog()
+
+
+# --- Aggregate queries -----------------------------------------------------
+
+def query_funnel(conn: sqlite3.Connection, since: float) -> List[Tuple[str, int]]:
+    """Distinct users reaching each creative-flow stage, plus GPT failures, history hits and refinements."""
+    rows = []
+    for kind in CREATIVE_FUNNEL + (GPT_FAILED, IDEAS_REUSED, IDEA_REFINED):
+        (users,) = conn.execute(
+            "SELECT COUNT(DISTINCT user_id) FROM events WHERE kind = ? AND ts >= ?", (kind, since)
+        ).fetchone()
+        rows.append((EVENT_NAMES[kind], users))
+    return rows
+
+
+def query_topics(conn: sqlite3.Connection, since: float) -> List[Tuple[str, int, int]]:
+    """Topic opens and distinct readers, most popular first."""
+    return conn.execute(
+        "SELECT arg, COUNT(*), COUNT(DISTINCT user_id) FROM events "
+        "WHERE kind = ? AND ts >= ? GROUP BY arg ORDER BY COUNT(*) DESC",
+        (TOPIC_OPENED, since),
+    ).fetchall()
+
+
+def query_questions(conn: sqlite3.Connection, since: float) -> List[Tuple[str, int, float]]:
+    """Free-text questions by answer (lesson section, FAQ entry, "gpt" or "miss"): count, average score."""
+    return conn.execute(
+        "SELECT arg, COUNT(*), AVG(value) FROM events "
+        "WHERE kind = ? AND ts >= ? GROUP BY arg ORDER BY COUNT(*) DESC",
+        (QUESTION_ASKED, since),
+    ).fetchall()
+
+
+def query_latency_by_hour(conn: sqlite3.Connection, since: float) -> List[Tuple[str, int, float, float]]:
+    """GPT generation latency by hour of day (UTC): count, average, max."""
+    return conn.execute(
+        "SELECT strftime('%H', ts, 'unixepoch'), COUNT(*), AVG(value), MAX(value) FROM events "
+        "WHERE kind IN (?, ?) AND ts >= ? GROUP BY 1 ORDER BY 1",
+        (IDEAS_SHOWN, GPT_FAILED, since),
+    ).fetchall()
+
+
+def main() -> None:
+    """Command-line aggregate reports."""
+    from src.config import ANALYTICS_DB_PATH
+
+    parser = argparse.ArgumentParser(description="DigiLib Assistant usage analytics")
+    parser.add_argument("report", choices=["funnel", "topics", "questions", "latency"])
+    parser.add_argument("--db", default=ANALYTICS_DB_PATH, help="SQLite database path")
+    parser.add_argument("--days", type=float, default=7, help="Look-back window in days")
+    args = parser.parse_args()
+
+    since = time.time() - args.days * 86400
+    with sqlite3.connect(args.db) as conn:
+        if args.report == "funnel":
+            rows = query_funnel(conn, since)
+            start = rows[0][1] or 1
+            print(f"{'stage':<20}{'users':>8}{'of start':>10}")
+            for name, users in rows:
+                print(f"{name:<20}{users:>8}{users / start:>10.0%}")
+        elif args.report == "topics":
+            print(f"{'topic':<20}{'opens':>8}{'users':>8}")
+            for topic, opens, users in query_topics(conn, since):
+                print(f"{topic:<20}{opens:>8}{users:>8}")
+        elif args.report == "questions":
+            print(f"{'answer':<20}{'count':>8}{'score':>8}")
+            for answer, count, score in query_questions(conn, since):
+                print(f"{answer:<20}{count:>8}{score:>8.1f}")
+        else:
+            print(f"{'hour (UTC)':<12}{'calls':>8}{'avg s':>8}{'max s':>8}")
+            for hour, calls, avg, worst in query_latency_by_hour(conn, since):
+                print(f"{hour:<12}{calls:>8}{avg:>8.2f}{worst:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,379 @@
+"""Throttled broadcasts to everyone who has used the bot.
+
+Every private chat that sends an update is remembered in SQLite; the known
+chat ids are also held in memory, so only a first contact costs a write. A
+broadcast is a persistent job. The message payload is built once, recipients
+are walked in id order in chunks, and the job's cursor and counters are
+checkpointed after every chunk, so a restarted bot resumes where the previous
+instance stopped (at most one chunk is sent twice).
+
+Sends are paced to a global rate (Telegram allows about 30 messages per
+second to different chats) with a bounded number in flight, through a
+separate Bot whose connection pool interactive traffic never waits on.
+``RetryAfter`` holds the whole job back for the requested time; users who
+blocked the bot are marked and skipped from then on until they write again;
+network errors are retried with exponential back-off.
+
+Each bot (tenant) has its own Broadcaster, kept in ``bot_data["broadcaster"]``.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from telegram import Bot, LinkPreviewOptions, Update
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
+from telegram.ext import ContextTypes
+
+from .memory import memory_accounting
+from .metrics import Counter, GaugeFunc
+from .tenants import DEFAULT_TENANT
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recipients (
+    id INTEGER PRIMARY KEY,
+    chat_id INTEGER NOT NULL UNIQUE,
+    first_seen REAL NOT NULL,
+    blocked INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS broadcasts (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    status TEXT NOT NULL,
+    admin_chat_id INTEGER NOT NULL,
+    status_message_id INTEGER,
+    text TEXT NOT NULL,
+    last_recipient INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    cursor INTEGER NOT NULL DEFAULT 0,
+    sent INTEGER NOT NULL DEFAULT 0,
+    blocked INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+
+# Send outcomes
+SENT = "sent"
+BLOCKED = "blocked"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+CHUNK_SIZE = 200
+MAX_ATTEMPTS = 5
+BACKOFF_SECONDS = 1.0
+PROGRESS_INTERVAL = 5.0
+
+BROADCAST_MESSAGES = Counter(
+    "digilib_broadcast_messages_total", "Broadcast sends by outcome (sent/blocked/failed)", ["outcome"]
+)
+BROADCAST_FLOOD_WAITS = Counter(
+    "digilib_broadcast_flood_waits_total", "RetryAfter answers that paused a broadcast"
+)
+BROADCAST_RECIPIENTS = GaugeFunc(
+    "digilib_broadcast_recipients", "Known chats a broadcast would reach", ["tenant"]
+)
+_OUTCOMES = {outcome: BROADCAST_MESSAGES.labels(outcome) for outcome in (SENT, BLOCKED, FAILED)}
+
+
+def broadcast_payload(text: str) -> Dict:
+    """Arguments shared by every send of a broadcast (and its preview)."""
+    return {
+        "text": text,
+        "parse_mode": "Markdown",
+        "link_preview_options": LinkPreviewOptions(is_disabled=True),
+    }
+
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    delay = error.retry_after
+    return delay.total_seconds() if isinstance(delay, timedelta) else float(delay)
+
+
+class Pacer:
+    """Hands out send slots ``1 / rate`` seconds apart; pause() holds every sender back."""
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second
+        self._next = 0.0
+        self._resume_at = 0.0
+
+    async def wait(self) -> None:
+        while True:
+            now = time.monotonic()
+            if now < self._resume_at:
+                await asyncio.sleep(self._resume_at - now)
+                continue
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+            if slot > now:
+                await asyncio.sleep(slot - now)
+            if time.monotonic() >= self._resume_at:
+                return  # Not paused while waiting for the slot
+
+    def pause(self, seconds: float) -> None:
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+class BroadcastJob:
+    """One broadcast and its progress (a row of the broadcasts table)."""
+
+    __slots__ = ("job_id", "created_at", "finished_at", "status", "admin_chat_id", "status_message_id",
+                 "text", "last_recipient", "total", "cursor", "sent", "blocked", "failed")
+
+    def __init__(self, job_id: int, created_at: float, finished_at: Optional[float], status: str,
+                 admin_chat_id: int, status_message_id: Optional[int], text: str, last_recipient: int,
+                 total: int, cursor: int = 0, sent: int = 0, blocked: int = 0, failed: int = 0):
+        self.job_id = job_id
+        self.created_at = created_at
+        self.finished_at = finished_at
+        self.status = status
+        self.admin_chat_id = admin_chat_id
+        self.status_message_id = status_message_id
+        self.text = text
+        self.last_recipient = last_recipient
+        self.total = total
+        self.cursor = cursor
+        self.sent = sent
+        self.blocked = blocked
+        self.failed = failed
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.blocked + self.failed
+
+
+_JOB_COLUMNS = ", ".join(BroadcastJob.__slots__).replace("job_id", "id")
+
+ProgressCallback = Callable[[BroadcastJob], Awaitable[None]]
+
+
+class Broadcaster:
+    """Recipient list and the (single) running broadcast job."""
+
+    def __init__(self, tenant: str = DEFAULT_TENANT):
+        """Initialize a closed store (tracking is a no-op until open()).
+
+        Args:
+            tenant: Id of the bot whose users this store keeps (metrics label)
+        """
+        self.tenant = tenant
+        self.path: Optional[str] = None
+        self.rate_per_second = 25.0
+        self.concurrency = 8
+        self.job: Optional[BroadcastJob] = None
+        self._known: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+        BROADCAST_RECIPIENTS.add_function(lambda: {(self.tenant,): len(self._known)})
+        memory_accounting.add_source(f"broadcast.known_chats[{tenant}]", lambda: self._known)
+
+    def open(self, path: str, rate_per_second: float = 25.0, concurrency: int = 8) -> None:
+        """Create the database at ``path`` if needed and load the known chats.
+
+        Args:
+            path: SQLite database path
+            rate_per_second: Messages sent per second during a broadcast
+            concurrency: Sends in flight at once (also the sender's connection pool size)
+        """
+        self.rate_per_second = rate_per_second
+        self.concurrency = concurrency
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with sqlite3.connect(path) as conn:
+            conn.executescript(SCHEMA)
+            self._known = {chat_id for (chat_id,) in conn.execute("SELECT chat_id FROM recipients WHERE blocked = 0")}
+        self.path = path
+
+    @property
+    def busy(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def track(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Remember private chats (registered in a negative handler group)."""
+        chat = update.effective_chat
+        if self.path is None or chat is None or chat.type != "private" or chat.id in self._known:
+            return
+        self._known.add(chat.id)
+        await self._run(self._remember, chat.id)
+
+    def recipient_count(self) -> int:
+        return len(self._known)
+
+    async def create(self, text: str, admin_chat_id: int, status_message_id: Optional[int]) -> Optional[BroadcastJob]:
+        """Store a new job for every chat known right now."""
+        return await self._run(self._create, text, admin_chat_id, status_message_id)
+
+    async def latest(self) -> Optional[BroadcastJob]:
+        """The running job, else the most recent one."""
+        if self.job is not None:
+            return self.job
+        return await self._run(self._load, "SELECT {} FROM broadcasts ORDER BY id DESC LIMIT 1")
+
+    def start(self, job: BroadcastJob, bot: Bot, on_progress: Optional[ProgressCallback] = None) -> None:
+        """Run ``job`` in the background, sending through ``bot``."""
+        self.job = job
+        self._task = asyncio.create_task(self.run(job, bot, on_progress))
+
+    async def resume(self, bot: Bot, on_progress: Optional[ProgressCallback] = None) -> Optional[BroadcastJob]:
+        """Continue a job the previous instance did not finish."""
+        if self.path is None:
+            return None
+        job = await self._run(self._load, "SELECT {} FROM broadcasts WHERE status = 'running' ORDER BY id LIMIT 1")
+        if job is not None:
+            logger.info("Resuming broadcast #%d at %d of %d", job.job_id, job.processed, job.total)
+            self.start(job, bot, on_progress)
+        return job
+
+    def cancel(self) -> bool:
+        """Stop the running job after the sends in flight (it is not resumed)."""
+        if not self.busy:
+            return False
+        self.job.status = CANCELLED
+        return True
+
+    async def stop(self) -> None:
+        """Interrupt the running job at shutdown; it stays "running" and resumes on the next start."""
+        if self.busy:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def run(self, job: BroadcastJob, bot: Bot, on_progress: Optional[ProgressCallback] = None) -> None:
+        """Send ``job`` to every remaining recipient, checkpointing after each chunk."""
+        payload = broadcast_payload(job.text)
+        pacer = Pacer(self.rate_per_second)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        reported = time.monotonic()
+
+        async def send(chat_id: int) -> str:
+            async with semaphore:
+                if job.status != RUNNING:
+                    return SKIPPED
+                return await self.send(bot, chat_id, payload, pacer)
+
+        try:
+            async with bot:
+                while job.status == RUNNING:
+                    chunk = await self._run(self._next_chunk, job) or []
+                    if not chunk:
+                        job.status = DONE
+                        break
+                    outcomes = await asyncio.gather(*(send(chat_id) for _, chat_id in chunk))
+                    blocked = [chat_id for (_, chat_id), outcome in zip(chunk, outcomes) if outcome == BLOCKED]
+                    job.sent += outcomes.count(SENT)
+                    job.failed += outcomes.count(FAILED)
+                    job.blocked += len(blocked)
+                    job.cursor = chunk[-1][0]
+                    self._known.difference_update(blocked)
+                    await self._run(self._checkpoint, job, blocked)
+                    if on_progress and time.monotonic() - reported >= PROGRESS_INTERVAL:
+                        reported = time.monotonic()
+                        await on_progress(job)
+        except asyncio.CancelledError:
+            raise  # Shutdown - resumed from the last checkpoint by the next instance
+        except Exception:
+            logger.exception("Broadcast #%d failed", job.job_id)
+            job.status = CANCELLED
+        finally:
+            if self.job is job:
+                self.job = None
+
+        job.finished_at = time.time()
+        await self._run(self._checkpoint, job, [])
+        logger.info("Broadcast #%d %s: %d sent, %d blocked, %d failed",
+                    job.job_id, job.status, job.sent, job.blocked, job.failed)
+        if on_progress:
+            await on_progress(job)
+
+    async def send(self, bot: Bot, chat_id: int, payload: Dict, pacer: Pacer) -> str:
+        """Deliver one message within the pace, retrying flood waits and network errors."""
+        for attempt in range(MAX_ATTEMPTS):
+            await pacer.wait()
+            try:
+                await bot.send_message(chat_id, **payload)
+                outcome = SENT
+            except RetryAfter as e:
+                BROADCAST_FLOOD_WAITS.inc()
+                logger.warning("Broadcast hit flood control, pausing %.0f s", retry_after_seconds(e))
+                pacer.pause(retry_after_seconds(e))
+                continue
+            except Forbidden:
+                outcome = BLOCKED  # Bot blocked or user deactivated
+            except BadRequest as e:
+                outcome = BLOCKED if "chat not found" in e.message.lower() else FAILED
+                if outcome == FAILED:
+                    logger.warning("Broadcast to %s rejected: %s", chat_id, e.message)
+            except NetworkError as e:
+                logger.debug("Broadcast to %s failed (attempt %d): %s", chat_id, attempt + 1, e)
+                await asyncio.sleep(BACKOFF_SECONDS * 2 ** attempt)
+                continue
+            except TelegramError as e:
+                logger.warning("Broadcast to %s failed: %s", chat_id, e)
+                outcome = FAILED
+            _OUTCOMES[outcome].inc()
+            return outcome
+        _OUTCOMES[FAILED].inc()
+        return FAILED
+
+    async def _run(self, func, *args):
+        try:
+            return await asyncio.to_thread(func, *args)
+        except sqlite3.Error as e:
+            logger.error("Broadcast store %s failed: %s", func.__name__.lstrip('_'), e)
+            return None
+
+    def _remember(self, chat_id: int) -> None:
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(
+                "INSERT INTO recipients (chat_id, first_seen) VALUES (?, ?) "
+                "ON CONFLICT(chat_id) DO UPDATE SET blocked = 0",
+                (chat_id, time.time()),
+            )
+
+    def _create(self, text: str, admin_chat_id: int, status_message_id: Optional[int]) -> BroadcastJob:
+        with sqlite3.connect(self.path) as conn:
+            last_recipient, total = conn.execute(
+                "SELECT COALESCE(MAX(id), 0), COUNT(*) FROM recipients WHERE blocked = 0"
+            ).fetchone()
+            cursor = conn.execute(
+                "INSERT INTO broadcasts (created_at, status, admin_chat_id, status_message_id, text, "
+                "last_recipient, total) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), RUNNING, admin_chat_id, status_message_id, text, last_recipient, total),
+            )
+            return BroadcastJob(cursor.lastrowid, time.time(), None, RUNNING, admin_chat_id,
+                                status_message_id, text, last_recipient, total)
+
+    def _load(self, query: str) -> Optional[BroadcastJob]:
+        with sqlite3.connect(self.path) as conn:
+            row = conn.execute(query.format(_JOB_COLUMNS)).fetchone()
+        return BroadcastJob(*row) if row else None
+
+    def _next_chunk(self, job: BroadcastJob) -> List[Tuple[int, int]]:
+        # Recipients who joined after the job was created are not included
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute(
+                "SELECT id, chat_id FROM recipients WHERE id > ? AND id <= ? AND blocked = 0 ORDER BY id LIMIT ?",
+                (job.cursor, job.last_recipient, CHUNK_SIZE),
+            ).fetchall()
+
+    def _checkpoint(self, job: BroadcastJob, blocked: List[int]) -> None:
+        with sqlite3.connect(self.path) as conn:
+            conn.executemany("UPDATE recipients SET blocked = 1 WHERE chat_id = ?", [(chat_id,) for chat_id in blocked])
+            conn.execute(
+                "UPDATE broadcasts SET status = ?, finished_at = ?, cursor = ?, sent = ?, blocked = ?, failed = ? "
+                "WHERE id = ?",
+                (job.status, job.finished_at, job.cursor, job.sent, job.blocked, job.failed, job.job_id),
+            )
@@ -0,0 +1,128 @@
+"""Compiled callback-data router for DigiLib Assistant.
+
+Replaces per-state chains of regex ``CallbackQueryHandler`` objects with a
+single handler per conversation state that parses ``callback_data`` once and
+dispatches through a prebuilt lookup table.
+"""
+
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from telegram import InlineKeyboardMarkup, Update
+from telegram.ext import CallbackQueryHandler, ContextTypes
+
+logger = logging.getLogger(__name__)
+
+HandlerCallback = Callable[[Update, ContextTypes.DEFAULT_TYPE], Awaitable[Optional[int]]]
+
+
+def parse_callback_data(data: str) -> Tuple[str, str]:
+    """Split callback data into (namespace, arg).
+
+    ``"topic_cursor_github"`` becomes ``("topic", "cursor_github")``,
+    ``"help"`` becomes ``("help", "")``.
+    """
+    namespace, _, arg = data.partition('_')
+    return namespace, arg
+
+
+class CallbackRouter:
+    """Per-state dispatch table for callback queries.
+
+    Routes are either exact (``"back_to_main"``) or namespace-wide
+    (``"topic"`` matches every ``"topic_*"``). Exact routes win. Both lookups
+    are plain dict hits, so dispatch cost does not grow with the number of
+    buttons in a state.
+    """
+
+    def __init__(self):
+        """Initialize an empty router."""
+        # {state: {callback_data: handler}}
+        self._exact: Dict[int, Dict[str, HandlerCallback]] = {}
+        # {state: {namespace: handler}}
+        self._namespaces: Dict[int, Dict[str, HandlerCallback]] = {}
+
+    def add(self, state: int, data: str, handler: HandlerCallback) -> None:
+        """Route exact callback data to a handler in the given state."""
+        self._exact.setdefault(state, {})[data] = handler
+        self._namespaces.setdefault(state, {})
+
+    def add_namespace(self, state: int, namespace: str, handler: HandlerCallback) -> None:
+        """Route every ``"<namespace>_*"`` callback to a handler in the given state."""
+        self._namespaces.setdefault(state, {})[namespace] = handler
+        self._exact.setdefault(state, {})
+
+    def resolve(self, state: int, data: str) -> Tuple[Optional[HandlerCallback], str]:
+        """Find the handler for callback data in a state.
+
+        Returns:
+            (handler or None, parsed arg)
+        """
+        namespace, arg = parse_callback_data(data)
+        handler = self._exact.get(state, {}).get(data)
+        if handler is None:
+            handler = self._namespaces.get(state, {}).get(namespace)
+        return handler, arg
+
+    def handler_for(self, state: int, routed_only: bool = False) -> CallbackQueryHandler:
+        """Build the single ``CallbackQueryHandler`` serving a conversation state.
+
+        Args:
+            state: Conversation state
+            routed_only: Only claim callbacks that have a route (for entry points,
+                which ConversationHandler checks before the current state's handlers)
+        """
+        exact = self._exact.get(state, {})
+        namespaces = self._namespaces.get(state, {})
+
+        async def dispatch(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Optional[int]:
+            query = update.callback_query
+            data = query.data
+            namespace, arg = parse_callback_data(data)
+            handler = exact.get(data) or namespaces.get(namespace)
+            if handler is None:
+                logger.warning("No route for callback '%s' in state %s", data, state)
+                await query.answer()
+                return None
+            # Handlers read the parsed argument instead of re-parsing query.data
+            context.callback_arg = arg
+            return await handler(update, context)
+
+        if routed_only:
+            def is_routed(data: object) -> bool:
+                return isinstance(data, str) and (
+                    data in exact or parse_callback_data(data)[0] in namespaces
+                )
+
+            return CallbackQueryHandler(dispatch, pattern=is_routed)
+        return CallbackQueryHandler(dispatch)
+
+    def routes(self, state: int) -> List[str]:
+        """List route keys of a state (namespaces rendered as ``"<ns>_*"``)."""
+        keys = list(self._exact.get(state, {}))
+        keys.extend(f"{ns}_*" for ns in self._namespaces.get(state, {}))
+        return keys
+
+    def validate(self, emitted: Mapping[int, Iterable[InlineKeyboardMarkup]]) -> None:
+        """Check that every emitted button has a route in the state it is shown in.
+
+        Args:
+            emitted: {state: [keyboards shown while the conversation is in that state]}
+
+        Raises:
+            ValueError: If any button has no route
+        """
+        missing = []
+        for state, markups in emitted.items():
+            for markup in markups:
+                for row in markup.inline_keyboard:
+                    for button in row:
+                        data = button.callback_data
+                        if data is None:
+                            continue  # URL buttons etc.
+                        handler, _ = self.resolve(state, data)
+                        if handler is None:
+                            missing.append(f"state {state}: '{data}'")
+
+        if missing:
+            raise ValueError("Unrouted callback buttons: " + ", ".join(sorted(set(missing))))
@@ -0,0 +1,254 @@
+"""Offline full-text search for free-text questions.
+
+A small BM25 engine: Russian-aware tokenization (ё folded, stop words
+dropped, Snowball-style stemming, domain synonyms such as "гитхаб" ->
+"github"), an inverted index with precomputed IDF, and snippets prepared
+when the index is built. Queries touch only the postings of their own terms,
+so a lookup over the lesson sections and FAQ takes well under a millisecond.
+"""
+
+import math
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+_WORD_RE = re.compile(r"[a-zа-я0-9]+")
+
+STOP_WORDS = frozenset("""
+а без более бы был была были было быть в вам вас весь во вот все всего всех вы где да даже для до его
+ее ей ему если есть еще же за здесь и из или им их к как какая какой когда кто ли либо мне может мы на
+надо наш не него нее нет ни них но ну о об однако он она они оно от очень по под при про с со так также
+такой там те тем то того тоже той только том ты у уже хоть чем через что чтобы чье чья эта эти это этот я
+мой моя мои свой свою себе себя тебе тебя меня можно нужно нужен нужна нужны зачем хочу хочется
+привет здравствуй здравствуйте спасибо пожалуйста большое больше
+the a an to of in on for is are how what
+""".split())
+
+# --- Russian stemmer (Snowball algorithm) -----------------------------------
+
+_VOWELS = "аеиоуыэюя"
+_PERFECTIVE_GERUND_1 = ("вшись", "вши", "в")
+_PERFECTIVE_GERUND_2 = ("ывшись", "ившись", "ывши", "ивши", "ыв", "ив")
+_ADJECTIVE = ("ими", "ыми", "его", "ого", "ему", "ому", "ее", "ие", "ые", "ое", "ей", "ий", "ый", "ой",
+              "ем", "им", "ым", "ом", "их", "ых", "ую", "юю", "ая", "яя", "ою", "ею")
+_PARTICIPLE_1 = ("ем", "нн", "вш", "ющ", "щ")
+_PARTICIPLE_2 = ("ивш", "ывш", "ующ")
+_REFLEXIVE = ("ся", "сь")
+_VERB_1 = ("ла", "на", "ете", "йте", "ли", "й", "л", "ем", "н", "ло", "но", "ет", "ют", "ны", "ть",
+           "ешь", "нно")
+_VERB_2 = ("ила", "ыла", "ена", "ейте", "уйте", "ите", "или", "ыли", "ей", "уй", "ил", "ыл", "им", "ым",
+           "ен", "ило", "ыло", "ено", "ят", "ует", "уют", "ит", "ыт", "ены", "ить", "ыть", "ишь", "ую", "ю")
+_NOUN = ("а", "ев", "ов", "ие", "ье", "е", "иями", "ями", "ами", "еи", "ии", "и", "ией", "ей", "ой", "ий",
+         "й", "иям", "ям", "ием", "ем", "ам", "ом", "о", "у", "ах", "иях", "ях", "ы", "ь", "ию", "ью", "ю",
+         "ия", "ья", "я")
+_SUPERLATIVE = ("ейше", "ейш")
+_DERIVATIONAL = ("ость", "ост")
+
+
+def _by_length(endings: Sequence[str]) -> Tuple[str, ...]:
+    return tuple(sorted(endings, key=len, reverse=True))
+
+
+_PERFECTIVE_GERUND_1, _PERFECTIVE_GERUND_2, _ADJECTIVE, _PARTICIPLE_1, _PARTICIPLE_2, _REFLEXIVE, \
+    _VERB_1, _VERB_2, _NOUN, _SUPERLATIVE, _DERIVATIONAL = map(_by_length, (
+        _PERFECTIVE_GERUND_1, _PERFECTIVE_GERUND_2, _ADJECTIVE, _PARTICIPLE_1, _PARTICIPLE_2, _REFLEXIVE,
+        _VERB_1, _VERB_2, _NOUN, _SUPERLATIVE, _DERIVATIONAL))
+
+
+def _strip(word: str, endings: Tuple[str, ...], after_a: bool = False) -> Optional[str]:
+    """Remove the longest matching ending; ``after_a`` endings must follow "а" or "я" (which stays)."""
+    for ending in endings:
+        if word.endswith(ending):
+            if not after_a:
+                return word[:-len(ending)]
+            if len(word) > len(ending) and word[-len(ending) - 1] in "ая":
+                return word[:-len(ending)]
+    return None
+
+
+def _strip_any(word: str, group_1: Tuple[str, ...], group_2: Tuple[str, ...]) -> Optional[str]:
+    """Try both ending groups and keep the longer ending removed."""
+    first, second = _strip(word, group_1, after_a=True), _strip(word, group_2)
+    if first is None or (second is not None and len(second) < len(first)):
+        return second
+    return first
+
+
+def _region_after_vowel_consonant(word: str, start: int = 0) -> int:
+    for i in range(start + 1, len(word)):
+        if word[i] not in _VOWELS and word[i - 1] in _VOWELS:
+            return i + 1
+    return len(word)
+
+
+def stem(word: str) -> str:
+    """Snowball stem of a lowercase Russian word (other words are returned as is)."""
+    rv_start = next((i + 1 for i, ch in enumerate(word) if ch in _VOWELS), len(word))
+    if rv_start >= len(word):
+        return word
+    prefix, rv = word[:rv_start], word[rv_start:]
+    r2_start = max(0, _region_after_vowel_consonant(word, _region_after_vowel_consonant(word)) - rv_start)
+
+    # Step 1: perfective gerund, else reflexive + adjectival / verb / noun
+    stripped = _strip_any(rv, _PERFECTIVE_GERUND_1, _PERFECTIVE_GERUND_2)
+    if stripped is None:
+        reflexive = _strip(rv, _REFLEXIVE)
+        if reflexive is not None:
+            rv = reflexive
+        stripped = _strip(rv, _ADJECTIVE)
+        if stripped is not None:
+            stripped = _strip_any(stripped, _PARTICIPLE_1, _PARTICIPLE_2) or stripped
+        else:
+            stripped = _strip_any(rv, _VERB_1, _VERB_2)
+            if stripped is None:
+                stripped = _strip(rv, _NOUN)
+    rv = rv if stripped is None else stripped
+
+    # Step 2: trailing "и"
+    if rv.endswith("и"):
+        rv = rv[:-1]
+    # Step 3: derivational suffix in R2
+    for ending in _DERIVATIONAL:
+        if rv.endswith(ending) and len(rv) - len(ending) >= r2_start:
+            rv = rv[:-len(ending)]
+            break
+    # Step 4: "нн" -> "н", superlative, soft sign
+    if rv.endswith("нн"):
+        rv = rv[:-1]
+    else:
+        superlative = _strip(rv, _SUPERLATIVE)
+        if superlative is not None:
+            rv = superlative[:-1] if superlative.endswith("нн") else superlative
+        elif rv.endswith("ь"):
+            rv = rv[:-1]
+    return prefix + rv
+
+
+# --- Index -----------------------------------------------------------------
+
+def _is_russian(word: str) -> bool:
+    return "а" <= word[0] <= "я"
+
+
+# Stop words are also matched after stemming: "такое", "такая" and "такие" all stem to "так"
+STOP_STEMS = frozenset(stem(word) for word in STOP_WORDS if _is_russian(word))
+
+
+def tokenize(text: str, synonyms: Optional[Dict[str, str]] = None) -> List[str]:
+    """Lowercase, fold ё, map synonyms, stem and drop stop words."""
+    tokens = []
+    for word in _WORD_RE.findall(text.lower().replace("ё", "е")):
+        if word in STOP_WORDS or (len(word) < 2 and not word.isdigit()):
+            continue
+        if synonyms and word in synonyms:
+            word = synonyms[word]
+        if _is_russian(word):
+            word = stem(word)
+            if word in STOP_STEMS:
+                continue
+            if synonyms:
+                # Forms missing from the synonym list ("курсору") share a stem with one in it
+                word = synonyms.get(word, word)
+        tokens.append(word)
+    return tokens
+
+
+class Document:
+    """A searchable unit (lesson section or FAQ entry) with its ready-made answer."""
+
+    __slots__ = ("doc_id", "topic_id", "title", "answer", "defines")
+
+    def __init__(self, doc_id: str, topic_id: Optional[str], title: str, answer: str, defines: str = ""):
+        self.doc_id = doc_id
+        self.topic_id = topic_id
+        self.title = title
+        self.answer = answer
+        # Term(s) the document is the definition of ("GitHub - это ...", "Что такое деплой?")
+        self.defines = defines
+
+
+class SearchIndex:
+    """BM25 inverted index."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, synonyms: Optional[Dict[str, str]] = None):
+        """Initialize an empty index.
+
+        Args:
+            k1: Term frequency saturation
+            b: Document length normalization
+            synonyms: Word -> canonical word, applied to documents and queries
+        """
+        self.k1 = k1
+        self.b = b
+        self.synonyms = dict(synonyms or {})
+        for word, canonical in list(self.synonyms.items()):
+            if _is_russian(word):
+                self.synonyms.setdefault(stem(word), canonical)
+        self.documents: List[Document] = []
+        self._postings: Dict[str, List[Tuple[int, float]]] = {}
+        self._idf: Dict[str, float] = {}
+        self._unknown_idf = 0.0
+        self._titles: List[frozenset] = []
+        self._definitions: Dict[frozenset, int] = {}
+
+    def build(self, entries: Sequence[Tuple[Document, str]]) -> "SearchIndex":
+        """Index ``(document, searchable text)`` pairs, replacing any previous content."""
+        self.documents = [document for document, _ in entries]
+        tokenized = [tokenize(text, self.synonyms) for _, text in entries]
+        average_length = sum(map(len, tokenized)) / max(1, len(tokenized))
+
+        frequencies: Dict[str, Dict[int, int]] = {}
+        for doc_index, tokens in enumerate(tokenized):
+            for token in tokens:
+                counts = frequencies.setdefault(token, {})
+                counts[doc_index] = counts.get(doc_index, 0) + 1
+
+        # Each posting stores the full BM25 term weight, so a query only sums floats
+        total = len(tokenized)
+        self._postings = {}
+        self._idf = {}
+        self._unknown_idf = math.log(1 + (total + 0.5) / 0.5)
+        self._titles = [frozenset(tokenize(document.title, self.synonyms)) for document in self.documents]
+        # A later document defining the same term replaces an earlier one (curated FAQ over lessons)
+        self._definitions = {}
+        for doc_index, document in enumerate(self.documents):
+            for term in filter(None, document.defines.split(",")):
+                self._definitions[frozenset(tokenize(term, self.synonyms))] = doc_index
+        for token, counts in frequencies.items():
+            idf = self._idf[token] = math.log(1 + (total - len(counts) + 0.5) / (len(counts) + 0.5))
+            self._postings[token] = [
+                (doc_index, idf * tf * (self.k1 + 1) / (
+                    tf + self.k1 * (1 - self.b + self.b * len(tokenized[doc_index]) / average_length)))
+                for doc_index, tf in counts.items()
+            ]
+        return self
+
+    def search(self, query: str, limit: int = 3) -> List[Tuple[float, Document]]:
+        """Best matching documents, most relevant first.
+
+        Relevance is the BM25 score divided by the score of an ideal document
+        containing every query term (words the index has never seen count as
+        the rarest term), so it is between 0 and 1 and comparable across
+        queries: a document matching only the common half of a question scores
+        low however often it repeats that half. Documents whose title shares no
+        term with the query are left out - a word from the body of an unrelated
+        answer is not an answer. A query that only names a defined term ("что
+        такое гитхаб?") gets the definition first, with relevance 1.
+        """
+        tokens = set(tokenize(query, self.synonyms))
+        definition = self._definitions.get(frozenset(tokens))
+        scores: Dict[int, float] = {}
+        for token in tokens:
+            for doc_index, weight in self._postings.get(token, ()):
+                scores[doc_index] = scores.get(doc_index, 0.0) + weight
+        if not scores:
+            return []
+
+        ideal = sum(self._idf.get(token, self._unknown_idf) for token in tokens) * (self.k1 + 1)
+        ranked = sorted(
+            ((score / ideal, doc_index) for doc_index, score in scores.items()
+             if not self._titles[doc_index].isdisjoint(tokens)),
+            reverse=True
+        )
+        if definition is not None:
+            ranked = [(1.0, definition)] + [item for item in ranked if item[1] != definition]
+        return [(relevance, self.documents[doc_index]) for relevance, doc_index in ranked[:limit]]
@@ -0,0 +1,152 @@
+"""Tracking of in-flight GPT generations for graceful shutdown.
+
+On SIGTERM the bot stops fetching updates, gives running generations a
+deadline to finish and hands the rest over to the next instance: each
+unfinished request is saved with the chat and message id of its
+"⏳ Обрабатываю..." message so the successor can generate and edit it in place.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Awaitable, Dict, List, Optional
+
+from .tenants import current_tenant
+
+logger = logging.getLogger(__name__)
+
+
+class PendingGeneration:
+    """A generation request together with the message waiting for its result."""
+
+    __slots__ = ("user_id", "chat_id", "message_id", "context", "created_at", "tenant", "task", "deferred")
+
+    def __init__(self, user_id: int, chat_id: int, message_id: int, context: Dict[str, str],
+                 created_at: Optional[float] = None, tenant: Optional[str] = None):
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.context = dict(context)
+        self.created_at = created_at or time.time()
+        # The bot whose message waits for the result (multi-tenant mode)
+        self.tenant = tenant or current_tenant()
+        self.task: Optional[asyncio.Task] = None
+        self.deferred = False
+
+    def to_dict(self) -> Dict:
+        return {
+            "user_id": self.user_id,
+            "chat_id": self.chat_id,
+            "message_id": self.message_id,
+            "context": self.context,
+            "created_at": self.created_at,
+            "tenant": self.tenant,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PendingGeneration":
+        return cls(data["user_id"], data["chat_id"], data["message_id"], data["context"],
+                   data.get("created_at"), data.get("tenant"))
+
+
+class GenerationTracker:
+    """Registry of running generations with a bounded drain."""
+
+    def __init__(self):
+        self.draining = False
+        self._in_flight: Dict[int, PendingGeneration] = {}
+        self._deferred: List[PendingGeneration] = []
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    @property
+    def deferred(self) -> List[PendingGeneration]:
+        """Requests handed over to the next instance."""
+        return list(self._deferred)
+
+    async def run(self, pending: PendingGeneration, coro: Awaitable[Dict]) -> Optional[Dict]:
+        """Run a generation under the tracker.
+
+        Returns:
+            The generation result, or None if it was deferred to the next
+            instance (shutdown in progress or drain deadline exceeded)
+        """
+        if self.draining:
+            coro.close()
+            self._defer(pending)
+            return None
+
+        task = asyncio.ensure_future(coro)
+        pending.task = task
+        self._in_flight[id(pending)] = pending
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if pending.deferred:
+                return None
+            raise
+        finally:
+            self._in_flight.pop(id(pending), None)
+
+    def _defer(self, pending: PendingGeneration) -> None:
+        pending.deferred = True
+        self._deferred.append(pending)
+
+    async def drain(self, timeout: float) -> List[PendingGeneration]:
+        """Refuse new generations, wait for running ones, defer the rest.
+
+        Args:
+            timeout: Seconds to wait for running generations
+
+        Returns:
+            All deferred requests
+        """
+        self.draining = True
+        tasks = [p.task for p in self._in_flight.values() if p.task is not None]
+        if tasks:
+            logger.info("Waiting up to %.1fs for %d in-flight generation(s)", timeout, len(tasks))
+            await asyncio.wait(tasks, timeout=timeout)
+
+        for pending in list(self._in_flight.values()):
+            self._defer(pending)
+            pending.task.cancel()
+        # Let cancelled handlers unwind before the application stops
+        await asyncio.sleep(0)
+
+        if self._deferred:
+            logger.warning("%d generation(s) deferred to the next instance", len(self._deferred))
+        return self.deferred
+
+
+def save_pending(path: str, pending: List[PendingGeneration]) -> None:
+    """Write deferred generations to disk (atomically), or remove the file if none."""
+    if not pending:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump([p.to_dict() for p in pending], f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    logger.info("Saved %d pending generation(s) to %s", len(pending), path)
+
+
+def load_pending(path: str) -> List[PendingGeneration]:
+    """Read and remove generations deferred by a previous instance."""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, encoding="utf-8") as f:
+            pending = [PendingGeneration.from_dict(item) for item in json.load(f)]
+    except (OSError, ValueError, KeyError) as e:
+        logger.error("Could not read pending generations from %s: %s", path, e)
+        pending = []
+    os.remove(path)
+    return pending
@@ -0,0 +1,75 @@
+"""Liveness and readiness checks served on the ops HTTP server."""
+
+import json
+import logging
+import time
+from typing import List, Optional
+
+from telegram.ext import Application
+
+from .loop_monitor import LoopLagMonitor
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """Reports event-loop responsiveness and whether updates are being received.
+
+    Loop responsiveness comes from a ``LoopLagMonitor`` heartbeat. Liveness
+    fails if the heartbeat stalls or the loop lags badly; readiness
+    additionally requires polling or the webhook to be running for every bot
+    the process serves.
+    """
+
+    def __init__(self, applications: List[Application], loop_monitor: LoopLagMonitor,
+                 max_lag: float = 2.0, stall_after: float = 10.0):
+        """Initialize monitor.
+
+        Args:
+            applications: Applications (one per tenant) whose updater state is reported
+            loop_monitor: Running loop lag monitor
+            max_lag: Loop lag (seconds) above which the bot is reported unhealthy
+            stall_after: Seconds without a heartbeat before liveness fails
+        """
+        self.applications = applications
+        self.loop_monitor = loop_monitor
+        self.max_lag = max_lag
+        self.stall_after = stall_after
+
+    @staticmethod
+    def _mode(application: Application) -> Optional[str]:
+        updater = application.updater
+        if updater is None or not updater.running:
+            return None
+        # Updater has no public flag telling webhook and polling apart: the
+        # code that starts one records which in bot_data["update_mode"]
+        return application.bot_data.get("update_mode", "polling")
+
+    def _live(self) -> bool:
+        stalled = time.monotonic() - self.loop_monitor.last_beat > self.stall_after
+        return not stalled and self.loop_monitor.lag <= self.max_lag
+
+    def liveness(self) -> tuple:
+        """``/healthz``: the event loop is turning over in time."""
+        live = self._live()
+        body = {
+            "live": live,
+            "loop_lag_ms": round(self.loop_monitor.lag * 1000, 1),
+            "max_loop_lag_ms": round(self.loop_monitor.max_lag * 1000, 1),
+            "last_heartbeat_s": round(time.monotonic() - self.loop_monitor.last_beat, 1),
+        }
+        return (200 if live else 503), "application/json", json.dumps(body) + "\n"
+
+    def readiness(self) -> tuple:
+        """``/readyz``: live, application running and updates arriving via polling or webhook."""
+        modes = [self._mode(application) for application in self.applications]
+        running = all(application.running for application in self.applications)
+        ready = self._live() and running and None not in modes
+        body = {
+            "ready": ready,
+            "mode": modes[0] if len(set(modes)) == 1 else modes,
+            "application_running": running,
+            "bots": len(self.applications),
+            "loop_lag_ms": round(self.loop_monitor.lag * 1000, 1),
+        }
+        return (200 if ready else 503), "application/json", json.dumps(body) + "\n"
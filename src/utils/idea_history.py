@@ -0,0 +1,195 @@
+"""Per-user history of generated ideas.
+
+Validated ideas are kept per user in SQLite as zlib-compressed JSON, with
+bounded retention (newest N results per user, nothing older than the maximum
+age). The "🗂 Мои идеи" menu pages through it without calling GPT, and a
+re-submitted equivalent questionnaire is answered from it too.
+
+All tenants share one database; every result belongs to the tenant (bot) it
+was generated for, so a user of two library bots has a separate history in
+each. The tenant is the current one (``tenants.current_tenant()``).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from .tenants import DEFAULT_TENANT, current_tenant
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_FIELDS = ("target_audience", "problem", "tech_preference")
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS ideas (
+    id INTEGER PRIMARY KEY,
+    tenant TEXT NOT NULL DEFAULT '{DEFAULT_TENANT}',
+    user_id INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    context_key TEXT NOT NULL,
+    payload BLOB NOT NULL
+);
+"""
+
+# Databases created before tenants were stored: their results belong to the default tenant
+MIGRATE_TENANT = f"""
+ALTER TABLE ideas ADD COLUMN tenant TEXT NOT NULL DEFAULT '{DEFAULT_TENANT}';
+DROP INDEX IF EXISTS ideas_user_created;
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS ideas_tenant_user_created ON ideas (tenant, user_id, created_at);
+"""
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def context_key(context: Dict[str, str]) -> str:
+    """Fingerprint of a questionnaire, insensitive to case, spacing and punctuation."""
+    parts = [" ".join(_WORD_RE.findall(context.get(field, "").casefold())) for field in CONTEXT_FIELDS]
+    return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=8).hexdigest()
+
+
+def format_ideas(ideas: List[Dict], start: int = 1) -> str:
+    """Render validated ideas as Telegram Markdown blocks, numbered from ``start``."""
+    message = ""
+    for i, idea in enumerate(ideas, start):
+        message += f"**💡 Идея {i}: {idea['title']}**\n"
+        message += f"{idea['description']}\n\n"
+        message += f"**Решает:** {idea['problem']}\n"
+        message += f"**Технологии:** {idea['tech']}\n"
+        message += f"**Первые шаги:**\n"
+
+        for j, step in enumerate(idea['steps'], 1):
+            message += f"{j}. {step}\n"
+
+        message += "\n---\n\n"
+    return message
+
+
+class HistoryEntry:
+    """One stored generation result."""
+
+    __slots__ = ("created_at", "context", "ideas")
+
+    def __init__(self, created_at: float, context: Dict[str, str], ideas: List[Dict]):
+        self.created_at = created_at
+        self.context = context
+        self.ideas = ideas
+
+
+def _pack(context: Dict[str, str], ideas: List[Dict]) -> bytes:
+    data = json.dumps({"context": context, "ideas": ideas}, ensure_ascii=False, separators=(",", ":"))
+    return zlib.compress(data.encode("utf-8"), 6)
+
+
+def _unpack(created_at: float, payload: bytes) -> HistoryEntry:
+    data = json.loads(zlib.decompress(payload))
+    return HistoryEntry(created_at, data["context"], data["ideas"])
+
+
+class IdeaHistory:
+    """SQLite-backed idea history (queries run in a worker thread)."""
+
+    def __init__(self):
+        """Initialize a closed store (all operations are no-ops until open())."""
+        self.path: Optional[str] = None
+        self.per_user = 20
+        self.max_age = 90 * 86400.0
+
+    def open(self, path: str, per_user: int = 20, max_age_days: float = 90) -> None:
+        """Create the database at ``path`` if needed and purge expired results.
+
+        Args:
+            path: SQLite database path
+            per_user: Results kept per user (older ones are pruned on insert)
+            max_age_days: Results older than this are never shown and get purged
+        """
+        self.per_user = per_user
+        self.max_age = max_age_days * 86400
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with sqlite3.connect(path) as conn:
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(ideas)")}
+            if "tenant" not in columns:
+                conn.executescript(MIGRATE_TENANT)
+            conn.executescript(INDEXES)
+            conn.execute("DELETE FROM ideas WHERE created_at < ?", (time.time() - self.max_age,))
+        self.path = path
+
+    async def add(self, user_id: int, context: Dict[str, str], ideas: List[Dict]) -> None:
+        """Store a validated result and prune the user's history."""
+        if self.path:
+            await self._run(self._add, current_tenant(), user_id, context_key(context), _pack(context, ideas))
+
+    async def page(self, user_id: int, index: int) -> Tuple[Optional[HistoryEntry], int]:
+        """Get the ``index``-th newest result.
+
+        Returns:
+            (entry or None, number of stored results)
+        """
+        if not self.path:
+            return None, 0
+        return await self._run(self._page, current_tenant(), user_id, index) or (None, 0)
+
+    async def find(self, user_id: int, context: Dict[str, str]) -> Optional[List[Dict]]:
+        """Ideas previously generated for an equivalent questionnaire, if any."""
+        if not self.path:
+            return None
+        return await self._run(self._find, current_tenant(), user_id, context_key(context))
+
+    async def _run(self, func, *args):
+        try:
+            return await asyncio.to_thread(func, *args)
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            logger.error("Idea history %s failed: %s", func.__name__.lstrip('_'), e)
+            return None
+
+    def _add(self, tenant: str, user_id: int, key: str, payload: bytes) -> None:
+        now = time.time()
+        with sqlite3.connect(self.path) as conn:
+            conn.execute(
+                "INSERT INTO ideas (tenant, user_id, created_at, context_key, payload) VALUES (?, ?, ?, ?, ?)",
+                (tenant, user_id, now, key, payload),
+            )
+            conn.execute(
+                "DELETE FROM ideas WHERE tenant = ? AND user_id = ? AND (created_at < ? OR id NOT IN "
+                "(SELECT id FROM ideas WHERE tenant = ? AND user_id = ? ORDER BY created_at DESC LIMIT ?))",
+                (tenant, user_id, now - self.max_age, tenant, user_id, self.per_user),
+            )
+
+    def _page(self, tenant: str, user_id: int, index: int) -> Tuple[Optional[HistoryEntry], int]:
+        since = time.time() - self.max_age
+        with sqlite3.connect(self.path) as conn:
+            (total,) = conn.execute(
+                "SELECT COUNT(*) FROM ideas WHERE tenant = ? AND user_id = ? AND created_at >= ?",
+                (tenant, user_id, since),
+            ).fetchone()
+            row = conn.execute(
+                "SELECT created_at, payload FROM ideas WHERE tenant = ? AND user_id = ? AND created_at >= ? "
+                "ORDER BY created_at DESC LIMIT 1 OFFSET ?",
+                (tenant, user_id, since, index),
+            ).fetchone()
+        return (_unpack(*row) if row else None), total
+
+    def _find(self, tenant: str, user_id: int, key: str) -> Optional[List[Dict]]:
+        with sqlite3.connect(self.path) as conn:
+            row = conn.execute(
+                "SELECT created_at, payload FROM ideas WHERE tenant = ? AND user_id = ? AND context_key = ? "
+                "AND created_at >= ? ORDER BY created_at DESC LIMIT 1",
+                (tenant, user_id, key, time.time() - self.max_age),
+            ).fetchone()
+        return _unpack(*row).ideas if row else None
+
+
+# Process-wide history store (opened in post_init)
+idea_history = IdeaHistory()
@@ -0,0 +1,183 @@
+"""Non-blocking structured logging.
+
+Handlers on the event loop thread only put records on an in-memory queue; a
+background ``QueueListener`` thread formats them and writes them to stderr,
+so a slow log sink (a full pipe, a blocked container log driver) never stalls
+update processing. Records are tagged with the trace, update, user and tenant
+ids of the update being processed when they are queued, and can be written as JSON
+lines. Message and payload fields are capped in size, and noisy loggers can
+be sampled below WARNING.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+from typing import Dict, Optional, TextIO
+
+from .tenants import current_tenant
+from .tracing import current_trace
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed with ``extra=``
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def cap(value: str, max_chars: int) -> str:
+    """Cut a string to ``max_chars``, noting how much was dropped."""
+    if len(value) <= max_chars:
+        return value
+    return f"{value[:max_chars]}…[+{len(value) - max_chars} chars]"
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that tags records with the current update's ids.
+
+    Like the stock QueueHandler, the message is merged with its arguments
+    here, so the record no longer references mutable objects the caller may
+    change before the listener thread gets to it. The line itself - the
+    format string or JSON encoding, extras and traceback - is built by the
+    listener. (Records never leave the process, so they need not be pickled.)
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        trace = current_trace()
+        if trace is not None:
+            record.trace_id = trace.trace_id
+            record.update_id = trace.update_id
+            record.user_id = trace.user_id
+            record.tenant = current_tenant()
+        return record
+
+
+class LogListener(logging.handlers.QueueListener):
+    """QueueListener whose stop() may be called more than once."""
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            super().stop()
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of a logger's records below WARNING.
+
+    Rates apply to a logger and its children; the most specific name wins.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        """Initialize filter.
+
+        Args:
+            rates: Logger name -> fraction of records to keep (0..1)
+        """
+        super().__init__()
+        self.rates = rates
+        self._resolved: Dict[str, float] = {}
+
+    def rate_for(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate, prefix = 1.0, name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1 or random.random() < rate
+
+
+class CappedFormatter(logging.Formatter):
+    """Text formatter with the message capped in size."""
+
+    def __init__(self, fmt: str = TEXT_FORMAT, max_field_chars: int = 2000):
+        super().__init__(fmt)
+        self.max_field_chars = max_field_chars
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        record.message = cap(record.message, self.max_field_chars)
+        return super().formatMessage(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, update context and extras."""
+
+    def __init__(self, max_field_chars: int = 2000):
+        super().__init__()
+        self.max_field_chars = max_field_chars
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": cap(record.getMessage(), self.max_field_chars),
+        }
+        for key, value in record.__dict__.items():
+            if key in _RECORD_ATTRS or value is None:
+                continue
+            if not isinstance(value, (int, float, bool)):
+                value = cap(value if isinstance(value, str) else repr(value), self.max_field_chars)
+            entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse ``"logger=rate,logger=rate"`` (e.g. ``"src.utils.yandex_gpt=0.1"``)."""
+    rates = {}
+    for item in spec.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+def setup_logging(level: str = "INFO", fmt: str = "text", sample_rates: Optional[Dict[str, float]] = None,
+                  max_field_chars: int = 2000, stream: Optional[TextIO] = None) -> LogListener:
+    """Route all logging through a queue to a background writer thread.
+
+    Args:
+        level: Root log level name
+        fmt: "text" (classic one-line format) or "json"
+        sample_rates: Logger name -> fraction of sub-WARNING records to keep
+        max_field_chars: Cap for the message and each extra field
+        stream: Where to write (stderr by default)
+
+    Returns:
+        The running listener (stopped, and the queue flushed, at exit)
+    """
+    stream_handler = logging.StreamHandler(stream)
+    if fmt == "json":
+        stream_handler.setFormatter(JsonFormatter(max_field_chars))
+    else:
+        stream_handler.setFormatter(CappedFormatter(TEXT_FORMAT, max_field_chars))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = ContextQueueHandler(log_queue)
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, level))
+
+    listener = LogListener(log_queue, stream_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
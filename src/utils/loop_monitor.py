@@ -0,0 +1,115 @@
+"""Event-loop lag monitor and optional uvloop runtime.
+
+All users share one asyncio loop, so a single blocking call stalls everyone.
+The monitor measures scheduling delay continuously from a heartbeat task and
+exports it as a metric. A watchdog thread notices when the heartbeat stops
+turning over and logs the loop thread's current stack - i.e. the code that is
+blocking it - while the stall is still in progress.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from .metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG = Histogram(
+    "digilib_event_loop_lag_seconds", "Event loop scheduling delay",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+LOOP_STALLS = Counter(
+    "digilib_event_loop_stalls_total", "Event loop stalls longer than the lag threshold"
+)
+
+
+class LoopLagMonitor:
+    """Heartbeat-based loop lag measurement with a stack-dumping watchdog."""
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.5):
+        """Initialize monitor.
+
+        Args:
+            interval: Heartbeat period in seconds
+            threshold: Lag (seconds) above which a stall is logged with a stack
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.last_beat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+
+    def start(self) -> None:
+        """Start heartbeat and watchdog (call from the running loop)."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._stop.clear()
+        self._watchdog = threading.Thread(target=self._watch, name="digilib-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop heartbeat and watchdog."""
+        self._stop.set()
+        if self._watchdog is not None:
+            # The watchdog may be formatting a stack; wait for it off the loop
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.last_beat = time.monotonic()
+            LOOP_LAG.observe(lag)
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stop.wait(self.interval):
+            beat = self.last_beat
+            stalled_for = time.monotonic() - beat - self.interval
+            if stalled_for < self.threshold or beat == reported_beat:
+                continue
+            # One report per stall: the loop is still blocked, so its frame is the culprit
+            reported_beat = beat
+            LOOP_STALLS.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<unavailable>"
+            logger.warning("Event loop blocked for %.3fs+, loop thread stack:\n%s", stalled_for, stack)
+
+
+def install_uvloop() -> bool:
+    """Switch asyncio to uvloop's event loop policy if uvloop is installed.
+
+    Returns:
+        True if uvloop is now the loop implementation
+    """
+    try:
+        import uvloop
+    except ImportError:
+        logger.warning("USE_UVLOOP is set but uvloop is not installed - using the stock asyncio loop")
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
@@ -0,0 +1,185 @@
+"""Memory accounting and heap snapshot diffs.
+
+Modules register their long-lived per-user structures (rate limiter history,
+conversation state, ``user_data``, caches) as named sources where they are
+created, the way metrics register ``GaugeFunc`` samples. Nothing is measured
+until a report is requested: then every source is sized by its entry count
+and the deep size of a sample of entries, scaled up, so a report stays cheap
+even with hundreds of thousands of users.
+
+``tracemalloc`` runs only between ``start()`` and ``stop()``. While it runs,
+each ``snapshot_diff()`` takes a heap snapshot and compares it with the
+previous one by allocation site, which shows where memory that keeps growing
+is allocated. While stopped (the default) there is no overhead.
+"""
+
+import asyncio
+import collections
+import itertools
+import logging
+import os
+import sys
+import tracemalloc
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Callable, Deque, Dict, Optional, Sized
+
+logger = logging.getLogger(__name__)
+
+# Entries whose deep size is measured per source; the rest are assumed alike
+SAMPLE_SIZE = 200
+# How deep deep_size() follows references (sessions and rate limiter lists are shallow)
+MAX_DEPTH = 6
+
+# Allocations of the accounting itself are left out of diffs
+_IGNORED_FILES = (tracemalloc.__file__, __file__, "<frozen importlib._bootstrap>", "<unknown>")
+
+
+def rss_bytes() -> Optional[int]:
+    """Resident set size of the process (peak RSS without /proc, None on Windows)."""
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except OSError:
+            pass
+    try:
+        import resource  # Unix only
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux and the BSDs KiB
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def deep_size(obj, depth: int = MAX_DEPTH, seen: Optional[set] = None) -> int:
+    """Approximate bytes held by ``obj`` and the containers and objects it references."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if depth <= 0 or isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return size
+
+    depth -= 1
+    if isinstance(obj, Mapping):
+        for key, value in obj.items():
+            size += deep_size(key, depth, seen) + deep_size(value, depth, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset, collections.deque)):
+        for item in obj:
+            size += deep_size(item, depth, seen)
+    else:
+        if hasattr(obj, "__dict__"):
+            size += deep_size(vars(obj), depth, seen)
+        for cls in type(obj).__mro__:
+            for name in getattr(cls, "__slots__", ()):
+                if hasattr(obj, name):
+                    size += deep_size(getattr(obj, name), depth, seen)
+    return size
+
+
+def container_size(container: Sized) -> tuple:
+    """(entries, estimated bytes) of a dict/list/set-like container."""
+    entries = len(container)
+    # A mapping proxy is a view: size the mapping behind it
+    base = container.copy() if isinstance(container, MappingProxyType) else container
+    size = sys.getsizeof(base)
+    if entries:
+        items = container.items() if isinstance(container, Mapping) else container
+        sample = list(itertools.islice(items, SAMPLE_SIZE))
+        seen: set = set()
+        sampled = sum(deep_size(item, seen=seen) - sys.getsizeof(item) if isinstance(container, Mapping)
+                      else deep_size(item, seen=seen) for item in sample)
+        size += sampled * entries // len(sample)
+    return entries, size
+
+
+class MemoryAccounting:
+    """Registry of sized structures plus on-demand tracemalloc snapshots."""
+
+    def __init__(self):
+        self._sources: Dict[str, Callable[[], Sized]] = {}
+        self._snapshots: Deque[tracemalloc.Snapshot] = collections.deque(maxlen=2)
+
+    def add_source(self, name: str, getter: Callable[[], Sized]) -> None:
+        """Register a structure to report (a later source with the same name replaces it).
+
+        Args:
+            name: Report key, e.g. "rate_limiter.user_requests"
+            getter: Returns the container at report time
+        """
+        self._sources[name] = getter
+
+    def report(self) -> Dict:
+        """Process RSS, the size of every registered structure (largest first) and tracing state."""
+        structures = {}
+        for name, getter in list(self._sources.items()):
+            try:
+                entries, size = container_size(getter())
+            except Exception as e:  # A broken source must not hide the others
+                logger.warning("Memory source %s failed: %s", name, e)
+                continue
+            structures[name] = {"entries": entries, "bytes": size}
+        report = {
+            "rss_bytes": rss_bytes(),
+            "structures": dict(sorted(structures.items(), key=lambda item: item[1]["bytes"], reverse=True)),
+            "tracemalloc": {"tracing": tracemalloc.is_tracing(), "snapshots": len(self._snapshots)},
+        }
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            report["tracemalloc"].update(traced_bytes=current, peak_bytes=peak)
+        return report
+
+    def start(self, frames: int = 1) -> bool:
+        """Start tracing allocations (``frames`` stack frames kept per allocation); False if already on."""
+        if tracemalloc.is_tracing():
+            return False
+        self._snapshots.clear()
+        tracemalloc.start(frames)
+        logger.info("tracemalloc started (%d frame(s) per allocation)", frames)
+        return True
+
+    def stop(self) -> bool:
+        """Stop tracing and drop snapshots; False if it was not running."""
+        if not tracemalloc.is_tracing():
+            return False
+        tracemalloc.stop()
+        self._snapshots.clear()
+        logger.info("tracemalloc stopped")
+        return True
+
+    async def snapshot_diff(self, limit: int = 25) -> str:
+        """Take a heap snapshot and diff it with the previous one by allocation site.
+
+        Snapshot filtering and comparison run in a worker thread, so the event
+        loop keeps getting turns on a large heap.
+
+        Returns:
+            Plain-text report (or a hint if tracing is off or this is the first snapshot)
+        """
+        if not tracemalloc.is_tracing():
+            return "tracemalloc is off - start it first\n"
+        snapshot = tracemalloc.take_snapshot()
+        snapshot = await asyncio.to_thread(
+            snapshot.filter_traces, [tracemalloc.Filter(False, path) for path in _IGNORED_FILES]
+        )
+        self._snapshots.append(snapshot)
+        total = sum(stat.size for stat in snapshot.statistics("filename"))
+        if len(self._snapshots) < 2:
+            return f"snapshot 1 taken ({total / 1024 / 1024:.1f} MiB traced); take another to diff\n"
+
+        previous = self._snapshots[0]
+        stats = await asyncio.to_thread(snapshot.compare_to, previous, "lineno")
+        growth = sum(stat.size_diff for stat in stats)
+        lines = [f"traced {total / 1024 / 1024:.1f} MiB, {growth / 1024:+.1f} KiB since the previous snapshot",
+                 "top allocation sites by growth:"]
+        for stat in stats[:limit]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8d} blocks  "
+                         f"{frame.filename}:{frame.lineno}")
+        return "\n".join(lines) + "\n"
+
+
+# Global instance (sources are added where the structures are created)
+memory_accounting = MemoryAccounting()
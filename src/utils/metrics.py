@@ -0,0 +1,242 @@
+"""In-process metrics for DigiLib Assistant (Prometheus text format).
+
+Everything runs on one asyncio loop, so recording is a plain attribute update:
+no locks, and label children are resolved once (at decoration or first use)
+so the hot path never builds label tuples or dicts.
+"""
+
+import functools
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Mapping, Tuple
+
+from .tracing import span
+
+# Latency buckets in seconds (Telegram round-trips .. slow GPT completions)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# All registered metric families, in registration order
+REGISTRY: List["_Metric"] = []
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    """Render a Prometheus label set."""
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Base class for a metric family with optional labels."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        REGISTRY.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> object:
+        """Get (or create) the child for label values. Cache the result on hot paths."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def render(self) -> List[str]:
+        """Render the family in Prometheus exposition format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in self._children.items():
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key, child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {child.value}"]
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonic counter."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: int = 1) -> None:
+        """Increment the unlabeled counter."""
+        self.labels().inc(amount)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Observe a value on the unlabeled histogram."""
+        self.labels().observe(value)
+
+    def _render_child(self, key, child) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            labels = _format_labels(self.labelnames, key, f'le="{le}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {child.sum}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class GaugeFunc(_Metric):
+    """Gauge whose samples are computed at scrape time.
+
+    The function returns ``{label_values_tuple: value}``.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._functions: List[Callable[[], Mapping[Tuple[str, ...], float]]] = []
+
+    def add_function(self, func: Callable[[], Mapping[Tuple[str, ...], float]]) -> None:
+        """Register a sample source (several sources are summed per label set)."""
+        self._functions.append(func)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        totals: Dict[Tuple[str, ...], float] = {}
+        for func in self._functions:
+            for key, value in func().items():
+                totals[key] = totals.get(key, 0) + value
+        for key, value in totals.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+def render_metrics() -> str:
+    """Render all registered metrics as Prometheus text."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# --- Metric families -------------------------------------------------------
+
+HANDLER_LATENCY = Histogram(
+    "digilib_handler_latency_seconds", "Telegram handler latency", ["handler"]
+)
+GPT_LATENCY = Histogram(
+    "digilib_gpt_request_latency_seconds", "Yandex GPT completion call latency"
+)
+GPT_IDEAS_LATENCY = Histogram(
+    "digilib_gpt_ideas_latency_seconds", "Time until the first / all ideas of a generation are ready",
+    ["mode", "stage"]
+)
+GPT_RESPONSES = Counter(
+    "digilib_gpt_responses_total", "Yandex GPT responses by HTTP status or error class", ["status"]
+)
+GPT_PARSE_FAILURES = Counter(
+    "digilib_gpt_parse_failures_total", "GPT answers rejected by process_response", ["reason"]
+)
+GPT_ANSWERS = Counter(
+    "digilib_gpt_answers_total", "GPT idea answers by parse quality (valid/reformatted/partial/unusable)",
+    ["quality"]
+)
+GPT_REPAIRED_IDEAS = Counter(
+    "digilib_gpt_repaired_ideas_total", "Broken ideas sent to a repair completion, by outcome", ["outcome"]
+)
+GPT_REGENERATIONS_SAVED = Counter(
+    "digilib_gpt_regenerations_saved_total", "Answers the strict parser would have rejected that were salvaged"
+)
+GPT_REFINEMENTS = Counter(
+    "digilib_gpt_refinements_total", "Single-idea refinement completions, by mode and outcome", ["mode", "outcome"]
+)
+RATE_LIMIT_REJECTIONS = Counter(
+    "digilib_rate_limiter_rejections_total", "Requests rejected by RateLimiter", ["window"]
+)
+FAQ_ANSWERS = Counter(
+    "digilib_faq_answers_total", "Free-text questions by answer source (index/gpt/miss)", ["source"]
+)
+TELEGRAM_ERRORS = Counter(
+    "digilib_telegram_errors_total", "Errors returned by the Telegram Bot API", ["error"]
+)
+ACTIVE_CONVERSATIONS = GaugeFunc(
+    "digilib_active_conversations", "Active conversations per ConversationHandler state", ["state"]
+)
+
+
+def timed_handler(func):
+    """Decorator recording handler latency (and a trace span) under the function name."""
+    name = func.__name__
+    child = HANDLER_LATENCY.labels(name)
+
+    @functools.wraps(func)
+    async def wrapper(update, context):
+        start = time.perf_counter()
+        try:
+            with span(name):
+                return await func(update, context)
+        finally:
+            child.observe(time.perf_counter() - start)
+
+    return wrapper
+
+
+def track_conversations(conv_handler, state_names: Mapping[int, str]) -> None:
+    """Export the number of active conversations per state of a ConversationHandler."""
+
+    def collect() -> Dict[Tuple[str, ...], int]:
+        counts = {(name,): 0 for name in state_names.values()}
+        # ConversationHandler has no public accessor for its state map
+        for state in list(conv_handler._conversations.values()):
+            name = state_names.get(state)
+            if name is not None:
+                counts[(name,)] += 1
+        return counts
+
+    ACTIVE_CONVERSATIONS.add_function(collect)
@@ -0,0 +1,94 @@
+"""Minimal local HTTP server for operational endpoints (metrics, health).
+
+Built on ``asyncio.start_server`` so it shares the bot's event loop and pulls
+in no extra dependencies.
+"""
+
+import asyncio
+import inspect
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# (status code, content type, body)
+Response = Tuple[int, str, str]
+RouteCallback = Callable[[], Union[Response, Awaitable[Response]]]
+
+_REASONS = {200: "OK", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error",
+            503: "Service Unavailable"}
+
+
+class OpsServer:
+    """Tiny GET-only HTTP server with a static route table."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9100):
+        """Initialize server.
+
+        Args:
+            host: Interface to bind (keep local unless scraped from outside)
+            port: TCP port
+        """
+        self.host = host
+        self.port = port
+        self._routes: Dict[str, RouteCallback] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def add_route(self, path: str, callback: RouteCallback) -> None:
+        """Serve ``callback()`` on ``GET path``."""
+        self._routes[path] = callback
+
+    async def start(self) -> None:
+        """Start listening on the configured host/port."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info("Ops server listening on http://%s:%s (%s)", self.host, self.port, ", ".join(self._routes))
+
+    async def stop(self) -> None:
+        """Stop listening and wait for the server to close."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            # Drain headers - we do not use them
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+
+            parts = request_line.decode("latin-1").split()
+            if len(parts) < 2:
+                return
+            method, path = parts[0], parts[1].split("?", 1)[0]
+
+            callback = self._routes.get(path)
+            if method != "GET":
+                status, content_type, body = 405, "text/plain", "method not allowed\n"
+            elif callback is None:
+                status, content_type, body = 404, "text/plain", "not found\n"
+            else:
+                try:
+                    result = callback()
+                    if inspect.isawaitable(result):
+                        result = await result
+                    status, content_type, body = result
+                except Exception as e:
+                    logger.error("Ops endpoint %s failed: %s", path, e, exc_info=True)
+                    status, content_type, body = 500, "text/plain", "internal error\n"
+
+            payload = body.encode("utf-8")
+            head = (
+                f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}; charset=utf-8\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Connection: close\r\n\r\n"
+            )
+            writer.write(head.encode("latin-1") + payload)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,82 @@
+"""Pipelined Bot API calls inside a handler.
+
+A button press used to cost sequential round-trips: ``answerCallbackQuery``,
+then ``editMessageText`` (and for a generation the loading edit before the
+GPT call). Telegram needs none of them in order except edits of the same
+message, so independent calls are started as tasks and awaited later:
+
+- ``answers_callback`` answers the button press while the handler runs and
+  settles the answer when the handler returns;
+- ``start_call`` runs a call (e.g. the loading edit) in the background; the
+  handler awaits it before the next edit of the same message.
+
+A failed background call is logged and counted but does not abort the
+handler: a missing answer only makes the button spinner time out, and a lost
+loading edit is replaced by the result. Errors of the handler's own awaited
+calls propagate as before.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+from typing import Coroutine, Optional
+
+from telegram.error import TelegramError
+
+from .metrics import TELEGRAM_ERRORS
+
+logger = logging.getLogger(__name__)
+
+# Answer of the button press being handled (nested handlers must not answer it again)
+_answer: contextvars.ContextVar[Optional[asyncio.Task]] = contextvars.ContextVar("digilib_answer", default=None)
+
+
+async def _logged(call: Coroutine, what: str) -> bool:
+    try:
+        await call
+    except TelegramError as e:
+        TELEGRAM_ERRORS.labels(type(e).__name__).inc()
+        logger.warning("Background %s failed: %s", what, e)
+        return False
+    return True
+
+
+def start_call(call: Coroutine, what: str) -> asyncio.Task:
+    """Send a Bot API call in the background.
+
+    Await the task before anything that depends on the call (it can be awaited
+    any number of times). A failure is logged and counted instead of raised.
+
+    Args:
+        call: Bot API coroutine, e.g. ``query.answer()``
+        what: Name of the call for the log
+
+    Returns:
+        Task resolving to True if the call succeeded
+    """
+    return asyncio.create_task(_logged(call, what))
+
+
+def answers_callback(handler):
+    """Decorator answering the button press concurrently with the handler's work.
+
+    The answer is awaited (and its failure logged) before the handler's result
+    is returned, so no call outlives the update. A handler called from another
+    decorated handler reuses the outer answer.
+    """
+
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        query = update.callback_query
+        if query is None or _answer.get() is not None:
+            return await handler(update, context)
+        task = start_call(query.answer(), "callback answer")
+        token = _answer.set(task)
+        try:
+            return await handler(update, context)
+        finally:
+            _answer.reset(token)
+            await task
+
+    return wrapper
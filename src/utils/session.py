@@ -0,0 +1,129 @@
+"""Compact per-user session state with idle eviction.
+
+``UserSession`` replaces PTB's default ``context.user_data`` dict (wired in
+with ``ContextTypes(user_data=UserSession)``): a fixed ``__slots__`` object
+instead of a dict holding a nested dict per user. ``SessionSweeper``
+periodically drops the sessions of users who have been idle longer than the
+timeout (``Application.drop_user_data``), so patrons who never come back do
+not pin memory forever; their ConversationHandler state ends after the same
+timeout through its ``conversation_timeout``.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import Application, ContextTypes
+
+from .metrics import Counter, GaugeFunc
+
+logger = logging.getLogger(__name__)
+
+SESSIONS_EVICTED = Counter(
+    "digilib_sessions_evicted_total", "User sessions dropped after the idle timeout"
+)
+SESSIONS = GaugeFunc("digilib_sessions", "User sessions held in memory")
+
+
+class UserSession:
+    """Per-user state kept between updates."""
+
+    __slots__ = ("creative_step", "target_audience", "problem", "tech_preference", "ideas", "ideas_context",
+                 "last_seen")
+
+    def __init__(self):
+        self.creative_step = 0
+        self.target_audience: Optional[str] = None
+        self.problem: Optional[str] = None
+        self.tech_preference: Optional[str] = None
+        # Ideas on the user's screen (what "Уточнить"/"Упростить" act on) and their questionnaire
+        self.ideas: Optional[List[Dict]] = None
+        self.ideas_context: Optional[Dict[str, str]] = None
+        self.last_seen = time.monotonic()
+
+    def start_creative(self) -> None:
+        """Reset the creative questionnaire to question 1."""
+        self.creative_step = 1
+        self.target_audience = None
+        self.problem = None
+        self.tech_preference = None
+
+    def show_ideas(self, ideas: List[Dict], context: Dict[str, str]) -> None:
+        """Remember the ideas just shown so they can be refined without a new questionnaire."""
+        self.ideas = ideas
+        self.ideas_context = context
+
+    def creative_context(self) -> Dict[str, str]:
+        """Answers collected so far, in the shape ``generate_ideas`` expects."""
+        context = {}
+        if self.target_audience is not None:
+            context["target_audience"] = self.target_audience
+        if self.problem is not None:
+            context["problem"] = self.problem
+        if self.tech_preference is not None:
+            context["tech_preference"] = self.tech_preference
+        return context
+
+
+async def touch_session(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Mark the user as active (registered in handler group -1, before everything else)."""
+    if update.effective_user is not None:
+        context.user_data.last_seen = time.monotonic()
+
+
+class SessionSweeper:
+    """Evicts idle users' sessions."""
+
+    def __init__(self, application: Application, idle_timeout: float, interval: float = 60.0):
+        """Initialize sweeper.
+
+        Args:
+            application: Application owning the user sessions
+            idle_timeout: Seconds without updates after which a user is evicted
+            interval: Seconds between sweeps
+        """
+        self.application = application
+        self.idle_timeout = idle_timeout
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        SESSIONS.add_function(lambda: {(): len(self.application.user_data)})
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Evict everyone idle for longer than the timeout.
+
+        Returns:
+            Number of evicted users
+        """
+        cutoff = (now if now is not None else time.monotonic()) - self.idle_timeout
+        stale = [
+            user_id for user_id, session in self.application.user_data.items()
+            if session.last_seen < cutoff
+        ]
+        for user_id in stale:
+            self.application.drop_user_data(user_id)
+        if stale:
+            SESSIONS_EVICTED.inc(len(stale))
+            logger.debug("Evicted %d idle session(s)", len(stale))
+        return len(stale)
+
+    def start(self) -> None:
+        """Start sweeping in the background."""
+        self._task = asyncio.get_running_loop().create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        """Stop the background sweeps."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.sweep()
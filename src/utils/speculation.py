@@ -0,0 +1,142 @@
+"""Speculative idea prefetch.
+
+The problem text (question 2) is the most informative answer, so generation
+can start while the user is still picking a project type (question 3) with
+a predicted choice. If the final answers match the prediction, the running
+or finished result is used and the user only waits for what is left of it;
+otherwise it is cancelled. Speculative calls are limited by a global budget
+and are not charged to the user's quota unless their result is shown.
+Speculations are kept per tenant and user (the tenant is the current one),
+so a user of two library bots never gets the other bot's generation.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from .memory import memory_accounting
+from .metrics import Counter
+from .tenants import current_tenant
+
+logger = logging.getLogger(__name__)
+
+SPECULATIONS = Counter(
+    "digilib_speculative_generations_total", "Speculative idea generations by outcome", ["outcome"]
+)
+_STARTED = SPECULATIONS.labels("started")
+_USED = SPECULATIONS.labels("used")
+_MISPREDICTED = SPECULATIONS.labels("mispredicted")
+_EXPIRED = SPECULATIONS.labels("expired")
+_OVER_BUDGET = SPECULATIONS.labels("over_budget")
+
+
+class Speculation:
+    """A background generation started for predicted answers."""
+
+    __slots__ = ("context", "task", "started_at")
+
+    def __init__(self, context: Dict[str, str], task: asyncio.Task):
+        self.context = context
+        self.task = task
+        self.started_at = time.monotonic()
+
+
+class SpeculativePrefetcher:
+    """One speculative generation per (tenant, user), within a global hourly budget."""
+
+    def __init__(self, budget_per_hour: int = 60, max_in_flight: int = 4, ttl: float = 600.0):
+        """Initialize prefetcher.
+
+        Args:
+            budget_per_hour: Speculative calls allowed per hour (token bucket)
+            max_in_flight: Speculative calls allowed to run at the same time
+            ttl: Seconds an unclaimed speculation is kept before it is dropped
+        """
+        self.budget_per_hour = budget_per_hour
+        self.max_in_flight = max_in_flight
+        self.ttl = ttl
+        self._tokens = float(budget_per_hour)
+        self._refilled_at = time.monotonic()
+        self._speculations: Dict[Tuple[str, int], Speculation] = {}
+        memory_accounting.add_source("prefetch.speculations", lambda: self._speculations)
+
+    @property
+    def in_flight(self) -> int:
+        return sum(1 for s in self._speculations.values() if not s.task.done())
+
+    def _take_token(self) -> bool:
+        now = time.monotonic()
+        self._tokens = min(
+            self.budget_per_hour, self._tokens + (now - self._refilled_at) * self.budget_per_hour / 3600
+        )
+        self._refilled_at = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def start(self, user_id: int, context: Dict[str, str],
+              generate: Callable[[], Awaitable[Dict]]) -> bool:
+        """Start a speculative generation for a user, replacing any previous one.
+
+        Args:
+            user_id: Telegram user ID
+            context: Predicted questionnaire answers
+            generate: Factory for the generation coroutine (must not charge the quota)
+
+        Returns:
+            True if started, False if over budget
+        """
+        key = (current_tenant(), user_id)
+        self._drop(key)
+        if self.in_flight >= self.max_in_flight or not self._take_token():
+            _OVER_BUDGET.inc()
+            return False
+
+        task = asyncio.ensure_future(generate())
+        speculation = Speculation(dict(context), task)
+        self._speculations[key] = speculation
+        asyncio.get_running_loop().call_later(self.ttl, self._expire, key, speculation)
+        _STARTED.inc()
+        return True
+
+    def take(self, user_id: int, context: Dict[str, str]) -> Optional[asyncio.Task]:
+        """Claim the user's speculation if it was made for exactly these answers.
+
+        A speculation for other answers is cancelled.
+
+        Returns:
+            The (possibly still running) generation task, or None
+        """
+        speculation = self._speculations.pop((current_tenant(), user_id), None)
+        if speculation is None:
+            return None
+        if speculation.context != context:
+            speculation.task.cancel()
+            _MISPREDICTED.inc()
+            return None
+        _USED.inc()
+        logger.debug("Using speculative generation for user %s started %.1fs ago",
+                     user_id, time.monotonic() - speculation.started_at)
+        return speculation.task
+
+    def cancel(self, user_id: int) -> None:
+        """Drop the user's speculation, if any."""
+        self._drop((current_tenant(), user_id))
+
+    def cancel_all(self) -> None:
+        """Drop every speculation (shutdown)."""
+        for key in list(self._speculations):
+            self._drop(key)
+
+    def _drop(self, key: Tuple[str, int]) -> None:
+        speculation = self._speculations.pop(key, None)
+        if speculation is not None:
+            speculation.task.cancel()
+
+    def _expire(self, key: Tuple[str, int], speculation: Speculation) -> None:
+        if self._speculations.get(key) is speculation:
+            del self._speculations[key]
+            speculation.task.cancel()
+            _EXPIRED.inc()
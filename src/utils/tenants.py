@@ -0,0 +1,146 @@
+"""Tenants - several library bots served by one process.
+
+Every tenant is a separate Telegram bot (its own token, ``Application``,
+conversations, recipients and admins) with its own greeting and token quota.
+The GPT client, its connection pool, the idea history database and the
+admission controller are shared by all tenants; ideas and prefetched
+generations are kept per tenant and user.
+
+The tenant config is a JSON list::
+
+    [
+        {"id": "central", "token_env": "CENTRAL_BOT_TOKEN", "name": "Центральная библиотека",
+         "welcome": "Мы работаем с 10 до 20.", "admins": [123], "tokens_per_hour": 50000},
+        {"id": "kids", "token": "123456:ABC..."}
+    ]
+
+Without a config the bot runs as the single ``default`` tenant from
+``TELEGRAM_BOT_TOKEN``. The tenant of the update being handled is kept in a
+``ContextVar`` (set by ``activate_tenant``), so code deep in a call (e.g. token
+admission) charges the right tenant without it being passed around.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import re
+from typing import Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TENANT = "default"
+
+_TENANT_ID_RE = re.compile(r"^[a-z0-9_-]+$")
+
+_current_tenant: contextvars.ContextVar[str] = contextvars.ContextVar("digilib_tenant", default=DEFAULT_TENANT)
+
+
+class Tenant:
+    """One library bot: token, branding, admins and token quota."""
+
+    __slots__ = ("tenant_id", "token", "name", "welcome", "admin_user_ids", "tokens_per_hour", "tokens_per_day")
+
+    def __init__(self, tenant_id: str, token: str, name: str = "", welcome: str = "",
+                 admin_user_ids: Optional[List[int]] = None, tokens_per_hour: int = 0, tokens_per_day: int = 0):
+        """Initialize tenant.
+
+        Args:
+            tenant_id: Short id used in file names, metrics and logs
+            token: Telegram bot token
+            name: Library name shown in the greeting (empty = none)
+            welcome: Extra greeting text (empty = none)
+            admin_user_ids: Users allowed to run admin commands for this bot
+            tokens_per_hour: Tenant's share of the GPT token budget per hour (0 = no own limit)
+            tokens_per_day: Tenant's share of the GPT token budget per day (0 = no own limit)
+        """
+        self.tenant_id = tenant_id
+        self.token = token
+        self.name = name
+        self.welcome = welcome
+        self.admin_user_ids = list(admin_user_ids or [])
+        self.tokens_per_hour = tokens_per_hour
+        self.tokens_per_day = tokens_per_day
+
+    def data_path(self, path: str) -> str:
+        """Per-tenant variant of a data file path ("data/x.db" -> "data/x.<tenant>.db").
+
+        The default tenant keeps the path unchanged, so a single-bot deployment
+        finds its existing files.
+        """
+        if self.tenant_id == DEFAULT_TENANT:
+            return path
+        root, ext = os.path.splitext(path)
+        return f"{root}.{self.tenant_id}{ext}"
+
+    @classmethod
+    def from_dict(cls, data: Dict, default_admins: List[int]) -> "Tenant":
+        """Build a tenant from a config entry ("token" or "token_env" holds the bot token)."""
+        tenant_id = str(data["id"])
+        if not _TENANT_ID_RE.match(tenant_id):
+            raise ValueError(f"tenant id {tenant_id!r} may only contain a-z, 0-9, '_' and '-'")
+        token = data.get("token") or os.getenv(data.get("token_env", ""), "")
+        if not token:
+            raise ValueError(f"tenant {tenant_id!r} has no bot token")
+        return cls(
+            tenant_id,
+            token,
+            name=data.get("name", ""),
+            welcome=data.get("welcome", ""),
+            admin_user_ids=[int(uid) for uid in data.get("admins", default_admins)],
+            tokens_per_hour=int(data.get("tokens_per_hour", 0)),
+            tokens_per_day=int(data.get("tokens_per_day", 0)),
+        )
+
+
+def load_tenants(path: str, default_admins: List[int]) -> List[Tenant]:
+    """Read the tenant config.
+
+    Args:
+        path: JSON file with a list of tenant entries
+        default_admins: Admins of tenants that don't list their own
+
+    Returns:
+        Tenants in config order
+
+    Raises:
+        ValueError: The config is unreadable, empty, or has invalid or duplicate entries
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"cannot read tenant config {path}: {e}") from e
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"tenant config {path} must be a non-empty JSON list")
+
+    tenants = []
+    for entry in entries:
+        try:
+            tenant = Tenant.from_dict(entry, default_admins)
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"invalid tenant entry {entry!r}: {e}") from e
+        if any(other.tenant_id == tenant.tenant_id for other in tenants):
+            raise ValueError(f"duplicate tenant id {tenant.tenant_id!r}")
+        if any(other.token == tenant.token for other in tenants):
+            raise ValueError(f"tenant {tenant.tenant_id!r} reuses another tenant's bot token")
+        tenants.append(tenant)
+    return tenants
+
+
+def current_tenant() -> str:
+    """Id of the tenant whose update is being handled (DEFAULT_TENANT outside updates)."""
+    return _current_tenant.get()
+
+
+def set_current_tenant(tenant_id: str) -> contextvars.Token:
+    """Make ``tenant_id`` current for this task (and tasks it creates from now on)."""
+    return _current_tenant.set(tenant_id)
+
+
+async def activate_tenant(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Make the bot's tenant current for the rest of the update (registered in the first handler group)."""
+    _current_tenant.set(context.bot_data["tenant"].tenant_id)
@@ -0,0 +1,205 @@
+"""Per-update tracing and an opt-in sampling profiler.
+
+Every incoming update gets a trace id kept in a ``ContextVar``, so it follows
+the update through handlers, Bot API calls and ``YandexGPTClient`` without
+being passed around explicitly. Awaited I/O is wrapped in timed spans; updates
+slower than a threshold have their whole span tree logged.
+"""
+
+import collections
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from telegram.ext import Application
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+# Updates slower than this (seconds) get their span tree logged
+SLOW_UPDATE_SECONDS = 5.0
+
+
+class Span:
+    """A timed section of an update's processing."""
+
+    __slots__ = ("name", "start", "end", "depth")
+
+    def __init__(self, name: str, start: float, depth: int):
+        self.name = name
+        self.start = start
+        self.end: Optional[float] = None
+        self.depth = depth
+
+
+class Trace:
+    """Spans recorded while processing one update."""
+
+    __slots__ = ("trace_id", "update_id", "user_id", "start", "spans")
+
+    def __init__(self, trace_id: str, update_id: Optional[int], user_id: Optional[int]):
+        self.trace_id = trace_id
+        self.update_id = update_id
+        self.user_id = user_id
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+
+    def format_tree(self) -> str:
+        """Render spans as an indented tree with offsets and durations (ms)."""
+        lines = [f"trace {self.trace_id} update={self.update_id} user={self.user_id}"]
+        for span in self.spans:
+            offset = (span.start - self.start) * 1000
+            duration = ((span.end or time.perf_counter()) - span.start) * 1000
+            suffix = "" if span.end is not None else " (unfinished)"
+            lines.append(f"{'  ' * (span.depth + 1)}{span.name}: +{offset:.1f}ms {duration:.1f}ms{suffix}")
+        return "\n".join(lines)
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar(
+    "digilib_trace", default=None
+)
+# Innermost open span; per task, so calls running concurrently in background tasks nest under
+# the span they were started from rather than under whatever the handler has open meanwhile
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "digilib_span", default=None
+)
+
+
+def new_trace_id() -> str:
+    """Generate a short random trace id."""
+    return os.urandom(8).hex()
+
+
+def current_trace() -> Optional[Trace]:
+    """Get the trace of the update being processed, if any."""
+    return _current_trace.get()
+
+
+def current_trace_id() -> Optional[str]:
+    """Get the current trace id, if any."""
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time a section of the current update (no-op outside a trace)."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    parent = _current_span.get()
+    item = Span(name, time.perf_counter(), parent.depth + 1 if parent is not None else 0)
+    trace.spans.append(item)
+    token = _current_span.set(item)
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+        item.end = time.perf_counter()
+
+
+@contextmanager
+def trace_update(update: object) -> Iterator[Trace]:
+    """Open a trace for one update and dump it if processing was slow."""
+    update_id = getattr(update, "update_id", None)
+    user = getattr(update, "effective_user", None)
+    trace = Trace(new_trace_id(), update_id, user.id if user else None)
+    token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(token)
+        elapsed = time.perf_counter() - trace.start
+        if elapsed >= SLOW_UPDATE_SECONDS:
+            logger.warning("Slow update (%.2fs):\n%s", elapsed, trace.format_tree())
+
+
+class TracedApplication(Application):
+    """Application that wraps processing of every update in a trace."""
+
+    async def process_update(self, update: object) -> None:
+        with trace_update(update):
+            await super().process_update(update)
+
+
+class TracedHTTPXRequest(HTTPXRequest):
+    """Bot API transport recording a span per API method call."""
+
+    async def do_request(self, url, method, request_data=None, *args, **kwargs):
+        with span(f"bot.{url.rsplit('/', 1)[-1]}"):
+            return await super().do_request(url, method, request_data, *args, **kwargs)
+
+
+class SamplingProfiler:
+    """Low-overhead wall-clock sampler of the event loop thread.
+
+    A daemon thread periodically grabs the loop thread's current frame and
+    counts collapsed stacks (flamegraph.pl format). Nothing runs while stopped.
+    """
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 40):
+        """Initialize profiler.
+
+        Args:
+            interval: Seconds between samples
+            max_depth: Frames kept per stack
+        """
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Dict[Tuple[str, ...], int] = collections.Counter()
+        self._target_thread_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, thread_id: Optional[int] = None) -> None:
+        """Start sampling a thread (default: the calling thread)."""
+        if self._thread is not None:
+            return
+        self._target_thread_id = thread_id or threading.get_ident()
+        self.samples.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="digilib-profiler", daemon=True)
+        self._thread.start()
+        logger.info("Sampling profiler started (%.0fms interval)", self.interval * 1000)
+
+    def stop(self) -> None:
+        """Stop sampling; collected samples are kept until the next start."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        logger.info("Sampling profiler stopped (%d samples)", sum(self.samples.values()))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target_thread_id)
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def collapsed(self, limit: int = 200) -> str:
+        """Render the hottest stacks in collapsed format (``a;b;c count``)."""
+        top = sorted(self.samples.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in top)
+
+
+# Process-wide profiler, toggled at runtime through the ops server
+profiler = SamplingProfiler()
@@ -0,0 +1,138 @@
+"""Recording of production traffic for replay-based performance testing.
+
+Incoming messages and button presses, and the duration and outcome of every
+GPT call, are appended to a gzip-compressed JSON-lines file. Nothing personal
+is kept: user ids are replaced by keyed hashes (the key lives only in process
+memory), message text by a same-length placeholder (commands are kept), and
+names are dropped. ``benchmarks/replay_traffic.py`` feeds a recording back
+into the bot.
+
+Record layout (one JSON array per line, ``t`` = seconds since session start):
+    [0, "s", wall_clock]              new recording session (process start)
+    [t, "m", user, text]              message
+    [t, "c", user, callback_data]     button press
+    [t, "g", user, seconds, outcome]  GPT call ("success" or the error code)
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import secrets
+import time
+from typing import Iterator, List, Optional
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+logger = logging.getLogger(__name__)
+
+
+class TrafficRecorder:
+    """Buffers anonymized traffic records and appends them to a file in batches."""
+
+    def __init__(self):
+        """Initialize a stopped recorder (record calls are no-ops until start())."""
+        self.path: Optional[str] = None
+        self._key = secrets.token_bytes(16)
+        self._started = time.monotonic()
+        self._buffer: List[list] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def recording(self) -> bool:
+        return self.path is not None
+
+    def anonymize_user(self, user_id: int) -> int:
+        """Stable (per process) pseudonymous id for a user."""
+        digest = hashlib.blake2b(user_id.to_bytes(8, "big", signed=True), key=self._key, digest_size=6)
+        return int.from_bytes(digest.digest(), "big")
+
+    def _now(self) -> float:
+        return round(time.monotonic() - self._started, 3)
+
+    def record_update(self, update: Update) -> None:
+        """Record a message or button press."""
+        user = update.effective_user
+        if not self.recording or user is None:
+            return
+        if update.callback_query is not None:
+            self._buffer.append([self._now(), "c", self.anonymize_user(user.id), update.callback_query.data])
+        elif update.message is not None and update.message.text is not None:
+            self._buffer.append([self._now(), "m", self.anonymize_user(user.id), anonymize_text(update.message.text)])
+
+    def record_gpt(self, user_id: int, seconds: float, outcome: str) -> None:
+        """Record the duration and outcome of a GPT call."""
+        if self.recording:
+            self._buffer.append([self._now(), "g", self.anonymize_user(user_id), round(seconds, 3), outcome])
+
+    def start(self, path: str, interval: float = 5.0) -> None:
+        """Start a recording session appended to ``path``, flushed every ``interval`` seconds."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._started = time.monotonic()
+        self._buffer.append([0, "s", round(time.time())])
+        self._task = asyncio.get_running_loop().create_task(self._flush_loop(interval))
+
+    async def stop(self) -> None:
+        """Stop recording and write out what is left."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self.flush()
+        self.path = None
+
+    async def flush(self) -> int:
+        """Append buffered records to the file (off the event loop)."""
+        records, self._buffer = self._buffer, []
+        if records and self.path:
+            await asyncio.to_thread(_append_records, self.path, records)
+        return len(records)
+
+    async def _flush_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except OSError as e:
+                logger.error("Traffic recording flush failed: %s", e)
+
+
+def anonymize_text(text: str) -> str:
+    """Keep bot commands, replace anything typed by the user with a placeholder."""
+    if text.startswith("/"):
+        return text.split(maxsplit=1)[0]
+    return "x" * len(text)
+
+
+def _append_records(path: str, records: List[list]) -> None:
+    # Each batch is a separate gzip member; readers decompress them as one stream
+    data = "".join(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n" for record in records)
+    with gzip.open(path, "at", encoding="utf-8") as f:
+        f.write(data)
+
+
+def read_records(path: str) -> Iterator[list]:
+    """Iterate over the records of a recording file."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+async def record_update(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handler (group -2) recording every incoming update."""
+    traffic_recorder.record_update(update)
+
+
+# Process-wide recorder (started in post_init when TRAFFIC_RECORD_PATH is set)
+traffic_recorder = TrafficRecorder()
@@ -0,0 +1,171 @@
+"""Bot API transport: connection pools, timeouts, endpoint and transport metrics.
+
+Every bot gets two HTTPX clients, each with its own connection pool: one
+connection for the ``getUpdates`` long poll and a pool for everything the
+handlers send (broadcasts add a third pool, see ``build_sender_bot``), so a
+burst of sends never delays fetching updates and vice versa. Pool sizes,
+timeouts and HTTP/2 are set from the config by ``main``.
+
+``API_URL`` (``TELEGRAM_API_URL``) points the bots at a self-hosted Bot API
+server (https://github.com/tdlib/telegram-bot-api) instead of
+api.telegram.org: next to the bot it has lower round-trips and higher
+limits. The same setting points them at a fake server in benchmarks.
+
+Calls wait for a free connection in front of the HTTPX client rather than
+inside it: httpcore's pool does work per call that grows with the calls
+queued in it, so a burst larger than the pool cost several times the CPU
+per call (see ``benchmarks/bench_transport.py``). ``InstrumentedHTTPXRequest``
+admits at most ``pool_size`` calls into the client and records the wait,
+the round-trip latency by method and the new connections opened (from
+httpcore's ``trace`` request extension).
+"""
+
+import asyncio
+import importlib.util
+import logging
+import ssl
+import time
+from typing import Optional, Tuple
+
+import httpx
+from telegram.error import TimedOut
+from telegram.request import BaseRequest
+
+from .metrics import Counter, Histogram
+from .tracing import TracedHTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+# Transport settings (set from the config by main; the defaults are python-telegram-bot's)
+API_URL = ""  # Bot API server root, e.g. "http://telegram-bot-api:8081" ("" = api.telegram.org)
+CONNECT_TIMEOUT = 5.0
+READ_TIMEOUT = 5.0
+WRITE_TIMEOUT = 5.0
+POOL_TIMEOUT = 1.0
+KEEPALIVE_EXPIRY = 30.0
+HTTP2 = False
+
+# Pool names (metrics label)
+POOL_UPDATES = "updates"
+POOL_SEND = "send"
+POOL_BROADCAST = "broadcast"
+
+# Waiting for a pooled connection is normally instant; anything visible here is a too-small pool
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+BOT_API_LATENCY = Histogram(
+    "digilib_bot_api_latency_seconds", "Bot API call round-trip (incl. pool wait), by pool and method",
+    ["pool", "method"]
+)
+BOT_API_POOL_WAIT = Histogram(
+    "digilib_bot_api_pool_wait_seconds", "Time a Bot API call waited for a pooled connection", ["pool"],
+    buckets=POOL_WAIT_BUCKETS
+)
+BOT_API_CONNECTIONS = Counter(
+    "digilib_bot_api_connections_opened_total", "New connections to the Bot API server", ["pool"]
+)
+
+_DefaultValue = type(BaseRequest.DEFAULT_NONE)
+
+_warned_http2 = False
+
+
+def http_version() -> str:
+    """HTTP version for Bot API clients: "2" if HTTP2 is set and h2 is installed."""
+    global _warned_http2
+    if not HTTP2:
+        return "1.1"
+    if importlib.util.find_spec("h2") is None:
+        if not _warned_http2:
+            logger.warning("TELEGRAM_HTTP2 is set but h2 is not installed (pip install 'httpx[http2]') "
+                           "- using HTTP/1.1")
+            _warned_http2 = True
+        return "1.1"
+    return "2"
+
+
+def api_urls() -> Tuple[str, str]:
+    """(base_url, base_file_url) of the Bot API server for ``Bot``/``ApplicationBuilder``."""
+    root = (API_URL or "https://api.telegram.org").rstrip("/")
+    return f"{root}/bot", f"{root}/file/bot"
+
+
+class InstrumentedHTTPXRequest(TracedHTTPXRequest):
+    """Bot API transport exporting latency, pool wait and connection metrics."""
+
+    def __init__(self, pool: str, connection_pool_size: int = 256, **kwargs):
+        """Initialize transport.
+
+        Args:
+            pool: Pool name for the metrics (POOL_UPDATES, POOL_SEND, POOL_BROADCAST)
+            connection_pool_size: Connections in the pool = calls in flight at a time
+            **kwargs: Other HTTPXRequest arguments
+        """
+        self.pool = pool
+        self._slots = asyncio.Semaphore(connection_pool_size)
+        self._pool_wait = BOT_API_POOL_WAIT.labels(pool)
+        self._connections = BOT_API_CONNECTIONS.labels(pool)
+        self._latency = {}
+        httpx_kwargs = dict(kwargs.pop("httpx_kwargs", None) or {})
+        httpx_kwargs["event_hooks"] = {"request": [self._trace_request]}
+        super().__init__(connection_pool_size=connection_pool_size, httpx_kwargs=httpx_kwargs, **kwargs)
+
+    async def _trace_connection(self, event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.started":
+            self._connections.inc()
+
+    async def _trace_request(self, request: httpx.Request) -> None:
+        request.extensions["trace"] = self._trace_connection
+
+    async def do_request(self, url, method, request_data=None, *args, **kwargs):
+        api_method = url.rsplit("/", 1)[-1]
+        child = self._latency.get(api_method)
+        if child is None:
+            child = self._latency[api_method] = BOT_API_LATENCY.labels(self.pool, api_method)
+        start = time.perf_counter()
+        try:
+            if self._slots.locked():
+                pool_timeout = kwargs.get("pool_timeout", BaseRequest.DEFAULT_NONE)
+                if isinstance(pool_timeout, _DefaultValue):
+                    pool_timeout = self._client.timeout.pool
+                try:
+                    await asyncio.wait_for(self._slots.acquire(), pool_timeout)
+                except asyncio.TimeoutError:
+                    raise TimedOut("Pool timeout: All connections in the connection pool are occupied. "
+                                   "Request was *not* sent to Telegram.") from None
+            else:
+                await self._slots.acquire()
+            self._pool_wait.observe(time.perf_counter() - start)
+            try:
+                return await super().do_request(url, method, request_data, *args, **kwargs)
+            finally:
+                self._slots.release()
+        finally:
+            child.observe(time.perf_counter() - start)
+
+
+def build_request(pool: str, pool_size: int,
+                  tls_context: Optional[ssl.SSLContext] = None) -> InstrumentedHTTPXRequest:
+    """Bot API transport with the configured timeouts and HTTP version.
+
+    Args:
+        pool: Pool name for the metrics
+        pool_size: Connections in the pool (all of them are kept alive between calls)
+        tls_context: Shared TLS context (default: a new one for this client)
+    """
+    # HTTPXRequest only sets max_connections; httpx would then keep just 20 of them alive
+    # and reconnect (TLS handshake included) for every call above that in a burst
+    httpx_kwargs = {"limits": httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                                           keepalive_expiry=KEEPALIVE_EXPIRY)}
+    if tls_context is not None:
+        httpx_kwargs["verify"] = tls_context
+    return InstrumentedHTTPXRequest(
+        pool,
+        connection_pool_size=pool_size,
+        read_timeout=READ_TIMEOUT,
+        write_timeout=WRITE_TIMEOUT,
+        connect_timeout=CONNECT_TIMEOUT,
+        pool_timeout=POOL_TIMEOUT,
+        http_version=http_version(),
+        httpx_kwargs=httpx_kwargs,
+    )
@@ -1,18 +1,61 @@
 """Yandex GPT API Client for DigiLib Assistant.
 
 Implements constraint-based prompting strategy from creative-prompt-engineering.md
+
+Ideas are generated in one of two modes:
+
+    single    one completion writes all 2-3 ideas
+    parallel  a short titles-only completion, then one completion per title at
+              the same time; ideas are reported as each one finishes
+
+Completion time grows with output length, so the parallel mode shows the
+first idea after a short call plus one idea's worth of output, and finishes
+with the slowest single idea instead of the sum of all three. It costs more
+tokens: the context and instructions are sent once per idea.
 """
 
+import asyncio
 import re
 import time
 import logging
 import aiohttp
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from collections import defaultdict
 
+from .admission import Admission, AdmissionController
+from .idea_history import format_ideas
+from .memory import memory_accounting
+from .metrics import (
+    GPT_ANSWERS,
+    GPT_IDEAS_LATENCY,
+    GPT_LATENCY,
+    GPT_PARSE_FAILURES,
+    GPT_REFINEMENTS,
+    GPT_REGENERATIONS_SAVED,
+    GPT_REPAIRED_IDEAS,
+    GPT_RESPONSES,
+    RATE_LIMIT_REJECTIONS,
+)
+from .tracing import current_trace_id, span
+from .traffic_recorder import traffic_recorder
+
 logger = logging.getLogger(__name__)
 
+# Metric children resolved once
+_HOURLY_REJECTIONS = RATE_LIMIT_REJECTIONS.labels("hour")
+_DAILY_REJECTIONS = RATE_LIMIT_REJECTIONS.labels("day")
+_VALID_ANSWERS = GPT_ANSWERS.labels("valid")
+_REFORMATTED_ANSWERS = GPT_ANSWERS.labels("reformatted")
+_PARTIAL_ANSWERS = GPT_ANSWERS.labels("partial")
+_UNUSABLE_ANSWERS = GPT_ANSWERS.labels("unusable")
+_REPAIRED_IDEAS = GPT_REPAIRED_IDEAS.labels("repaired")
+_UNREPAIRED_IDEAS = GPT_REPAIRED_IDEAS.labels("failed")
+
+GENERATION_SINGLE = "single"
+GENERATION_PARALLEL = "parallel"
+GENERATION_MODES = (GENERATION_SINGLE, GENERATION_PARALLEL)
+
 
 # System Prompt (Constraint-Based - ~100 tokens)
 SYSTEM_PROMPT = """Ты - дружелюбный IT-наставник в библиотеке, помогающий новичкам создавать цифровые проекты.
@@ -38,21 +81,167 @@ SYSTEM_PROMPT = """Ты - дружелюбный IT-наставник в биб
 """
 
 
+# Parallel mode, step 1: titles only (a few dozen output tokens)
+TITLES_PROMPT = """Ты - дружелюбный IT-наставник в библиотеке, помогающий новичкам создавать цифровые проекты.
+
+ЗАДАЧА: Придумай 3 разные простые, реально осуществимые идеи проектов
+(2-4 недели для начинающего, только бесплатные и доступные технологии).
+
+Верни ТОЛЬКО названия, без пояснений:
+1. [Краткое название]
+2. [Краткое название]
+3. [Краткое название]
+"""
+TITLES_MAX_TOKENS = 120
+
+# Parallel mode, step 2: one idea per call, in the same format as a full answer
+EXPAND_PROMPT = """Ты - дружелюбный IT-наставник в библиотеке, помогающий новичкам создавать цифровые проекты.
+
+ЗАДАЧА: Распиши одну идею проекта с заданным названием.
+
+ОГРАНИЧЕНИЯ:
+- Проект должен быть завершен за 2-4 недели начинающим
+- Используй только бесплатные и доступные технологии
+- Объясняй без технического жаргона
+
+ОБЯЗАТЕЛЬНЫЙ ФОРМАТ:
+**Идея 1: [Название]**
+[Описание в 2-3 предложениях, что это и зачем]
+
+Решает: [Какую конкретную проблему]
+Технологии: [Список из 2-4 инструментов]
+Первые шаги:
+1. [Конкретное действие]
+2. [Конкретное действие]
+3. [Конкретное действие]
+"""
+EXPAND_MAX_TOKENS = 700
+
+# "1. Title", "2) **Title**", "Идея 3: Title"
+_TITLE_LINE_RE = re.compile(r'^[ \t#>*]*(?:Идея\s*)?\d+\s*[.):]\s*(.+?)\s*$', re.MULTILINE | re.IGNORECASE)
+
+# Follow-up prompt completing broken ideas (only the missing fields are requested)
+REPAIR_PROMPT = """Ты дополняешь неполные идеи проектов для новичков.
+
+Заполни только то, чего не хватает (строка "Не хватает"). Название и уже написанный текст сохрани.
+
+ОБЯЗАТЕЛЬНЫЙ ФОРМАТ для каждой идеи, в том же порядке:
+**Идея [номер]: [Название]**
+[Описание в 2-3 предложениях]
+
+Решает: [Какую конкретную проблему]
+Технологии: [Список из 2-4 инструментов]
+Первые шаги:
+1. [Конкретное действие]
+2. [Конкретное действие]
+3. [Конкретное действие]
+"""
+# Follow-up on one shown idea: only that idea and an instruction are sent, not the questionnaire prompt
+REFINE_PROMPT = """Ты дорабатываешь одну идею проекта для новичка по его просьбе.
+
+Верни одну идею в формате:
+**Идея 1: [Название]**
+[Описание в 2-3 предложениях]
+
+Решает: [Какую конкретную проблему]
+Технологии: [Список из 1-4 инструментов]
+Первые шаги:
+1. [Конкретное действие]
+2. [Конкретное действие]
+"""
+REFINE_INSTRUCTIONS = {
+    "refine": "Сделай идею конкретнее: уточни, что именно будет уметь проект, и распиши 4-5 конкретных первых шагов.",
+    "simplify": "Упрости идею: оставь одну главную функцию и 1-2 самых простых инструмента, "
+                "чтобы новичок справился за неделю.",
+}
+REFINE_MAX_TOKENS = 500
+REFINE_TEMPERATURE = 0.5
+
+# Free-text questions the lessons and FAQ could not answer
+FAQ_PROMPT = """Ты помощник для новичков, которые учатся создавать цифровые проекты: Cursor, GitHub, Git, деплой на Railway, идеи проектов.
+
+Ответь на вопрос пользователя просто и по делу, максимум 5 предложений, без Markdown-разметки.
+Если вопрос не связан с этими темами, вежливо скажи, с чем ты можешь помочь."""
+FAQ_MAX_TOKENS = 400
+FAQ_TEMPERATURE = 0.3
+FAQ_QUESTION_MAX_CHARS = 500
+# FAQ answers have their own per-user limit: a question must not cost an idea generation
+FAQ_REQUESTS_PER_HOUR = 20
+FAQ_REQUESTS_PER_DAY = 100
+
+BUDGET_MESSAGE = (
+    "🌙 AI-генерация временно на паузе: общий лимит на сейчас исчерпан.\n\n"
+    "Загляни в «Мои идеи» или изучи основы — а за новыми идеями возвращайся чуть позже!"
+)
+
+REPAIR_TOKENS_PER_IDEA = 350
+REPAIR_TEMPERATURE = 0.3
+
+IDEA_FIELDS = ('title', 'description', 'problem', 'tech', 'steps')
+REPAIR_FIELD_NAMES = {
+    'description': "описание",
+    'problem': "какую проблему решает",
+    'tech': "технологии",
+    'steps': "первые шаги (минимум 2)",
+}
+
+# Near misses of the required format: "### Идея 1.", "Идея №1 —", "**Решает:**", "Инструменты:", "1) шаг"
+_HEADER_VARIANT_RE = re.compile(r'^[ \t#>*]*(?:💡\s*)?Идея\s*№?\s*(\d+)\**\s*[:.)—–-]+\s*\**\s*',
+                                re.MULTILINE | re.IGNORECASE)
+_LABEL_VARIANT_RE = re.compile(
+    r'^[ \t*_•-]*(Решает|Проблема|Технологии|Инструменты|Стек|Первые шаги|Шаги)\s*[*_]*\s*[:—–-]\s*[*_]*[ \t]*',
+    re.MULTILINE | re.IGNORECASE
+)
+_LABEL_NAMES = {
+    "решает": "Решает", "проблема": "Решает",
+    "технологии": "Технологии", "инструменты": "Технологии", "стек": "Технологии",
+    "первые шаги": "Первые шаги", "шаги": "Первые шаги",
+}
+_STEP_PAREN_RE = re.compile(r'^([ \t]*\d+)\)', re.MULTILINE)
+
+
+def normalize_response(text: str) -> str:
+    """Rewrite common near misses of the required answer format into it."""
+    text = _HEADER_VARIANT_RE.sub(lambda m: f"**Идея {m.group(1)}: ", text)
+    text = _LABEL_VARIANT_RE.sub(lambda m: f"{_LABEL_NAMES[m.group(1).lower()]}: ", text)
+    return _STEP_PAREN_RE.sub(r'\1.', text)
+
+
+def parse_titles(text: str, limit: int = 3) -> List[str]:
+    """Idea titles from a titles-only answer (numbered lines; markup and quotes stripped)."""
+    titles = []
+    for match in _TITLE_LINE_RE.finditer(text or ""):
+        title = match.group(1).strip(' *"«»_').rstrip('.')
+        if title and title.casefold() not in (t.casefold() for t in titles):
+            titles.append(title)
+    return titles[:limit]
+
+
+def usage_tokens(result: Dict, text: str) -> int:
+    """Tokens billed for a completion, estimated from the text if usage is missing."""
+    try:
+        return int(result["usage"]["totalTokens"])
+    except (KeyError, TypeError, ValueError):
+        return len(text) // 3  # ~3 characters per token for Russian text
+
+
 class RateLimiter:
     """Rate limiter for GPT API calls."""
     
-    def __init__(self, requests_per_hour: int = 10, requests_per_day: int = 50):
+    def __init__(self, requests_per_hour: int = 10, requests_per_day: int = 50, name: str = "rate_limiter"):
         """Initialize rate limiter.
         
         Args:
             requests_per_hour: Max requests per hour per user
             requests_per_day: Max requests per day per user
+            name: Name of the limiter in the memory report
         """
         self.requests_per_hour = requests_per_hour
         self.requests_per_day = requests_per_day
         
         # Track requests: {user_id: [timestamp1, timestamp2, ...]}
         self.user_requests: Dict[int, List[datetime]] = defaultdict(list)
+        memory_accounting.add_source(f"{name}.user_requests", lambda: self.user_requests)
     
     def can_request(self, user_id: int) -> tuple[bool, Optional[str]]:
         """Check if user can make a request.
@@ -74,11 +263,13 @@ class RateLimiter:
         # Check hourly limit
         recent_hour = [ts for ts in self.user_requests[user_id] if ts > hour_ago]
         if len(recent_hour) >= self.requests_per_hour:
+            _HOURLY_REJECTIONS.inc()
             wait_minutes = int((recent_hour[0] - hour_ago).total_seconds() / 60) + 1
             return False, f"⏰ Превышен лимит ({self.requests_per_hour} запросов в час). Попробуй через {wait_minutes} мин."
         
         # Check daily limit
         if len(self.user_requests[user_id]) >= self.requests_per_day:
+            _DAILY_REJECTIONS.inc()
             return False, f"⏰ Превышен дневной лимит ({self.requests_per_day} запросов). Возвращайся завтра!"
         
         return True, None
@@ -91,22 +282,56 @@ class RateLimiter:
 class YandexGPTClient:
     """Client for Yandex GPT API with constraint-based prompting."""
     
-    def __init__(self, api_key: str, folder_id: str, rate_limiter: Optional[RateLimiter] = None):
+    def __init__(self, api_key: str, folder_id: str, rate_limiter: Optional[RateLimiter] = None,
+                 admission: Optional[AdmissionController] = None, generation_mode: str = GENERATION_SINGLE,
+                 faq_rate_limiter: Optional[RateLimiter] = None):
         """Initialize Yandex GPT client.
         
         Args:
             api_key: Yandex Cloud API key
             folder_id: Yandex Cloud folder ID
-            rate_limiter: Optional rate limiter instance
+            rate_limiter: Optional rate limiter instance (idea generation and refinement)
+            admission: Optional global token budget controller (unlimited by default)
+            generation_mode: GENERATION_SINGLE or GENERATION_PARALLEL
+            faq_rate_limiter: Optional rate limiter for answer_question
         """
+        if generation_mode not in GENERATION_MODES:
+            logger.warning("Unknown generation mode %r, using %r", generation_mode, GENERATION_SINGLE)
+            generation_mode = GENERATION_SINGLE
         self.api_key = api_key
         self.folder_id = folder_id
         self.rate_limiter = rate_limiter or RateLimiter()
+        self.faq_rate_limiter = faq_rate_limiter or RateLimiter(
+            FAQ_REQUESTS_PER_HOUR, FAQ_REQUESTS_PER_DAY, name="faq_rate_limiter"
+        )
+        self.admission = admission or AdmissionController()
+        self.generation_mode = generation_mode
         
         self.api_url = "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
         self.model = "yandexgpt-lite"
         self.temperature = 0.7
         self.max_tokens = 2000
+        # One connection pool for all completions (and all tenants), created on first use
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Shared HTTP session; its keep-alive connections save a TCP+TLS handshake per completion."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(keepalive_timeout=60))
+        return self._session
+    
+    async def close(self) -> None:
+        """Close the HTTP session (on shutdown)."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    def build_context(self, context: Dict[str, str]) -> str:
+        """Questionnaire answers as the prompt's context block."""
+        return f"""КОНТЕКСТ:
+Целевая аудитория: {context.get('target_audience', 'не указано')}
+Проблема или цель: {context.get('problem', 'не указано')}
+Технические предпочтения: {context.get('tech_preference', 'не указано')}"""
     
     def build_user_prompt(self, context: Dict[str, str]) -> str:
         """Build user prompt from collected context.
@@ -117,42 +342,204 @@ class YandexGPTClient:
         Returns:
             Formatted user prompt
         """
-        return f"""КОНТЕКСТ:
-Целевая аудитория: {context.get('target_audience', 'не указано')}
-Проблема или цель: {context.get('problem', 'не указано')}
-Технические предпочтения: {context.get('tech_preference', 'не указано')}
-
-Предложи 2-3 подходящие идеи проектов."""
+        return f"{self.build_context(context)}\n\nПредложи 2-3 подходящие идеи проектов."
     
-    async def generate_ideas(self, user_id: int, context: Dict[str, str]) -> Dict:
+    async def generate_ideas(self, user_id: int, context: Dict[str, str], charge: bool = True,
+                             on_partial: Optional[Callable[[Dict], Awaitable[None]]] = None) -> Dict:
         """Generate project ideas using Yandex GPT.
         
         Args:
             user_id: Telegram user ID (for rate limiting)
             context: User context dictionary
+            charge: Count a successful call against the user's quota. Speculative
+                calls pass False and are charged only if their result is shown.
+            on_partial: Parallel mode: called with the ideas finished so far
+                while others are still being written
             
         Returns:
             Dictionary with 'success', 'ideas', or 'error'
         """
+        start = time.perf_counter()
+        if self.generation_mode == GENERATION_PARALLEL:
+            result = await self._request_ideas_parallel(user_id, context, charge, on_partial, start)
+        else:
+            result = await self._request_ideas(user_id, context, charge)
+            if result.get("success"):
+                GPT_IDEAS_LATENCY.labels(GENERATION_SINGLE, "first").observe(time.perf_counter() - start)
+        elapsed = time.perf_counter() - start
+        if result.get("success"):
+            GPT_IDEAS_LATENCY.labels(self.generation_mode, "all").observe(elapsed)
+        traffic_recorder.record_gpt(user_id, elapsed, result.get("error", "success"))
+        return result
+    
+    async def _request_ideas(self, user_id: int, context: Dict[str, str], charge: bool) -> Dict:
+        """Rate-limit check, completion call and response processing for generate_ideas."""
         # Check rate limit
         allowed, error_msg = self.rate_limiter.can_request(user_id)
         if not allowed:
             return {"error": "rate_limit", "message": error_msg}
         
+        # Check the global token budget
+        admission = self.admission.admit(user_id, self.max_tokens)
+        if not admission.allowed:
+            return {"error": "budget", "message": BUDGET_MESSAGE}
+        
         # Build request
         user_prompt = self.build_user_prompt(context)
         
+        raw_text, error = await self.complete(
+            SYSTEM_PROMPT, user_prompt, admission.max_tokens, self.temperature, admission
+        )
+        if error:
+            return error
+        
+        # Process and validate response
+        processed = self.process_response(raw_text)
+        
+        if processed.get("success") and charge:
+            # Record successful request
+            self.rate_limiter.record_request(user_id)
+            logger.info("Successfully generated %d ideas for user %s", len(processed['ideas']), user_id)
+        
+        return processed
+    
+    async def _request_ideas_parallel(self, user_id: int, context: Dict[str, str], charge: bool,
+                                      on_partial: Optional[Callable[[Dict], Awaitable[None]]],
+                                      start: float) -> Dict:
+        """Titles call, then one expansion call per title at the same time (parallel mode).
+        
+        The result has the same shape as a single-call answer: valid ideas in
+        the order they finished (so numbers shown early never change), ideas an
+        expansion got wrong under 'broken' for salvage_ideas. Without usable
+        titles it falls back to a single call.
+        """
+        allowed, error_msg = self.rate_limiter.can_request(user_id)
+        if not allowed:
+            return {"error": "rate_limit", "message": error_msg}
+        admission = self.admission.admit(user_id, TITLES_MAX_TOKENS)
+        if not admission.allowed:
+            return {"error": "budget", "message": BUDGET_MESSAGE}
+        
+        user_prompt = f"{self.build_context(context)}\n\nПредложи 3 названия идей."
+        with span("gpt.titles"):
+            raw_text, error = await self.complete(
+                TITLES_PROMPT, user_prompt, admission.max_tokens, self.temperature, admission
+            )
+        if error:
+            return error
+        titles = parse_titles(raw_text)
+        if not titles:
+            GPT_PARSE_FAILURES.labels("titles").inc()
+            logger.warning("No titles in GPT answer, falling back to a single call: %.100s", raw_text)
+            return await self._request_ideas(user_id, context, charge)
+        
+        tasks = [asyncio.ensure_future(self.expand_idea(user_id, context, title, titles)) for title in titles]
+        valid: List[Dict] = []
+        broken: List[Dict] = []
+        first_error = None
+        try:
+            for done in asyncio.as_completed(tasks):
+                idea, error = await done
+                if error:
+                    first_error = first_error or error
+                    continue
+                if not self.validate_idea(idea):
+                    broken.append(idea)
+                    continue
+                valid.append(idea)
+                if len(valid) == 1:
+                    GPT_IDEAS_LATENCY.labels(GENERATION_PARALLEL, "first").observe(time.perf_counter() - start)
+                if on_partial and not all(task.done() for task in tasks):
+                    try:
+                        await on_partial({"success": True, "ideas": list(valid)})
+                    except Exception as e:
+                        logger.warning("Could not show partial ideas: %s", e)
+        finally:
+            # Cancelled (e.g. shutdown drain) - don't leave expansions spending tokens
+            for task in tasks:
+                task.cancel()
+        
+        if not valid:
+            if not broken:
+                return first_error
+            GPT_PARSE_FAILURES.labels("invalid").inc()
+            _UNUSABLE_ANSWERS.inc()
+            return {
+                "error": "invalid",
+                "message": "❌ Идеи не прошли валидацию. Попробуй другой запрос.",
+                "fallback": True,
+                "broken": broken
+            }
+        
+        if broken:
+            _PARTIAL_ANSWERS.inc()
+        else:
+            _VALID_ANSWERS.inc()
+        if charge:
+            self.rate_limiter.record_request(user_id)
+            logger.info("Successfully generated %d ideas in parallel for user %s", len(valid), user_id)
+        result = {"success": True, "ideas": valid}
+        if broken:
+            result["broken"] = broken
+        return result
+    
+    async def expand_idea(self, user_id: int, context: Dict[str, str], title: str,
+                          titles: List[str]) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Write out one idea from its title (parallel mode).
+        
+        Args:
+            user_id: Telegram user ID (for the token budget)
+            context: User context dictionary
+            title: Title to expand
+            titles: All planned titles, so the idea stays distinct from the others
+            
+        Returns:
+            (idea, None) - the idea may be incomplete - or (None, error dictionary)
+        """
+        admission = self.admission.admit(user_id, EXPAND_MAX_TOKENS)
+        if not admission.allowed:
+            return None, {"error": "budget", "message": BUDGET_MESSAGE}
+        user_prompt = f"{self.build_context(context)}\n\nНАЗВАНИЕ ИДЕИ: {title}"
+        others = [other for other in titles if other != title]
+        if others:
+            user_prompt += f"\nДругие идеи (не повторяй их): {'; '.join(others)}"
+        with span("gpt.expand"):
+            raw_text, error = await self.complete(
+                EXPAND_PROMPT, user_prompt, admission.max_tokens, self.temperature, admission
+            )
+        if error:
+            return None, error
+        candidates = self.extract_ideas(normalize_response(raw_text)) if raw_text else []
+        idea = candidates[0] if candidates else {}
+        idea['title'] = title
+        return idea, None
+    
+    async def complete(self, system_prompt: str, user_prompt: str, max_tokens: int,
+                       temperature: float, admission: Optional[Admission] = None
+                       ) -> Tuple[Optional[str], Optional[Dict]]:
+        """Make one completion call.
+        
+        Args:
+            system_prompt: System message
+            user_prompt: User message
+            max_tokens: Completion token limit
+            temperature: Sampling temperature
+            admission: Budget admission to settle with the tokens actually used
+            
+        Returns:
+            (answer text, None) on success, (None, error dictionary) on failure
+        """
         payload = {
             "modelUri": f"gpt://{self.folder_id}/{self.model}",
             "completionOptions": {
                 "stream": False,
-                "temperature": self.temperature,
-                "maxTokens": self.max_tokens
+                "temperature": temperature,
+                "maxTokens": max_tokens
             },
             "messages": [
                 {
                     "role": "system",
-                    "text": SYSTEM_PROMPT
+                    "text": system_prompt
                 },
                 {
                     "role": "user",
@@ -166,67 +553,94 @@ class YandexGPTClient:
             "Authorization": f"Api-Key {self.api_key}"
         }
         
+        # Propagate the update's trace id so Yandex-side logs can be correlated
+        trace_id = current_trace_id()
+        if trace_id:
+            headers["x-client-request-id"] = trace_id
+        
+        start = time.perf_counter()
+        tokens_used = 0
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
+            with span("gpt.completion"):
+                async with self._get_session().post(
                     self.api_url,
                     json=payload,
                     headers=headers,
                     timeout=aiohttp.ClientTimeout(total=30)
                 ) as response:
+                    GPT_RESPONSES.labels(response.status).inc()
                     if response.status != 200:
                         error_text = await response.text()
-                        logger.error(f"Yandex GPT API error: {response.status} - {error_text}")
-                        return {"error": "api_error", "message": "❌ Ошибка API. Попробуй позже."}
-                    
+                        logger.error("Yandex GPT API error: %s - %.500s", response.status, error_text)
+                        return None, {"error": "api_error", "message": "❌ Ошибка API. Попробуй позже."}
+                
                     data = await response.json()
-                    
+                
                     # Extract response text
                     if "result" not in data or "alternatives" not in data["result"]:
-                        logger.error(f"Unexpected API response: {data}")
-                        return {"error": "malformed", "message": "❌ Неожиданный формат ответа API"}
-                    
-                    raw_text = data["result"]["alternatives"][0]["message"]["text"]
-                    
-                    # Process and validate response
-                    processed = self.process_response(raw_text)
-                    
-                    if processed.get("success"):
-                        # Record successful request
-                        self.rate_limiter.record_request(user_id)
-                        logger.info(f"Successfully generated {len(processed['ideas'])} ideas for user {user_id}")
-                    
-                    return processed
-                    
+                        GPT_PARSE_FAILURES.labels("unexpected_payload").inc()
+                        logger.error("Unexpected API response (keys: %s): %.500s", list(data), data)
+                        return None, {"error": "malformed", "message": "❌ Неожиданный формат ответа API"}
+                
+                    text = data["result"]["alternatives"][0]["message"]["text"]
+                    tokens_used = usage_tokens(data["result"], system_prompt + user_prompt + text)
+                    return text, None
+                
+        except asyncio.CancelledError:
+            # Yandex may already be generating (and billing) the answer - keep the reserved estimate
+            if admission is not None:
+                tokens_used = admission.reserved
+            raise
         except aiohttp.ClientError as e:
-            logger.error(f"Network error calling Yandex GPT: {e}")
-            return {"error": "network", "message": "❌ Ошибка сети. Проверь подключение."}
+            GPT_RESPONSES.labels("network").inc()
+            logger.error("Network error calling Yandex GPT: %s", e)
+            return None, {"error": "network", "message": "❌ Ошибка сети. Проверь подключение."}
         except Exception as e:
-            logger.error(f"Unexpected error: {e}", exc_info=True)
-            return {"error": "unknown", "message": "❌ Неизвестная ошибка. Попробуй позже."}
+            GPT_RESPONSES.labels("exception").inc()
+            logger.error("Unexpected error: %s", e, exc_info=True)
+            return None, {"error": "unknown", "message": "❌ Неизвестная ошибка. Попробуй позже."}
+        finally:
+            GPT_LATENCY.observe(time.perf_counter() - start)
+            if admission is not None:
+                self.admission.settle(admission, tokens_used)
     
     def process_response(self, raw_text: str) -> Dict:
         """Parse and validate GPT response.
         
+        Nearly valid text (header and label variants) is normalized before
+        giving up. Valid ideas are kept even if others are broken; broken
+        ideas that have a title are returned under 'broken' so salvage_ideas
+        can complete them.
+        
         Args:
             raw_text: Raw text from GPT
             
         Returns:
-            Dictionary with 'success' and 'ideas', or 'error'
+            Dictionary with 'success' and 'ideas', or 'error'; either may carry 'broken'
         """
+        text = raw_text
+        reformatted = False
+        
         # Check for expected structure
         if "Идея 1:" not in raw_text and "**Идея 1:" not in raw_text:
-            logger.warning(f"Malformed GPT response: {raw_text[:100]}")
-            return {
-                "error": "malformed",
-                "message": "❌ AI вернул неожиданный формат. Попробуй переформулировать запрос.",
-                "fallback": True
-            }
+            text = normalize_response(raw_text)
+            if "Идея 1:" not in text:
+                logger.warning("Malformed GPT response: %.100s", raw_text)
+                GPT_PARSE_FAILURES.labels("malformed").inc()
+                _UNUSABLE_ANSWERS.inc()
+                return {
+                    "error": "malformed",
+                    "message": "❌ AI вернул неожиданный формат. Попробуй переформулировать запрос.",
+                    "fallback": True
+                }
+            reformatted = True
         
         # Extract ideas
-        ideas = self.extract_ideas(raw_text)
+        ideas = self.extract_ideas(text)
         
         if not ideas:
+            GPT_PARSE_FAILURES.labels("empty").inc()
+            _UNUSABLE_ANSWERS.inc()
             return {
                 "error": "empty",
                 "message": "❌ Не удалось извлечь идеи. Попробуй еще раз.",
@@ -234,19 +648,234 @@ class YandexGPTClient:
             }
         
         # Validate ideas
-        valid_ideas = []
-        for idea in ideas:
-            if self.validate_idea(idea):
-                valid_ideas.append(idea)
+        valid_ideas, broken_ideas = self.split_valid(ideas)
+        # The strict parser alone would have turned this into a full re-generation
+        strict_failed = reformatted or not valid_ideas
+        
+        if broken_ideas and not reformatted:
+            # Labels written differently (e.g. "**Решает:**") make ideas look incomplete
+            normalized = normalize_response(text)
+            if normalized != text:
+                normalized_valid, normalized_broken = self.split_valid(self.extract_ideas(normalized))
+                if len(normalized_valid) > len(valid_ideas):
+                    valid_ideas, broken_ideas = normalized_valid, normalized_broken
+                    reformatted = True
         
         if not valid_ideas:
+            GPT_PARSE_FAILURES.labels("invalid").inc()
+            _UNUSABLE_ANSWERS.inc()
             return {
                 "error": "invalid",
                 "message": "❌ Идеи не прошли валидацию. Попробуй другой запрос.",
-                "fallback": True
+                "fallback": True,
+                "broken": broken_ideas
             }
         
-        return {"success": True, "ideas": valid_ideas}
+        if broken_ideas:
+            _PARTIAL_ANSWERS.inc()
+        elif reformatted:
+            _REFORMATTED_ANSWERS.inc()
+        else:
+            _VALID_ANSWERS.inc()
+        if reformatted and strict_failed:
+            GPT_REGENERATIONS_SAVED.inc()
+        
+        result = {"success": True, "ideas": valid_ideas}
+        if broken_ideas:
+            result["broken"] = broken_ideas
+        return result
+    
+    def split_valid(self, ideas: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """Split parsed ideas into (valid, broken); broken ones without a title are dropped."""
+        valid, broken = [], []
+        for idea in ideas:
+            if self.validate_idea(idea):
+                valid.append(idea)
+            elif idea.get('title'):
+                broken.append(idea)
+        return valid, broken
+    
+    async def repair_ideas(self, user_id: int, context: Dict[str, str], broken: List[Dict]) -> List[Dict]:
+        """Complete broken ideas with one small follow-up call.
+        
+        Only the missing fields are requested; everything the first answer
+        got right is kept.
+        
+        Args:
+            user_id: Telegram user ID (for the token budget)
+            context: User context dictionary
+            broken: Ideas missing fields or steps
+            
+        Returns:
+            Ideas that are valid after the repair
+        """
+        admission = self.admission.admit(user_id, min(self.max_tokens, REPAIR_TOKENS_PER_IDEA * len(broken)))
+        if not admission.allowed:
+            _UNREPAIRED_IDEAS.inc(len(broken))
+            return []
+        user_prompt = self.build_repair_prompt(context, broken)
+        with span("gpt.repair"):
+            raw_text, _ = await self.complete(
+                REPAIR_PROMPT, user_prompt, admission.max_tokens, REPAIR_TEMPERATURE, admission
+            )
+        
+        repaired = []
+        candidates = self.extract_ideas(normalize_response(raw_text)) if raw_text else []
+        by_title = {candidate.get('title', '').casefold(): candidate for candidate in candidates}
+        for i, original in enumerate(broken):
+            # Match by title, fall back to position
+            candidate = by_title.get(original['title'].casefold()) \
+                or (candidates[i] if i < len(candidates) else {})
+            merged = {field: original.get(field) or candidate.get(field) for field in IDEA_FIELDS}
+            if len(original.get('steps') or []) < 2:
+                merged['steps'] = candidate.get('steps') or original.get('steps') or []
+            if self.validate_idea(merged):
+                repaired.append(merged)
+        
+        _REPAIRED_IDEAS.inc(len(repaired))
+        _UNREPAIRED_IDEAS.inc(len(broken) - len(repaired))
+        logger.info("Repaired %d of %d broken ideas", len(repaired), len(broken))
+        return repaired
+    
+    @staticmethod
+    def describe_idea(number: int, idea: Dict) -> str:
+        """One idea's fields as a compact prompt block ("(нет)" for missing ones)."""
+        steps = "; ".join(idea.get('steps') or []) or "(нет)"
+        return (
+            f"**Идея {number}: {idea['title']}**\n"
+            f"Описание: {idea.get('description') or '(нет)'}\n"
+            f"Решает: {idea.get('problem') or '(нет)'}\n"
+            f"Технологии: {idea.get('tech') or '(нет)'}\n"
+            f"Первые шаги: {steps}"
+        )
+    
+    def build_repair_prompt(self, context: Dict[str, str], broken: List[Dict]) -> str:
+        """Build a prompt listing the broken ideas and what each one is missing."""
+        blocks = []
+        for i, idea in enumerate(broken, 1):
+            missing = [REPAIR_FIELD_NAMES[field] for field in IDEA_FIELDS[1:] if not idea.get(field)]
+            if 0 < len(idea.get('steps') or []) < 2:
+                missing.append(REPAIR_FIELD_NAMES['steps'])
+            blocks.append(f"{self.describe_idea(i, idea)}\nНе хватает: {', '.join(missing)}")
+        return f"""КОНТЕКСТ:
+Целевая аудитория: {context.get('target_audience', 'не указано')}
+Проблема или цель: {context.get('problem', 'не указано')}
+Технические предпочтения: {context.get('tech_preference', 'не указано')}
+
+НЕПОЛНЫЕ ИДЕИ:
+""" + "\n\n".join(blocks)
+    
+    async def salvage_ideas(self, user_id: int, context: Dict[str, str], result: Dict,
+                            on_partial: Optional[Callable[[Dict], Awaitable[None]]] = None) -> Dict:
+        """Finish a processed answer that has broken ideas.
+        
+        The valid ideas are handed to ``on_partial`` first so they can be shown
+        while the repair call runs. An answer with no valid ideas that the
+        repair rescues is charged to the user's quota like a regular success.
+        
+        Args:
+            user_id: Telegram user ID
+            context: User context dictionary
+            result: generate_ideas result
+            on_partial: Called with the valid part before repairing
+            
+        Returns:
+            Result with repaired ideas appended (or the original error)
+        """
+        broken = result.get("broken")
+        if not broken:
+            return result
+        if result.get("success") and on_partial:
+            await on_partial(result)
+        
+        ideas = result.get("ideas", []) + await self.repair_ideas(user_id, context, broken)
+        if not ideas:
+            return result
+        if result.get("error"):
+            # Without the repair this would have been a full re-generation
+            GPT_REGENERATIONS_SAVED.inc()
+            self.rate_limiter.record_request(user_id)
+        return {"success": True, "ideas": ideas}
+    
+    async def refine_idea(self, user_id: int, context: Dict[str, str], idea: Dict, mode: str) -> Dict:
+        """Rework one shown idea ("refine" or "simplify") with a compact follow-up call.
+        
+        Only the idea's fields, the user's goal and a one-line instruction are
+        sent - not the questionnaire prompt - and a single idea is requested,
+        so this costs a fraction of a full generate_ideas call. Fields the
+        answer lacks are kept from the original idea.
+        
+        Args:
+            user_id: Telegram user ID (for rate limiting and the token budget)
+            context: Questionnaire the idea was generated for
+            idea: Validated idea to rework
+            mode: Key of REFINE_INSTRUCTIONS
+            
+        Returns:
+            Dictionary with 'success' and the reworked 'idea', or 'error'
+        """
+        allowed, error_msg = self.rate_limiter.can_request(user_id)
+        if not allowed:
+            return {"error": "rate_limit", "message": error_msg}
+        admission = self.admission.admit(user_id, REFINE_MAX_TOKENS)
+        if not admission.allowed:
+            return {"error": "budget", "message": BUDGET_MESSAGE}
+        
+        user_prompt = (
+            f"Проблема или цель пользователя: {context.get('problem', 'не указано')}\n\n"
+            f"{self.describe_idea(1, idea)}\n\n"
+            f"ЗАДАЧА: {REFINE_INSTRUCTIONS[mode]}"
+        )
+        with span("gpt.refine"):
+            raw_text, error = await self.complete(
+                REFINE_PROMPT, user_prompt, admission.max_tokens, REFINE_TEMPERATURE, admission
+            )
+        if error:
+            GPT_REFINEMENTS.labels(mode, "error").inc()
+            return error
+        
+        candidates = self.extract_ideas(normalize_response(raw_text)) if raw_text else []
+        candidate = candidates[0] if candidates else {}
+        reworked = {field: candidate.get(field) or idea[field] for field in IDEA_FIELDS}
+        if len(candidate.get('steps') or []) < 2:
+            reworked['steps'] = idea['steps']
+        if reworked == idea or not self.validate_idea(reworked):
+            GPT_REFINEMENTS.labels(mode, "unusable").inc()
+            logger.warning("Unusable refinement answer: %.500s", raw_text)
+            return {"error": "unusable", "message": "❌ Не получилось доработать идею. Попробуй еще раз."}
+        
+        GPT_REFINEMENTS.labels(mode, "ok").inc()
+        self.rate_limiter.record_request(user_id)
+        return {"success": True, "idea": reworked}
+    
+    async def answer_question(self, user_id: int, question: str) -> Dict:
+        """Answer a free-text question the offline FAQ search could not.
+        
+        Args:
+            user_id: Telegram user ID (for rate limiting and the token budget)
+            question: Question text
+            
+        Returns:
+            Dictionary with 'success' and 'answer', or 'error'
+        """
+        allowed, error_msg = self.faq_rate_limiter.can_request(user_id)
+        if not allowed:
+            return {"error": "rate_limit", "message": error_msg}
+        admission = self.admission.admit(user_id, FAQ_MAX_TOKENS)
+        if not admission.allowed:
+            return {"error": "budget", "message": BUDGET_MESSAGE}
+        
+        with span("gpt.faq"):
+            raw_text, error = await self.complete(
+                FAQ_PROMPT, question[:FAQ_QUESTION_MAX_CHARS], admission.max_tokens, FAQ_TEMPERATURE, admission
+            )
+        if error:
+            return error
+        if not raw_text or not raw_text.strip():
+            return {"error": "empty", "message": "❌ Не удалось получить ответ. Попробуй переформулировать вопрос."}
+        
+        self.faq_rate_limiter.record_request(user_id)
+        return {"success": True, "answer": raw_text.strip()}
     
     def extract_ideas(self, text: str) -> List[Dict]:
         """Extract structured ideas from GPT response.
@@ -304,7 +933,7 @@ class YandexGPTClient:
                 ideas.append(idea)
                 
             except Exception as e:
-                logger.warning(f"Error parsing idea section: {e}")
+                logger.warning("Error parsing idea section: %s", e)
                 continue
         
         return ideas
@@ -322,12 +951,12 @@ class YandexGPTClient:
         
         for field in required_fields:
             if field not in idea or not idea[field]:
-                logger.debug(f"Idea missing field: {field}")
+                logger.debug("Idea missing field: %s", field)
                 return False
         
         # Check steps has at least 2 items
         if len(idea['steps']) < 2:
-            logger.debug(f"Idea has insufficient steps: {len(idea['steps'])}")
+            logger.debug("Idea has insufficient steps: %d", len(idea['steps']))
             return False
         
         return True
@@ -342,19 +971,7 @@ class YandexGPTClient:
             Formatted message text
         """
         message = "🎨 **Вот идеи для твоего проекта:**\n\n"
-        
-        for i, idea in enumerate(ideas, 1):
-            message += f"**💡 Идея {i}: {idea['title']}**\n"
-            message += f"{idea['description']}\n\n"
-            message += f"**Решает:** {idea['problem']}\n"
-            message += f"**Технологии:** {idea['tech']}\n"
-            message += f"**Первые шаги:**\n"
-            
-            for j, step in enumerate(idea['steps'], 1):
-                message += f"{j}. {step}\n"
-            
-            message += "\n---\n\n"
-        
+        message += format_ideas(ideas)
         message += "✨ Понравилась идея? Можешь вернуться в главное меню и изучить основы!"
         
         return message
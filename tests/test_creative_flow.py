@@ -0,0 +1,110 @@
+"""Free text during the idea questionnaire goes to the questionnaire, not to the FAQ.
+
+Runs the bot's real handlers on the in-process fake Bot API
+(``benchmarks/fake_bot.py``): text typed at each of the three questions must
+be handled by ``process_creative_input`` and leave the questionnaire where it
+was, and the FAQ must still answer free text outside it.
+
+    python -m pytest tests
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from telegram import Update
+
+from fake_bot import RecordingRequest, build_fake_application, callback_update, fake_gpt_client, message_update
+from src.handlers import creative_handler
+from src.utils.admission import CACHED_ONLY
+from src.utils.metrics import FAQ_ANSWERS
+
+USER_ID = 7
+PROBLEM = "Хочу бота для книжного клуба"
+QUESTION = "Чем Git отличается от GitHub?"
+
+
+def faq_answers() -> float:
+    return sum(FAQ_ANSWERS.labels(source).value for source in ("index", "gpt", "miss"))
+
+
+def run_flow(steps):
+    """Feed (press or text) steps to a fresh bot; returns (session, transport, GPT client, FAQ answers)."""
+
+    async def run():
+        request = RecordingRequest()
+        application, _ = await build_fake_application(request=request)
+        client = creative_handler.gpt_client = fake_gpt_client()
+        answers_before = faq_answers()
+        for update_id, step in enumerate(["/start"] + steps, start=1):
+            raw = callback_update(update_id, USER_ID, step) if "_" in step else message_update(update_id, USER_ID, step)
+            await application.process_update(Update.de_json(raw, application.bot))
+        session = application.user_data[USER_ID]
+        await application.shutdown()
+        await client.close()
+        return session, request, client, faq_answers() - answers_before
+
+    return asyncio.run(run())
+
+
+def test_text_at_question_1_keeps_the_questionnaire():
+    session, request, client, faq = run_flow(["mode_creative", QUESTION, "target_self", PROBLEM, "tech_web"])
+
+    assert faq == 0
+    assert request.texts[2].startswith("💬 Пожалуйста, используй кнопки")
+    assert session.problem == PROBLEM
+    assert client.calls == [{"target_audience": session.target_audience, "problem": PROBLEM,
+                             "tech_preference": session.tech_preference}]
+
+
+def test_text_at_question_2_is_the_problem():
+    session, request, client, faq = run_flow(["mode_creative", "target_self", PROBLEM, "tech_web"])
+
+    assert faq == 0
+    assert session.problem == PROBLEM
+    assert session.creative_step == 3
+    assert len(client.calls) == 1
+    assert session.ideas
+
+
+def test_text_at_question_3_keeps_the_questionnaire():
+    session, request, client, faq = run_flow(["mode_creative", "target_self", PROBLEM, QUESTION, "tech_web"])
+
+    assert faq == 0
+    assert request.texts[4].startswith("💬 Пожалуйста, используй кнопки")
+    # The question did not replace the problem, and question 3 still has a route
+    assert session.problem == PROBLEM
+    assert len(client.calls) == 1
+    assert client.calls[0]["problem"] == PROBLEM
+    assert session.ideas
+
+
+def test_text_outside_the_questionnaire_is_a_question():
+    session, request, client, faq = run_flow(["mode_creative", "back_to_main", QUESTION, PROBLEM])
+
+    assert faq == 2
+    assert session.problem is None
+    assert client.calls == []
+
+
+def test_question_without_a_conversation_is_answered():
+    async def run():
+        request = RecordingRequest()
+        application, _ = await build_fake_application(request=request)
+        answers_before = faq_answers()
+        await application.process_update(Update.de_json(message_update(1, USER_ID, QUESTION), application.bot))
+        await application.shutdown()
+        return faq_answers() - answers_before
+
+    assert asyncio.run(run()) == 1
+
+
+def test_no_questionnaire_when_only_stored_ideas_can_be_shown(monkeypatch):
+    monkeypatch.setattr(creative_handler.admission, "level_for", lambda user_id: CACHED_ONLY)
+    session, request, client, faq = run_flow(["mode_creative"])
+
+    assert request.texts[1].startswith("🌙 **Новые идеи на паузе**")
+    assert session.creative_step == 0
+    assert client.calls == []
@@ -0,0 +1,75 @@
+"""Relevance of the lessons/FAQ search on real patron questions.
+
+Each question lists the documents that answer it; ``None`` means nothing in
+the lessons or the FAQ does, so the best match must score below
+``FAQ_MIN_SCORE`` and the question goes to GPT. Re-tune FAQ_MIN_SCORE (and
+the search) against this table.
+
+    python -m pytest tests
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from fake_bot import CANNED_COMPLETION
+from src.config import FAQ_MIN_SCORE
+from src.handlers.faq_handler import faq_index
+from src.utils.yandex_gpt import YandexGPTClient
+
+QUESTIONS = [
+    # "What is X" - the definition, not an entry that mentions X
+    ("Что такое гитхаб?", {"github#intro"}),
+    ("Что такое git?", {"git#intro"}),
+    ("что такое railway", {"railway#intro"}),
+    ("что такое cursor", {"cursor#intro"}),
+    ("зачем нужен гитхаб", {"github#intro"}),
+    ("что такое деплой", {"faq:9"}),
+    ("что такое коммит", {"faq:4"}),
+    ("Что такое репозиторий?", {"faq:3"}),
+    # How-to and troubleshooting
+    ("как установить курсор", {"cursor#3"}),
+    ("как запушить код", {"push#intro", "push#2", "push#3"}),
+    ("как задеплоить бота на railway", {"railway#intro", "railway#3"}),
+    ("как подключить гитхаб к курсору", {"cursor_github#intro", "cursor_github#3"}),
+    ("как связать курсор и гитхаб", {"cursor_github#intro", "cursor_github#3"}),
+    ("как откатить изменения", {"faq:5"}),
+    ("git command not found", {"faq:6"}),
+    ("где хранить токен бота", {"faq:10"}),
+    # Curated FAQ
+    ("Чем git отличается от github", {"faq:2"}),
+    ("Сколько стоит курсор?", {"faq:0"}),
+    ("railway платный?", {"faq:8"}),
+    ("какой язык выбрать", {"faq:11"}),
+    # Nothing answers these - GPT does
+    ("как сделать телеграм бота", None),
+    ("как создать репозиторий на гитхабе", None),
+    ("какая погода завтра", None),
+    ("как приготовить борщ", None),
+]
+
+
+@pytest.mark.parametrize("question, expected", QUESTIONS)
+def test_question_gets_the_right_answer(question, expected):
+    results = faq_index.search(question, limit=1)
+    if expected is None:
+        assert not results or results[0][0] < FAQ_MIN_SCORE, results[0][1].doc_id
+    else:
+        assert results and results[0][0] >= FAQ_MIN_SCORE
+        assert results[0][1].doc_id in expected
+
+
+def test_gpt_answers_do_not_use_the_idea_quota():
+    client = YandexGPTClient("fake-key", "fake-folder")
+
+    async def complete(*args, **kwargs):
+        return CANNED_COMPLETION, None
+
+    client.complete = complete
+    for _ in range(client.rate_limiter.requests_per_hour + 1):
+        assert asyncio.run(client.answer_question(7, "как сделать телеграм бота")).get("success")
+    assert client.rate_limiter.can_request(7) == (True, None)
@@ -0,0 +1,83 @@
+"""Idea history and prefetched generations are kept per tenant (library bot).
+
+One SQLite file serves every tenant, so a user of two bots must see only
+the ideas generated by the bot they are talking to; databases created
+before the tenant column existed are migrated to the default tenant.
+
+    python -m pytest tests
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+import zlib
+
+from src.utils.idea_history import IdeaHistory, context_key
+from src.utils.speculation import SpeculativePrefetcher
+from src.utils.tenants import DEFAULT_TENANT, set_current_tenant
+
+USER_ID = 7
+CONTEXT = {"target_audience": "для себя", "problem": "Хочу сайт для книжного клуба", "tech_preference": "сайт"}
+IDEAS = [{"title": "Книжный клуб", "description": "", "problem": "", "tech": "", "steps": []}]
+
+
+def in_tenant(tenant, coroutine):
+    """Run a coroutine with ``tenant`` as the current tenant."""
+
+    async def run():
+        set_current_tenant(tenant)
+        return await coroutine
+
+    return asyncio.run(run())
+
+
+def test_history_is_kept_per_tenant(tmp_path):
+    history = IdeaHistory()
+    history.open(str(tmp_path / "ideas.db"))
+    in_tenant("central", history.add(USER_ID, CONTEXT, IDEAS))
+
+    assert in_tenant("central", history.find(USER_ID, CONTEXT)) == IDEAS
+    assert in_tenant("kids", history.find(USER_ID, CONTEXT)) is None
+    assert in_tenant("kids", history.page(USER_ID, 0)) == (None, 0)
+
+
+def test_history_without_tenants_is_migrated_to_the_default_tenant(tmp_path):
+    path = str(tmp_path / "ideas.db")
+    payload = zlib.compress(json.dumps({"context": CONTEXT, "ideas": IDEAS}).encode())
+    with sqlite3.connect(path) as conn:  # Schema and index before tenants were stored
+        conn.executescript("""
+            CREATE TABLE ideas (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, created_at REAL NOT NULL,
+                                context_key TEXT NOT NULL, payload BLOB NOT NULL);
+            CREATE INDEX ideas_user_created ON ideas (user_id, created_at);
+        """)
+        conn.execute("INSERT INTO ideas (user_id, created_at, context_key, payload) VALUES (?, ?, ?, ?)",
+                     (USER_ID, time.time(), context_key(CONTEXT), payload))
+    history = IdeaHistory()
+    history.open(path)
+
+    assert in_tenant(DEFAULT_TENANT, history.find(USER_ID, CONTEXT)) == IDEAS
+    assert in_tenant("kids", history.page(USER_ID, 0)) == (None, 0)
+    in_tenant("kids", history.add(USER_ID, CONTEXT, IDEAS))
+    assert in_tenant("kids", history.page(USER_ID, 0))[1] == 1
+
+
+def test_speculation_is_claimed_only_by_its_tenant():
+    async def run():
+        prefetcher = SpeculativePrefetcher()
+
+        async def generate():
+            return {"success": True, "ideas": IDEAS}
+
+        set_current_tenant("central")
+        prefetcher.start(USER_ID, CONTEXT, generate)
+        set_current_tenant("kids")
+        other = prefetcher.take(USER_ID, CONTEXT)
+        set_current_tenant("central")
+        own = prefetcher.take(USER_ID, CONTEXT)
+        prefetcher.cancel_all()
+        return other, own and await own
+
+    other, own = asyncio.run(run())
+    assert other is None
+    assert own == {"success": True, "ideas": IDEAS}
@@ -0,0 +1,86 @@
+"""Idle-session eviction, expired conversations and the python-telegram-bot internals the bot relies on.
+
+The conversation-state gauge (``metrics.track_conversations``) and the
+memory report read ``ConversationHandler._conversations``, which has no
+public accessor; the last test fails if a python-telegram-bot upgrade
+renames or reshapes it.
+
+    python -m pytest tests
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from telegram import Update
+from telegram.ext import ConversationHandler
+
+from fake_bot import RecordingRequest, build_fake_application, callback_update, message_update
+from src.config import SESSION_IDLE_TIMEOUT_SECONDS
+
+IDLE_USER = 7
+ACTIVE_USER = 8
+
+
+def run_with_app(check):
+    """Send /start from two users to a fresh bot, then run check(application)."""
+
+    async def run():
+        application, _ = await build_fake_application()
+        for update_id, user_id in enumerate((IDLE_USER, ACTIVE_USER), start=1):
+            raw = message_update(update_id, user_id, "/start")
+            await application.process_update(Update.de_json(raw, application.bot))
+        try:
+            return check(application)
+        finally:
+            await application.shutdown()
+
+    return asyncio.run(run())
+
+
+def conversation_handler(application) -> ConversationHandler:
+    return next(handler for handler in application.handlers[0] if isinstance(handler, ConversationHandler))
+
+
+def test_sweeper_evicts_only_idle_sessions():
+    def check(application):
+        sweeper = application.bot_data["session_sweeper"]
+        application.user_data[IDLE_USER].last_seen -= sweeper.idle_timeout + 1
+        assert sweeper.sweep() == 1
+        assert set(application.user_data) == {ACTIVE_USER}
+
+    run_with_app(check)
+
+
+def test_conversations_end_after_the_idle_timeout():
+    def check(application):
+        # conversation_timeout runs on the JobQueue (python-telegram-bot[job-queue])
+        assert application.job_queue is not None
+        assert conversation_handler(application).conversation_timeout == SESSION_IDLE_TIMEOUT_SECONDS
+
+    run_with_app(check)
+
+
+def test_conversation_state_map_is_readable():
+    def check(application):
+        conversations = conversation_handler(application)._conversations
+        assert conversations[(IDLE_USER, IDLE_USER)] == 1  # MODE_SELECTION
+        assert conversations[(ACTIVE_USER, ACTIVE_USER)] == 1
+
+    run_with_app(check)
+
+
+def test_buttons_of_an_expired_conversation_are_answered():
+    async def run():
+        request = RecordingRequest()
+        application, _ = await build_fake_application(request=request)
+        # A questionnaire button pressed after the conversation timed out (no state)
+        await application.process_update(Update.de_json(callback_update(1, IDLE_USER, "tech_web"), application.bot))
+        await application.shutdown()
+        return request.texts
+
+    answer, menu = asyncio.run(run())
+    assert answer == "⌛ Сессия истекла"
+    assert menu.startswith("⌛ Сессия истекла.")